@@ -0,0 +1,70 @@
+"""
+Audit search API routes
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
+import asyncio
+import logging
+
+from ..schemas import (
+    AuditRecord,
+    AuditPage,
+    ApiResponseAudit
+)
+from ...core.config import get_settings
+from ...core.audit_store import get_audit_store
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/audit", tags=["Audit"])
+
+
+@router.get("", response_model=ApiResponseAudit)
+async def search_audit(
+    proposal_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    template: Optional[str] = None,
+    date_from: Optional[str] = Query(None, description="ISO date or timestamp (inclusive)"),
+    date_to: Optional[str] = Query(None, description="ISO date or timestamp (inclusive)"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500)
+):
+    """
+    Search generated documents, newest first.
+
+    Example: `GET /api/v1/audit?proposal_id=DT-2024-001&date_from=2024-01-01`
+    """
+    try:
+        total, records = await asyncio.to_thread(
+            get_audit_store(get_settings().log_dir).query,
+            proposal_id=proposal_id,
+            user_id=user_id,
+            template=template,
+            date_from=date_from,
+            date_to=date_to,
+            limit=page_size,
+            offset=(page - 1) * page_size
+        )
+        return ApiResponseAudit(
+            success=True,
+            data=AuditPage(
+                total=total,
+                page=page,
+                page_size=page_size,
+                items=[AuditRecord(**r) for r in records]
+            )
+        )
+
+    except Exception as e:
+        logger.exception(f"Error searching audit log: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": {
+                    "code": "AUDIT_QUERY_ERROR",
+                    "message": str(e)
+                }
+            }
+        )
@@ -2,20 +2,39 @@
 Form rendering API routes
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, UploadFile, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from typing import List, Optional
+from urllib.parse import quote
+import io
+import os
 import logging
 
 from ..schemas import (
     RenderFormRequest,
+    RenderBatchRequest,
+    DossierRequest,
     ApiResponseRenderForm,
+    ApiResponseRenderBatch,
+    ApiResponseMerge,
     ApiResponseTemplates,
     ApiResponseTemplateInfo,
+    ApiResponseTemplateSchema,
+    ApiResponseQueueStats,
+    QueueStats,
     TemplateInfo,
-    RenderFormResult
+    TemplateSchema,
+    RenderFormResult,
+    RenderBatchResult,
+    MergeResult
 )
-from ...core.engine import FormEngine
+from ...core.config import get_settings
+from ...core.engine import FormEngine, MissingVariables
+from ...core.executor import get_render_executor, ExecutorSaturated
+from ...core.merge import MailMerge, iter_contexts, detect_input_format
+from ...core.dossier import render_dossier
 from ...sample_data import get_sample_data, VALID_FORM_IDS
+from ...workflow import REQUIRED_FORMS, get_required_forms, form_template_name
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/forms", tags=["Forms"])
@@ -31,8 +50,57 @@ def get_engine() -> FormEngine:
     return _engine
 
 
+def is_strict(request) -> bool:
+    """Per-request `strict` flag, falling back to the server setting"""
+    return request.strict if request.strict is not None else get_settings().strict_context
+
+
+def busy_response(e: ExecutorSaturated) -> JSONResponse:
+    """503 response telling the caller when to retry"""
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(e.retry_after)},
+        content={
+            "success": False,
+            "error": {
+                "code": "SERVER_BUSY",
+                "message": str(e)
+            }
+        }
+    )
+
+
+STREAM_MEDIA_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def stream_response(rendered: dict, fmt: str) -> StreamingResponse:
+    """Stream rendered bytes back with their SHA-256 in a header"""
+    content = memoryview(rendered["content"])
+    headers = {
+        "X-Content-SHA256": rendered["sha256"],
+        "Content-Length": str(len(content)),
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(rendered['filename'])}",
+    }
+    if rendered["result"]:
+        headers["X-File-Url"] = rendered["result"][f"{fmt}_url"]
+
+    def chunks():
+        for start in range(0, len(content), STREAM_CHUNK_SIZE):
+            yield bytes(content[start:start + STREAM_CHUNK_SIZE])
+
+    return StreamingResponse(chunks(), media_type=STREAM_MEDIA_TYPES[fmt], headers=headers)
+
+
 @router.post("/render", response_model=ApiResponseRenderForm)
-async def render_form(request: RenderFormRequest):
+async def render_form(
+    request: RenderFormRequest,
+    stream: Optional[str] = Query(None, pattern="^(docx|pdf)$", description="Return the file itself instead of JSON"),
+    persist: bool = Query(False, description="With stream: also store the files in the output directory")
+):
     """
     Render a form template with provided context data.
 
@@ -42,11 +110,33 @@ async def render_form(request: RenderFormRequest):
     - **proposal_id**: Optional proposal ID for tracking
 
     Returns paths and URLs to generated DOCX and PDF files.
+    With `?stream=docx|pdf` the document is rendered in memory and streamed
+    back (SHA-256 in `X-Content-SHA256`); it is only written to the output
+    directory when `persist=true`.
+    Responds 503 with Retry-After when the render queue is full.
+    With **strict** (or FORM_ENGINE_STRICT_CONTEXT) a context missing any
+    template placeholder is rejected with MISSING_VARIABLES before rendering.
     """
     try:
         engine = get_engine()
 
-        result = engine.render(
+        if is_strict(request):
+            engine.check_context(request.template_name, request.context)
+
+        if stream:
+            rendered = await get_render_executor().run(
+                engine.render_stream,
+                template_name=request.template_name,
+                context=request.context,
+                fmt=stream,
+                persist=persist,
+                user_id=request.user_id,
+                proposal_id=request.proposal_id
+            )
+            return stream_response(rendered, stream)
+
+        result = await get_render_executor().run(
+            engine.render,
             template_name=request.template_name,
             context=request.context,
             user_id=request.user_id,
@@ -58,6 +148,20 @@ async def render_form(request: RenderFormRequest):
             data=RenderFormResult(**result)
         )
 
+    except ExecutorSaturated as e:
+        logger.warning(f"Render queue full, rejecting {request.template_name}")
+        return busy_response(e)
+
+    except MissingVariables as e:
+        logger.warning(str(e))
+        return ApiResponseRenderForm(
+            success=False,
+            error={
+                "code": "MISSING_VARIABLES",
+                "message": str(e)
+            }
+        )
+
     except FileNotFoundError as e:
         logger.error(f"Template not found: {e}")
         return ApiResponseRenderForm(
@@ -79,6 +183,281 @@ async def render_form(request: RenderFormRequest):
         )
 
 
+@router.post("/render-batch", response_model=ApiResponseRenderBatch)
+async def render_batch(request: RenderBatchRequest):
+    """
+    Render several templates in one call.
+
+    - **items**: List of {template_name, context}, or
+    - **proposal_status**: Render every form required for that status
+      (e.g. FACULTY_ACCEPTANCE -> 8b, 9b, 10b, 11b)
+    - **context**: Variables shared by all templates (item context wins)
+    - **strict**: Fail items whose context misses placeholders, before rendering
+
+    DOCX files are rendered in parallel and converted to PDF in a single
+    office session. Each item reports its own success or error.
+    """
+    if bool(request.items) == bool(request.proposal_status):
+        return ApiResponseRenderBatch(
+            success=False,
+            error={
+                "code": "INVALID_REQUEST",
+                "message": "Provide either 'items' or 'proposal_status'"
+            }
+        )
+
+    if request.proposal_status:
+        if request.proposal_status.upper() not in REQUIRED_FORMS:
+            return ApiResponseRenderBatch(
+                success=False,
+                error={
+                    "code": "INVALID_STATUS",
+                    "message": f"Unknown proposal status '{request.proposal_status}'. Valid: {', '.join(REQUIRED_FORMS)}"
+                }
+            )
+        items = [{"template_name": form_template_name(form_id), "context": dict(request.context)}
+                 for form_id in get_required_forms(request.proposal_status)]
+    else:
+        items = [{"template_name": item.template_name, "context": {**request.context, **item.context}}
+                 for item in request.items]
+
+    try:
+        engine = get_engine()
+
+        # The batch renders on its own threads: one executor slot per thread
+        workers = max(1, min(len(items), get_settings().render_workers))
+        outcomes = await get_render_executor().run(
+            engine.render_batch,
+            items,
+            user_id=request.user_id,
+            proposal_id=request.proposal_id,
+            max_workers=workers,
+            strict=is_strict(request),
+            slots=workers
+        )
+
+        succeeded = sum(1 for o in outcomes if o["success"])
+        return ApiResponseRenderBatch(
+            success=succeeded > 0 or not outcomes,
+            data=RenderBatchResult(
+                total=len(outcomes),
+                succeeded=succeeded,
+                failed=len(outcomes) - succeeded,
+                items=outcomes
+            )
+        )
+
+    except ExecutorSaturated as e:
+        logger.warning("Render queue full, rejecting batch")
+        return busy_response(e)
+
+    except Exception as e:
+        logger.exception(f"Error rendering batch: {e}")
+        return ApiResponseRenderBatch(
+            success=False,
+            error={
+                "code": "RENDER_ERROR",
+                "message": str(e)
+            }
+        )
+
+
+@router.post("/dossier")
+async def render_dossier_file(
+    request: DossierRequest,
+    format: str = Query("pdf", pattern="^(docx|pdf)$", description="File to stream back")
+):
+    """
+    Render several forms into one document and stream it back.
+
+    - **forms**: Form IDs in order (e.g. ["1b", "2b", "3b"]) using the shared
+      **context**, or
+    - **items**: List of {template_name, context} (item context wins)
+
+    The forms are concatenated at the DOCX level and converted to PDF in a
+    single LibreOffice pass; each form starts on a new page and gets a PDF
+    bookmark. An identical earlier dossier (same templates and contexts) is
+    served from the result cache (`X-Cache-Hit: true`). Errors are returned
+    as JSON like /render.
+    """
+    if bool(request.forms) == bool(request.items):
+        return ApiResponseRenderForm(
+            success=False,
+            error={
+                "code": "INVALID_REQUEST",
+                "message": "Provide either 'forms' or 'items'"
+            }
+        )
+
+    if request.forms:
+        items = [{"template_name": form_template_name(form_id), "context": dict(request.context)}
+                 for form_id in request.forms]
+    else:
+        items = [{"template_name": item.template_name, "context": {**request.context, **item.context}}
+                 for item in request.items]
+
+    try:
+        engine = get_engine()
+        result = await get_render_executor().run(
+            render_dossier,
+            engine,
+            items,
+            user_id=request.user_id,
+            proposal_id=request.proposal_id,
+            strict=is_strict(request),
+            require_pdf=format == "pdf"
+        )
+
+        path = result[f"{format}_path"]
+        if not path:
+            return ApiResponseRenderForm(
+                success=False,
+                error={
+                    "code": "PDF_CONVERSION_FAILED",
+                    "message": "PDF conversion failed"
+                }
+            )
+
+        filename = os.path.basename(result["docx_path"]).rsplit(".", 1)[0] + f".{format}"
+        return FileResponse(
+            os.path.join(engine.output_dir, path),
+            media_type=STREAM_MEDIA_TYPES[format],
+            filename=filename,
+            headers={
+                "X-Content-SHA256": result[f"sha256_{format}"],
+                "X-File-Url": result[f"{format}_url"],
+                "X-Cache-Hit": str(result["cache_hit"]).lower(),
+            }
+        )
+
+    except ExecutorSaturated as e:
+        logger.warning("Render queue full, rejecting dossier")
+        return busy_response(e)
+
+    except MissingVariables as e:
+        logger.warning(str(e))
+        return ApiResponseRenderForm(
+            success=False,
+            error={
+                "code": "MISSING_VARIABLES",
+                "message": str(e)
+            }
+        )
+
+    except FileNotFoundError as e:
+        logger.error(f"Template not found: {e}")
+        return ApiResponseRenderForm(
+            success=False,
+            error={
+                "code": "TEMPLATE_NOT_FOUND",
+                "message": str(e)
+            }
+        )
+
+    except Exception as e:
+        logger.exception(f"Error rendering dossier: {e}")
+        return ApiResponseRenderForm(
+            success=False,
+            error={
+                "code": "RENDER_ERROR",
+                "message": str(e)
+            }
+        )
+
+
+@router.post("/merge", response_model=ApiResponseMerge)
+async def merge_forms(
+    file: UploadFile = File(..., description="CSV (header = variable names) or JSONL (one context per line)"),
+    template_name: str = Form(..., description="Template file name (e.g., 1b.docx)"),
+    format: str = Form("docx", pattern="^(docx|pdf|both)$", description="Files per row"),
+    name_field: Optional[str] = Form(None, description="Context key appended to each file name"),
+    user_id: str = Form("system"),
+    proposal_id: Optional[str] = Form(None, description="Audit proposal ID for rows without a proposal_id"),
+    strict: Optional[bool] = Form(None, description="Fail rows whose context misses placeholders")
+):
+    """
+    Mail merge: render one template for every row of an uploaded CSV/JSONL file.
+
+    The template is parsed once, rows are read lazily and rendered in
+    parallel, PDFs are converted in batches, and everything is written into
+    one zip archive in the output directory together with `manifest.jsonl`
+    (file names, SHA256 and error per row). Failed rows do not stop the merge.
+    """
+    try:
+        input_format = detect_input_format(file.filename or "")
+    except ValueError as e:
+        return ApiResponseMerge(success=False, error={"code": "INVALID_INPUT", "message": str(e)})
+
+    engine = get_engine()
+    if engine.get_template_info(template_name) is None:
+        return ApiResponseMerge(
+            success=False,
+            error={
+                "code": "TEMPLATE_NOT_FOUND",
+                "message": f"Template '{template_name}' not found"
+            }
+        )
+
+    target = engine._get_output_path(template_name.replace(".docx", "") + "_merge", "zip")
+    merge = MailMerge(
+        engine,
+        user_id=user_id,
+        proposal_id=proposal_id,
+        strict=strict if strict is not None else get_settings().strict_context,
+        name_field=name_field
+    )
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+
+    try:
+        # The merge renders and converts on its own threads: one executor slot per thread
+        summary = await get_render_executor().run(
+            merge.run, template_name, iter_contexts(stream, input_format), target, format,
+            slots=merge.threads(format)
+        )
+
+        relative_path = os.path.relpath(target, engine.output_dir)
+        return ApiResponseMerge(
+            success=summary["succeeded"] > 0 or summary["total"] == 0,
+            data=MergeResult(
+                zip_path=relative_path,
+                zip_url=f"{engine.base_url}/files/{relative_path}",
+                **{k: v for k, v in summary.items() if k != "output"}
+            )
+        )
+
+    except ExecutorSaturated as e:
+        os.remove(target)
+        logger.warning(f"Render queue full, rejecting merge of {template_name}")
+        return busy_response(e)
+
+    except Exception as e:
+        logger.exception(f"Error merging {template_name}: {e}")
+        if os.path.exists(target):
+            os.remove(target)
+        return ApiResponseMerge(
+            success=False,
+            error={
+                "code": "MERGE_ERROR",
+                "message": str(e)
+            }
+        )
+
+    finally:
+        stream.detach()
+
+
+@router.get("/queue", response_model=ApiResponseQueueStats)
+async def get_queue_stats():
+    """
+    Render queue statistics: in-flight, queued and rejected renders and
+    recent queue wait times.
+    """
+    return ApiResponseQueueStats(
+        success=True,
+        data=QueueStats(**get_render_executor().stats())
+    )
+
+
 @router.get("/templates", response_model=ApiResponseTemplates)
 async def list_templates():
     """
@@ -177,3 +556,33 @@ async def get_template_info(template_name: str):
                 "message": str(e)
             }
         )
+
+
+@router.get("/templates/{template_name}/schema", response_model=ApiResponseTemplateSchema)
+async def get_template_schema(template_name: str):
+    """
+    Placeholders a template expects, by location (body, tables, headers,
+    footers). Served from the template registry.
+
+    - **template_name**: Name of the template file
+    """
+    template_info = get_engine().get_template_info(template_name)
+
+    if template_info is None:
+        return ApiResponseTemplateSchema(
+            success=False,
+            error={
+                "code": "TEMPLATE_NOT_FOUND",
+                "message": f"Template '{template_name}' not found"
+            }
+        )
+
+    return ApiResponseTemplateSchema(
+        success=True,
+        data=TemplateSchema(
+            name=template_info["name"],
+            sha256=template_info["sha256"],
+            placeholders=template_info["placeholders"],
+            **template_info["schema"]
+        )
+    )
@@ -1,31 +1,38 @@
 """
 Health check API routes
+
+All endpoints answer from memory: component status comes from the
+background HealthMonitor, render queue saturation from the executor.
 """
 
 from fastapi import APIRouter
-import subprocess
+from fastapi.responses import JSONResponse
 import datetime
-import logging
 
-from ..schemas import HealthStatus
+from ..schemas import HealthStatus, ReadinessStatus
 from ...core.config import get_settings
-from ...core.engine import FormEngine
+from ...core.health import get_health_monitor
 
-logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Health"])
 
 
-def check_libreoffice() -> bool:
-    """Check if LibreOffice is available"""
-    try:
-        result = subprocess.run(
-            ["soffice", "--version"],
-            capture_output=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except Exception:
-        return False
+@router.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: the process is up and the event loop responds.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", response_model=ReadinessStatus, responses={503: {"model": ReadinessStatus}})
+async def readiness():
+    """
+    Readiness probe: 200 while the service can take renders, 503 when a
+    required component is down, the render queue is full or the checks are
+    stale.
+    """
+    status = get_health_monitor().readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
 
 @router.get("/health", response_model=HealthStatus)
@@ -33,24 +40,21 @@ async def health_check():
     """
     Health check endpoint.
 
-    Returns service status, version, and availability of components.
+    Returns service status, version, and availability of components. The
+    status reflects component failures only; a full render queue is
+    reported by /health/ready.
     """
     settings = get_settings()
-
-    try:
-        engine = FormEngine()
-        templates = engine.get_available_templates()
-        templates_count = len(templates)
-    except Exception as e:
-        logger.error(f"Error checking templates: {e}")
-        templates_count = 0
+    monitor = get_health_monitor()
+    components = monitor.readiness()["components"]
 
     return HealthStatus(
-        status="healthy",
+        status="healthy" if monitor.healthy() else "unhealthy",
         version=settings.app_version,
-        templates_available=templates_count,
-        libreoffice_available=check_libreoffice(),
-        timestamp=datetime.datetime.now().isoformat()
+        templates_available=components.get("templates", {}).get("count", 0),
+        libreoffice_available=components.get("libreoffice", {}).get("alive", 0) > 0,
+        timestamp=datetime.datetime.now().isoformat(),
+        components=components
     )
 
 
@@ -0,0 +1,92 @@
+"""
+Asynchronous render job API routes
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+import asyncio
+import logging
+
+from ..schemas import (
+    RenderJobRequest,
+    RenderJob,
+    ApiResponseRenderJob
+)
+from ...core.engine import MissingVariables
+from ...core.jobs import get_job_store, get_job_runner
+from .forms import get_engine, is_strict
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/forms/jobs", tags=["Jobs"])
+
+
+@router.post("", response_model=ApiResponseRenderJob, status_code=202)
+async def create_render_job(request: RenderJobRequest):
+    """
+    Enqueue a render and return immediately with the job id.
+
+    Poll `GET /api/v1/forms/jobs/{id}` for the result, or pass
+    **callback_url** to receive the finished job as a POST.
+    With **strict** the context is checked against the template before the
+    job is queued.
+    """
+    try:
+        if is_strict(request):
+            await asyncio.to_thread(get_engine().check_context, request.template_name, request.context)
+
+        job = await asyncio.to_thread(
+            get_job_store().create,
+            template_name=request.template_name,
+            context=request.context,
+            user_id=request.user_id,
+            proposal_id=request.proposal_id,
+            callback_url=request.callback_url
+        )
+        get_job_runner().notify()
+        logger.info(f"Queued render job {job['id']} for {request.template_name}")
+
+        return ApiResponseRenderJob(success=True, data=RenderJob(**job))
+
+    except MissingVariables as e:
+        return JSONResponse(
+            status_code=422,
+            content={
+                "success": False,
+                "error": {
+                    "code": "MISSING_VARIABLES",
+                    "message": str(e)
+                }
+            }
+        )
+
+    except Exception as e:
+        logger.exception(f"Error queueing render job: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": {
+                    "code": "JOB_QUEUE_ERROR",
+                    "message": str(e)
+                }
+            }
+        )
+
+
+@router.get("/{job_id}", response_model=ApiResponseRenderJob)
+async def get_render_job(job_id: str):
+    """
+    Get status and, once finished, the result of a render job.
+    """
+    job = await asyncio.to_thread(get_job_store().get, job_id)
+
+    if job is None:
+        return ApiResponseRenderJob(
+            success=False,
+            error={
+                "code": "JOB_NOT_FOUND",
+                "message": f"Job '{job_id}' not found"
+            }
+        )
+
+    return ApiResponseRenderJob(success=True, data=RenderJob(**job))
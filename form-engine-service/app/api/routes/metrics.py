@@ -0,0 +1,19 @@
+"""
+Prometheus metrics route
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ...core.metrics import render_latest, CONTENT_TYPE_LATEST
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint: render stage histograms, PDF conversion
+    failure/timeout counters, queue, cache, office pool and disk gauges.
+    """
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -3,9 +3,12 @@ API Request/Response schemas
 """
 
 from typing import Dict, Any, Optional, List
-from pydantic import BaseModel, Field
+from urllib.parse import urlsplit
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 
+from ..core.config import get_settings
+
 
 # =============================================================================
 # Request Schemas
@@ -17,6 +20,7 @@ class RenderFormRequest(BaseModel):
     context: Dict[str, Any] = Field(default_factory=dict, description="Variables to replace in template")
     user_id: str = Field(default="system", description="ID of user generating document")
     proposal_id: Optional[str] = Field(None, description="Optional proposal ID for tracking")
+    strict: Optional[bool] = Field(None, description="Reject the request if the context misses placeholders (default: server setting)")
 
     model_config = {
         "json_schema_extra": {
@@ -37,6 +41,66 @@ class RenderFormRequest(BaseModel):
     }
 
 
+class BatchRenderItem(BaseModel):
+    """One template to render in a batch"""
+    template_name: str = Field(..., description="Name of template file (e.g., '8b.docx')")
+    context: Dict[str, Any] = Field(default_factory=dict, description="Variables for this template (merged over the batch context)")
+
+
+class RenderBatchRequest(BaseModel):
+    """Request to render several templates at once"""
+    items: Optional[List[BatchRenderItem]] = Field(None, description="Templates to render")
+    proposal_status: Optional[str] = Field(None, description="Render all forms required for this status (e.g., 'FACULTY_ACCEPTANCE')")
+    context: Dict[str, Any] = Field(default_factory=dict, description="Variables shared by all templates")
+    user_id: str = Field(default="system", description="ID of user generating documents")
+    proposal_id: Optional[str] = Field(None, description="Optional proposal ID for tracking")
+    strict: Optional[bool] = Field(None, description="Fail items whose context misses placeholders (default: server setting)")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "proposal_status": "FACULTY_ACCEPTANCE",
+                "context": {
+                    "ten_de_tai": "Nghien cuu ung dung AI trong giao duc",
+                    "ma_de_tai": "NCKH-2024-01"
+                },
+                "user_id": "user_123",
+                "proposal_id": "proposal_456"
+            }
+        }
+    }
+
+
+class DossierRequest(BaseModel):
+    """Request to render several forms into one combined document"""
+    forms: Optional[List[str]] = Field(None, description="Form IDs in dossier order (e.g., ['1b', '2b', '3b'])")
+    items: Optional[List[BatchRenderItem]] = Field(None, description="Templates with their own context, in order")
+    context: Dict[str, Any] = Field(default_factory=dict, description="Variables shared by all forms")
+    user_id: str = Field(default="system", description="ID of user generating the dossier")
+    proposal_id: Optional[str] = Field(None, description="Proposal ID (also used in the file name)")
+    strict: Optional[bool] = Field(None, description="Reject contexts missing placeholders (default: server setting)")
+
+
+class RenderJobRequest(RenderFormRequest):
+    """Request to enqueue an asynchronous render"""
+    callback_url: Optional[str] = Field(None, description="URL that receives a POST with the job once it finishes")
+
+    @field_validator("callback_url")
+    @classmethod
+    def check_callback_url(cls, value: Optional[str]) -> Optional[str]:
+        """Only http(s) URLs, and only to the configured hosts when an allow-list is set"""
+        if not value:
+            return None
+        parts = urlsplit(value)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("callback_url must be an http or https URL")
+        allowed = get_settings().job_callback_allowed_hosts
+        hosts = {h.strip().lower() for h in allowed.split(",") if h.strip()}
+        if hosts and parts.hostname.lower() not in hosts:
+            raise ValueError(f"callback_url host '{parts.hostname}' is not allowed")
+        return value
+
+
 # =============================================================================
 # Response Schemas
 # =============================================================================
@@ -53,6 +117,60 @@ class RenderFormResult(BaseModel):
     proposal_id: Optional[str]
     sha256_docx: str
     sha256_pdf: Optional[str]
+    cache_hit: bool = Field(default=False, description="True if an identical earlier render was reused")
+
+
+class BatchRenderItemResult(BaseModel):
+    """Outcome of one template in a batch"""
+    template_name: str
+    success: bool
+    data: Optional[RenderFormResult] = None
+    error: Optional[Dict[str, str]] = None
+
+
+class RenderBatchResult(BaseModel):
+    """Result of a batch render"""
+    total: int
+    succeeded: int
+    failed: int
+    items: List[BatchRenderItemResult]
+
+
+class MergeRowError(BaseModel):
+    """A failed row of a mail merge"""
+    index: int = Field(..., description="Row number in the input (1-based)")
+    name: str
+    error: Dict[str, str]
+
+
+class MergeResult(BaseModel):
+    """Result of a mail merge"""
+    template: str
+    format: str
+    total: int
+    succeeded: int
+    failed: int
+    seconds: float
+    zip_path: str
+    zip_url: str
+    sha256: str = Field(..., description="SHA256 of the zip archive")
+    errors: List[MergeRowError] = Field(default_factory=list, description="First failed rows (all are in manifest.jsonl)")
+
+
+class RenderJob(BaseModel):
+    """Status of an asynchronous render job"""
+    id: str
+    status: str = Field(..., description="queued | running | succeeded | failed")
+    template_name: str
+    user_id: str
+    proposal_id: Optional[str]
+    callback_url: Optional[str]
+    created_at: str
+    started_at: Optional[str]
+    finished_at: Optional[str]
+    attempts: int
+    result: Optional[RenderFormResult] = None
+    error: Optional[Dict[str, str]] = None
 
 
 class TemplateInfo(BaseModel):
@@ -61,6 +179,57 @@ class TemplateInfo(BaseModel):
     path: str
     size: int
     modified: str
+    sha256: Optional[str] = Field(default=None, description="SHA256 of the template file")
+    placeholders: List[str] = Field(default_factory=list, description="Names of the {{...}} tags in the template")
+
+
+class TemplateSchema(BaseModel):
+    """Placeholders a template uses, by location"""
+    name: str
+    sha256: str
+    placeholders: List[str] = Field(..., description="All placeholder names")
+    body: List[str]
+    tables: List[str]
+    headers: List[str]
+    footers: List[str]
+    lists: Dict[str, List[str]] = Field(
+        default_factory=dict, description="Repeating table rows: list name -> item fields"
+    )
+
+
+class QueueStats(BaseModel):
+    """Render executor saturation"""
+    workers: int
+    max_queue: int
+    in_flight: int
+    running: int
+    queued: int
+    completed: int
+    rejected: int
+    avg_wait_ms: float
+    p95_wait_ms: float
+
+
+class AuditRecord(BaseModel):
+    """One audit log entry"""
+    template: Optional[str] = None
+    timestamp: str
+    user_id: Optional[str] = None
+    proposal_id: Optional[str] = None
+    docx_path: Optional[str] = None
+    pdf_path: Optional[str] = None
+    sha256_docx: Optional[str] = None
+    sha256_pdf: Optional[str] = None
+    cache_hit: bool = False
+    streamed: Optional[str] = Field(default=None, description="docx | pdf if the output was streamed, not stored")
+
+
+class AuditPage(BaseModel):
+    """A page of audit records, newest first"""
+    total: int
+    page: int
+    page_size: int
+    items: List[AuditRecord]
 
 
 class HealthStatus(BaseModel):
@@ -70,6 +239,15 @@ class HealthStatus(BaseModel):
     templates_available: int
     libreoffice_available: bool
     timestamp: str
+    components: Dict[str, Any] = Field(default_factory=dict, description="Per-component status from the last check")
+
+
+class ReadinessStatus(BaseModel):
+    """Readiness probe response"""
+    ready: bool
+    stale: bool = Field(..., description="True if the background checks have not run recently")
+    checked_at: Optional[str]
+    components: Dict[str, Any]
 
 
 class ApiResponse(BaseModel):
@@ -87,6 +265,41 @@ class ApiResponseRenderForm(BaseModel):
     error: Optional[Dict[str, str]] = None
 
 
+class ApiResponseRenderBatch(BaseModel):
+    """API response for batch rendering"""
+    success: bool
+    data: Optional[RenderBatchResult] = None
+    error: Optional[Dict[str, str]] = None
+
+
+class ApiResponseMerge(BaseModel):
+    """API response for a mail merge"""
+    success: bool
+    data: Optional[MergeResult] = None
+    error: Optional[Dict[str, str]] = None
+
+
+class ApiResponseRenderJob(BaseModel):
+    """API response for a render job"""
+    success: bool
+    data: Optional[RenderJob] = None
+    error: Optional[Dict[str, str]] = None
+
+
+class ApiResponseQueueStats(BaseModel):
+    """API response for render queue statistics"""
+    success: bool
+    data: Optional[QueueStats] = None
+    error: Optional[Dict[str, str]] = None
+
+
+class ApiResponseAudit(BaseModel):
+    """API response for audit search"""
+    success: bool
+    data: Optional[AuditPage] = None
+    error: Optional[Dict[str, str]] = None
+
+
 class ApiResponseTemplates(BaseModel):
     """API response for templates list"""
     success: bool
@@ -99,3 +312,10 @@ class ApiResponseTemplateInfo(BaseModel):
     success: bool
     data: Optional[TemplateInfo] = None
     error: Optional[Dict[str, str]] = None
+
+
+class ApiResponseTemplateSchema(BaseModel):
+    """API response for template schema"""
+    success: bool
+    data: Optional[TemplateSchema] = None
+    error: Optional[Dict[str, str]] = None
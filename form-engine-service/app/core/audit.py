@@ -0,0 +1,220 @@
+"""
+Audit log writer
+
+Render requests only enqueue their audit record; a background thread writes
+records in batches (one write + one fsync per batch), rotates the JSONL file
+by size and by day, and gzips rotated segments. An exclusive lock on a
+sidecar lock file keeps multiple uvicorn workers from interleaving lines or
+rotating under each other. After each batch is on disk, registered
+listeners (the queryable audit store) receive the same records; records a
+listener failed on are offered again with the next batch.
+"""
+
+import os
+import gzip
+import json
+import time
+import queue
+import shutil
+import logging
+import datetime
+import threading
+from typing import Dict, Any, List, Optional, Callable
+
+from .config import get_settings
+from .metrics import observe_audit_write
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process locking only
+    fcntl = None
+
+
+class AuditWriter:
+    """Buffered, rotating JSONL writer backed by one daemon thread"""
+
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_bytes: int = None,
+        rotate_daily: bool = None,
+        compress: bool = None,
+        fsync: bool = None,
+    ):
+        settings = get_settings()
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.batch_size = batch_size or settings.audit_batch_size
+        self.flush_interval = flush_interval or settings.audit_flush_interval
+        self.max_bytes = max_bytes or settings.audit_max_bytes
+        self.rotate_daily = settings.audit_rotate_daily if rotate_daily is None else rotate_daily
+        self.compress = settings.audit_compress if compress is None else compress
+        self.fsync = settings.audit_fsync if fsync is None else fsync
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue or settings.audit_queue_size)
+        self._thread_lock = threading.Lock()
+        self._listeners: List[Callable[[List[Dict[str, Any]]], Any]] = []
+        self._listener_lock = threading.Lock()
+        self._unindexed: Dict[Callable, List[Dict[str, Any]]] = {}
+        self._max_unindexed = settings.audit_queue_size
+        self._thread = threading.Thread(target=self._loop, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]):
+        """Queue a record; writes synchronously if the queue is full so nothing is dropped"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            logger.warning("Audit queue full, writing synchronously")
+            self._write_batch([record])
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], Any]):
+        """Call listener(records) after every batch that reached the JSONL file"""
+        self._listeners.append(listener)
+
+    def flush(self):
+        """Block until every record queued so far is on disk"""
+        self._queue.join()
+
+    def close(self):
+        """Flush and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            stop = first is None
+            deadline = datetime.datetime.now() + datetime.timedelta(seconds=self.flush_interval)
+            while not stop and len(batch) < self.batch_size:
+                remaining = (deadline - datetime.datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(record)
+                stop = record is None
+
+            records = [r for r in batch if r is not None]
+            try:
+                if records:
+                    self._write_batch(records)
+            except Exception as e:
+                logger.error(f"Audit write failed for {len(records)} record(s): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, records: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        rotated = None
+
+        with self._thread_lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                rotated = self._rotate_if_needed(len(data))
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data)
+                    if self.fsync:
+                        os.fsync(fd)
+                finally:
+                    os.close(fd)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        observe_audit_write(time.perf_counter() - started)
+
+        if rotated and self.compress:
+            self._compress(rotated)
+
+        # The JSONL file stays the source of truth. A failing listener keeps
+        # its records for the next batch (the audit store ignores duplicates);
+        # whatever is still missing after a restart is backfilled from
+        # audit.jsonl (audit_store.backfill_audit_index)
+        with self._listener_lock:
+            for listener in self._listeners:
+                pending = self._unindexed.pop(listener, []) + records
+                try:
+                    listener(pending)
+                except Exception as e:
+                    if len(pending) > self._max_unindexed:
+                        logger.error(
+                            f"Dropping {len(pending) - self._max_unindexed} unindexed audit record(s); "
+                            f"run 'python -m app.core.audit_store reindex' once the index is writable"
+                        )
+                        pending = pending[-self._max_unindexed:]
+                    self._unindexed[listener] = pending
+                    logger.error(f"Audit listener failed, {len(pending)} record(s) not indexed yet: {e}")
+
+    def _rotate_if_needed(self, incoming: int) -> Optional[str]:
+        """Rename the current file if it is too big or from an earlier day; caller holds the lock"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        modified = datetime.datetime.fromtimestamp(stat.st_mtime)
+        too_big = stat.st_size > 0 and stat.st_size + incoming > self.max_bytes
+        new_day = self.rotate_daily and modified.date() != datetime.date.today()
+        if not (too_big or new_day):
+            return None
+
+        base, ext = os.path.splitext(self.path)
+        rotated = f"{base}-{modified.strftime('%Y%m%d-%H%M%S')}{ext}"
+        suffix = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+            rotated = f"{base}-{modified.strftime('%Y%m%d-%H%M%S')}-{suffix}{ext}"
+            suffix += 1
+        os.rename(self.path, rotated)
+        logger.info(f"Rotated audit log to {rotated}")
+        return rotated
+
+    @staticmethod
+    def _compress(path: str):
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except Exception as e:
+            logger.warning(f"Could not compress rotated audit log {path}: {e}")
+
+
+# One writer per audit file in the process
+_writers: Dict[str, AuditWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_audit_writer(log_dir: str) -> AuditWriter:
+    path = os.path.abspath(os.path.join(log_dir, "audit.jsonl"))
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = AuditWriter(path)
+            if get_settings().audit_index_enabled:
+                from .audit_store import get_audit_store
+                writer.add_listener(get_audit_store(log_dir).insert_many)
+            _writers[path] = writer
+        return writer
+
+
+def close_audit_writers():
+    """Flush and stop every writer (application shutdown)"""
+    with _writers_lock:
+        for writer in _writers.values():
+            writer.close()
+        _writers.clear()
@@ -0,0 +1,254 @@
+"""
+Queryable audit store
+
+SQLite (WAL) index of audit records with indexes on proposal, user, template
+and timestamp, fed by the audit writer after each batch. Existing JSONL
+audit files can be imported once with:
+
+    python -m app.core.audit_store import logs/audit.jsonl [more.jsonl.gz ...]
+
+and the whole log directory (current file and rotated segments) re-read
+into the index with:
+
+    python -m app.core.audit_store reindex [--log-dir logs]
+
+On startup the current audit.jsonl is re-imported in the background, so
+records whose indexing failed before a restart are not lost from queries.
+"""
+
+import os
+import glob
+import gzip
+import json
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterable, Tuple, Set
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_hash TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    template TEXT,
+    user_id TEXT,
+    proposal_id TEXT,
+    docx_path TEXT,
+    pdf_path TEXT,
+    sha256_docx TEXT,
+    sha256_pdf TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_audit_proposal ON audit (proposal_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_user ON audit (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_template ON audit (template, timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit (timestamp);
+"""
+
+
+def _normalize(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Map legacy modul_create_temple records ({docx, pdf, user}) onto service field names"""
+    if "docx_path" not in record and "docx" in record:
+        record = dict(record)
+        record["docx_path"] = record.pop("docx")
+        record["pdf_path"] = record.pop("pdf", None)
+        record["user_id"] = record.pop("user", None)
+        if record["docx_path"]:
+            stem = os.path.basename(record["docx_path"]).rsplit("_", 1)[0]
+            record.setdefault("template", f"{stem}.docx")
+    return record
+
+
+class AuditStore:
+    """Indexed, queryable copy of the audit log"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def insert_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Insert records, ignoring ones already stored. Returns the number inserted."""
+        rows = []
+        for record in records:
+            record = _normalize(record)
+            raw = json.dumps(record, ensure_ascii=False, sort_keys=True)
+            rows.append((
+                hashlib.sha256(raw.encode("utf-8")).hexdigest(),
+                record.get("timestamp") or "",
+                record.get("template"),
+                record.get("user_id"),
+                record.get("proposal_id"),
+                record.get("docx_path"),
+                record.get("pdf_path"),
+                record.get("sha256_docx"),
+                record.get("sha256_pdf"),
+                raw,
+            ))
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO audit (record_hash, timestamp, template, user_id, proposal_id, "
+                "docx_path, pdf_path, sha256_docx, sha256_pdf, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            inserted = conn.total_changes - before
+            conn.execute("COMMIT")
+        return inserted
+
+    def query(
+        self,
+        proposal_id: str = None,
+        user_id: str = None,
+        template: str = None,
+        date_from: str = None,
+        date_to: str = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Filter records, newest first.
+
+        Args:
+            date_from, date_to: ISO timestamps or dates; date_to is inclusive
+
+        Returns:
+            (total matching, page of records)
+        """
+        clauses, params = [], []
+        for column, value in (("proposal_id", proposal_id), ("user_id", user_id), ("template", template)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if date_from:
+            clauses.append("timestamp >= ?")
+            params.append(date_from)
+        if date_to:
+            # A bare date covers the whole day
+            clauses.append("timestamp <= ?")
+            params.append(date_to + "T23:59:59.999999" if len(date_to) == 10 else date_to)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM audit {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT record FROM audit {where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return total, [json.loads(row["record"]) for row in rows]
+
+    def referenced_paths(self) -> Set[str]:
+        """DOCX/PDF paths of every record filed against a proposal (kept by the output sweeper)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT docx_path, pdf_path FROM audit WHERE proposal_id IS NOT NULL AND proposal_id != ''"
+            ).fetchall()
+        return {path for row in rows for path in (row["docx_path"], row["pdf_path"]) if path}
+
+    def import_jsonl(self, path: str, batch_size: int = 1000) -> int:
+        """Import a JSONL (optionally .gz) audit file; safe to run more than once"""
+        opener = gzip.open if path.endswith(".gz") else open
+        inserted, batch = 0, []
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"{path}:{line_no}: skipping malformed line")
+                    continue
+                if len(batch) >= batch_size:
+                    inserted += self.insert_many(batch)
+                    batch = []
+        inserted += self.insert_many(batch)
+        return inserted
+
+
+# One store per database file in the process
+_stores: Dict[str, AuditStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_audit_store(log_dir: str) -> AuditStore:
+    path = os.path.abspath(os.path.join(log_dir, "audit.db"))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = AuditStore(path)
+            _stores[path] = store
+        return store
+
+
+def audit_files(log_dir: str, rotated: bool = True) -> List[str]:
+    """audit.jsonl of log_dir, preceded by its rotated segments (oldest first) when rotated is set"""
+    paths = []
+    if rotated:
+        paths = sorted(glob.glob(os.path.join(log_dir, "audit-*.jsonl")) +
+                       glob.glob(os.path.join(log_dir, "audit-*.jsonl.gz")))
+    current = os.path.join(log_dir, "audit.jsonl")
+    if os.path.exists(current):
+        paths.append(current)
+    return paths
+
+
+def backfill_audit_index(log_dir: str) -> int:
+    """
+    Import the current audit.jsonl into the index (startup). Records already
+    indexed are skipped; any that are added had been written to the log but
+    missed by the index, which is logged as a warning.
+    """
+    store = get_audit_store(log_dir)
+    inserted = 0
+    for path in audit_files(log_dir, rotated=False):
+        try:
+            inserted += store.import_jsonl(path)
+        except Exception as e:
+            logger.error(f"Could not backfill the audit index from {path}: {e}")
+    if inserted:
+        logger.warning(f"Audit index was missing {inserted} record(s) of audit.jsonl; backfilled")
+    return inserted
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Audit store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    importer = sub.add_parser("import", help="Import JSONL audit files into the store")
+    importer.add_argument("files", nargs="+", help="audit.jsonl / audit-*.jsonl.gz files")
+    importer.add_argument("--log-dir", default=None, help="Log directory holding audit.db (default: settings)")
+    reindex = sub.add_parser("reindex", help="Re-import audit.jsonl and its rotated segments from the log directory")
+    reindex.add_argument("--log-dir", default=None, help="Log directory (default: settings)")
+    args = parser.parse_args(argv)
+
+    log_dir = args.log_dir or get_settings().log_dir
+    store = get_audit_store(log_dir)
+    files = args.files if args.command == "import" else audit_files(log_dir)
+    for path in files:
+        count = store.import_jsonl(path)
+        print(f"{path}: {count} new record(s)")
+
+
+if __name__ == "__main__":
+    main()
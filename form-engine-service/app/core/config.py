@@ -23,6 +23,72 @@ class Settings(BaseSettings):
     # File serving
     base_url: str = "http://localhost:8080"
 
+    # LibreOffice conversion pool
+    office_binary: str = "soffice"
+    office_pool_size: int = 2
+    office_base_port: int = 2002
+    office_profile_dir: str = ""  # Empty = <tmp>/form-engine-office
+    office_job_timeout: int = 60
+    office_acquire_timeout: int = 30
+    office_max_jobs_per_worker: int = 200  # Recycle workers to bound LibreOffice memory growth
+    office_port_span: int = 16  # Ports per worker, so several service processes can share a host
+
+    # Render executor
+    render_workers: int = 4
+    render_max_queue: int = 16  # Renders waiting beyond the workers before returning 503
+
+    # Asynchronous render jobs
+    jobs_db: str = ""  # Empty = <log_dir>/jobs.db
+    job_workers: int = 2
+    job_poll_interval: float = 2.0
+    job_callback_timeout: float = 10.0
+    job_lease_seconds: float = 60.0  # A running job whose process stops renewing this is requeued
+    job_max_attempts: int = 3  # Interrupted this often (crash, lost lease), a job is failed instead
+    job_timeout: float = 600.0  # A render running longer fails its job
+    job_callback_allowed_hosts: str = ""  # Comma-separated callback hosts; empty = any http(s) host
+
+    # Render result cache (identical template + context -> existing files)
+    result_cache_enabled: bool = True
+    result_cache_db: str = ""  # Empty = <log_dir>/render_cache.db
+    result_cache_max_entries: int = 10000
+    result_cache_max_indexed_bytes: int = 2 * 1024 * 1024 * 1024  # Not a disk limit: see output_quota_bytes
+    result_cache_max_age_hours: int = 24 * 7
+
+    # Audit log (background writer, rotation)
+    audit_queue_size: int = 10000
+    audit_batch_size: int = 500
+    audit_flush_interval: float = 1.0
+    audit_fsync: bool = True
+    audit_max_bytes: int = 50 * 1024 * 1024
+    audit_rotate_daily: bool = True
+    audit_compress: bool = True
+    audit_index_enabled: bool = True  # Mirror records into <log_dir>/audit.db for GET /audit
+
+    # Output storage (collision-free names, hardlink dedup, retention sweeper)
+    output_dedup: bool = True  # Hardlink byte-identical outputs to one stored copy
+    output_retention_days: int = 0  # Delete files older than this; 0 = keep forever
+    output_quota_bytes: int = 0  # Delete oldest files beyond this much disk use; 0 = no quota
+    output_keep_audited: bool = True  # Never delete files audited against a proposal
+    output_sweep_interval: float = 3600.0
+
+    # Health monitor
+    health_check_interval: float = 10.0  # Seconds between background component checks
+
+    # Parsed template cache
+    template_cache_max_entries: int = 64
+    template_cache_max_bytes: int = 64 * 1024 * 1024
+    fast_render: bool = True  # Render templates without repeating rows on lxml + zip passthrough
+    docx_compress_level: int = 6  # Deflate level (0-9) of the parts a render rewrites; others are copied as stored
+
+    # Reject renders whose context misses template placeholders (per-request `strict` overrides)
+    strict_context: bool = False
+
+    # Template registry (watchdog events when installed, otherwise mtime polling)
+    template_poll_interval: float = 5.0
+
+    # Bulk mail merge (POST /forms/merge, python -m app.core.merge)
+    merge_pdf_batch_size: int = 20  # Documents per LibreOffice conversion
+
     class Config:
         env_prefix = "FORM_ENGINE_"
         env_file = ".env"
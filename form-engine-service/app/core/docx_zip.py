@@ -0,0 +1,134 @@
+"""
+DOCX zip passthrough
+
+A rendered document differs from its template in a handful of XML parts.
+`DocxPackage` keeps the template's zip bytes and writes a new package in
+which the changed parts are compressed afresh and every other member
+(images, fonts, styles, themes) is copied with its original compressed bytes,
+CRC and timestamp: no inflate, no deflate. Changed parts reuse the
+template's member timestamps too, so identical renders give identical files.
+On a zipfile without the internals the raw copy relies on, members are
+inflated and written with writestr instead (same content, method and time).
+"""
+
+import io
+import copy
+import struct
+import zipfile
+from typing import Dict, Any, Optional, List
+
+# Local file header: signature, versions, flags, method, time, date, CRC,
+# sizes, then the lengths of the name and extra field that precede the data
+_LOCAL_HEADER = struct.Struct(zipfile.structFileHeader)
+_NAME_LENGTH = 10
+_EXTRA_LENGTH = 11
+
+# General purpose flag bit: CRC and sizes follow the data in a descriptor
+_DATA_DESCRIPTOR = 0x08
+
+# ZipFile attributes copy_raw_member reads or updates
+_ZIPFILE_INTERNALS = ("fp", "filelist", "NameToInfo", "start_dir", "_didModify")
+
+
+class DocxPackage:
+    """The members of a template .docx with the offsets of their compressed bytes"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._view = memoryview(data)
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.members: List[zipfile.ZipInfo] = zf.infolist()
+        self._offsets: Dict[str, int] = {}
+        for info in self.members:
+            header = _LOCAL_HEADER.unpack_from(data, info.header_offset)
+            self._offsets[info.filename] = (
+                info.header_offset + _LOCAL_HEADER.size + header[_NAME_LENGTH] + header[_EXTRA_LENGTH]
+            )
+
+    def raw(self, info: zipfile.ZipInfo) -> memoryview:
+        """Compressed bytes of one member, as stored in the template"""
+        start = self._offsets[info.filename]
+        return self._view[start:start + info.compress_size]
+
+    def write(self, target, parts: Dict[str, bytes], compresslevel: Optional[int] = None):
+        """
+        Write the package to a binary stream, replacing some members.
+
+        Args:
+            target: Writable stream (may be non-seekable)
+            parts: New content by member name (e.g. "word/document.xml");
+                names not in the template are appended
+            compresslevel: Deflate level for the replaced members (None = zlib default)
+        """
+        with zipfile.ZipFile(target, "w") as zf:
+            source = None if raw_copy_supported(zf) else zipfile.ZipFile(io.BytesIO(self.data))
+            for info in self.members:
+                content = parts.get(info.filename)
+                if content is None and source is None:
+                    copy_raw_member(zf, info, self.raw(info))
+                elif content is None:
+                    zf.writestr(_member_like(info, info.compress_type), source.read(info))
+                else:
+                    zf.writestr(_member_like(info, zipfile.ZIP_DEFLATED), content, compresslevel=compresslevel)
+            if source is not None:
+                source.close()
+            known = {info.filename for info in self.members}
+            for name, content in parts.items():
+                if name not in known:
+                    member = zipfile.ZipInfo(name)
+                    member.compress_type = zipfile.ZIP_DEFLATED
+                    zf.writestr(member, content, compresslevel=compresslevel)
+
+
+def _member_like(info: zipfile.ZipInfo, compress_type: int) -> zipfile.ZipInfo:
+    """A fresh ZipInfo with the name, timestamp and attributes of a template member"""
+    member = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    member.compress_type = compress_type
+    member.external_attr = info.external_attr
+    return member
+
+
+def raw_copy_supported(zf: zipfile.ZipFile) -> bool:
+    """Whether this zipfile implementation has what copy_raw_member needs"""
+    return all(hasattr(zf, name) for name in _ZIPFILE_INTERNALS)
+
+
+def copy_raw_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, raw) -> None:
+    """
+    Append a member to a zip being written from its already-compressed bytes.
+
+    zipfile has no public API for this, so the local header is written
+    directly and the member registered for the central directory the same
+    way ZipFile.writestr does. CRC and sizes are known up front, so the copy
+    carries them in its local header instead of a data descriptor. Check
+    raw_copy_supported(zf) first.
+    """
+    member = copy.copy(info)
+    member.flag_bits &= ~_DATA_DESCRIPTOR
+    zip64 = member.file_size > zipfile.ZIP64_LIMIT or member.compress_size > zipfile.ZIP64_LIMIT
+    member.header_offset = zf.fp.tell()
+    zf.fp.write(member.FileHeader(zip64))
+    zf.fp.write(raw)
+    zf.filelist.append(member)
+    zf.NameToInfo[member.filename] = member
+    zf.start_dir = zf.fp.tell()
+    zf._didModify = True
+
+
+class RenderedPackage:
+    """A filled document: the template package plus the root elements of its rewritten parts"""
+
+    def __init__(self, package: DocxPackage, parts: Dict[str, Any], compresslevel: Optional[int] = None):
+        self.package = package
+        self.parts = parts
+        self.compresslevel = compresslevel
+
+    def save(self, target):
+        """Same contract as python-docx Document.save: a path or a writable binary stream"""
+        from docx.opc.oxml import serialize_part_xml
+
+        if isinstance(target, str):
+            with open(target, "wb") as f:
+                return self.save(f)
+        parts = {name: serialize_part_xml(element) for name, element in self.parts.items()}
+        self.package.write(target, parts, self.compresslevel)
@@ -0,0 +1,438 @@
+"""
+Proposal dossier
+
+Renders a list of forms and concatenates them at the DOCX level (one
+section per form, each starting on a new page) so that a single LibreOffice
+pass produces the combined PDF. Numbering, styles, header/footer parts,
+notes and bookmarks of the appended forms are carried over with fresh ids.
+The first paragraph of every form ("Mau 1b: ...") becomes a top-level
+outline entry wrapped in a form_<id> bookmark, which LibreOffice exports as
+one PDF bookmark per form. Results are cached under a key built from the
+per-form render keys.
+"""
+
+import io
+import os
+import re
+import copy
+import time
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.part import Part, XmlPart
+from docx.opc.packuri import PackURI
+from docx.parts.hdrftr import HeaderPart, FooterPart
+from lxml import etree
+
+from .engine import FormEngine, save_document
+from .office import get_office_pool
+from .result_cache import render_key
+from .template_cache import get_template_cache, W_NS, W_P
+from .metrics import observe_stage, observe_render
+
+logger = logging.getLogger(__name__)
+
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# Label used for metrics, audit records and cache entries
+DOSSIER_TEMPLATE = "dossier"
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+def dossier_key(parts: List[Tuple[str, Dict[str, Any]]]) -> str:
+    """Cache key of a dossier: SHA-256 over the render keys of its forms, in order"""
+    digest = hashlib.sha256(b"dossier")
+    for template_hash, context in parts:
+        digest.update(b"\0")
+        digest.update(render_key(template_hash, context).encode("ascii"))
+    return digest.hexdigest()
+
+
+class _DocumentMerger:
+    """Appends python-docx Documents to a master document"""
+
+    def __init__(self, master):
+        self.master = master
+        self.body = master.element.body
+        ids = [int(b.get(_w("id"))) for b in self.body.iter(_w("bookmarkStart")) if b.get(_w("id"), "").isdigit()]
+        self.next_bookmark_id = max(ids, default=-1) + 1
+        self.bookmark_names = {b.get(_w("name")) for b in self.body.iter(_w("bookmarkStart"))}
+        self._blank: Dict[str, str] = {}
+
+    # -- bookmarks / outline ------------------------------------------------
+
+    def _rename_bookmarks(self, elements: List[etree._Element]):
+        """Give copied bookmarks unused ids and names"""
+        id_map = {}
+        for element in elements:
+            for start in element.iter(_w("bookmarkStart")):
+                id_map[start.get(_w("id"))] = str(self.next_bookmark_id)
+                self.next_bookmark_id += 1
+                name, suffix = start.get(_w("name")), 1
+                new_name = name
+                while new_name in self.bookmark_names:
+                    new_name = f"{name[:36]}_{suffix}"
+                    suffix += 1
+                self.bookmark_names.add(new_name)
+                start.set(_w("name"), new_name)
+            for tag in ("bookmarkStart", "bookmarkEnd"):
+                for mark in element.iter(_w(tag)):
+                    if mark.get(_w("id")) in id_map:
+                        mark.set(_w("id"), id_map[mark.get(_w("id"))])
+
+    def _mark_form(self, elements: List[etree._Element], label: str):
+        """
+        Make the form's first non-empty paragraph its top-level outline entry
+        (wrapped in a form_<label> bookmark) and nest the form's other outline
+        entries below it.
+        """
+        paragraphs = [p for element in elements for p in element.iter(W_P)]
+        title = next((p for p in paragraphs if "".join(p.itertext()).strip()), None)
+        for p in paragraphs:
+            outline = p.find(f"{_w('pPr')}/{_w('outlineLvl')}")
+            if outline is None or p is title:
+                continue
+            if not "".join(p.itertext()).strip():
+                outline.getparent().remove(outline)
+            elif outline.get(_w("val")) == "0":
+                outline.set(_w("val"), "1")
+        if title is None:
+            return
+
+        ppr = title.find(_w("pPr"))
+        if ppr is None:
+            ppr = etree.Element(_w("pPr"))
+            title.insert(0, ppr)
+        outline = ppr.find(_w("outlineLvl"))
+        if outline is None:
+            outline = etree.Element(_w("outlineLvl"))
+            # outlineLvl sits before these pPr children in the schema order
+            later = [ppr.find(_w(tag)) for tag in ("divId", "cnfStyle", "rPr", "sectPr", "pPrChange")]
+            later = [child for child in later if child is not None]
+            if later:
+                later[0].addprevious(outline)
+            else:
+                ppr.append(outline)
+        outline.set(_w("val"), "0")
+
+        name = re.sub(r"\W", "_", f"form_{label}")[:40]
+        while name in self.bookmark_names:
+            name = f"{name[:36]}_{self.next_bookmark_id}"
+        self.bookmark_names.add(name)
+        bookmark_id = str(self.next_bookmark_id)
+        self.next_bookmark_id += 1
+        ppr.addnext(etree.Element(_w("bookmarkStart"), {_w("id"): bookmark_id, _w("name"): name}))
+        title.append(etree.Element(_w("bookmarkEnd"), {_w("id"): bookmark_id}))
+
+    # -- parts ----------------------------------------------------------------
+
+    def _copy_part(self, src_part: Part) -> Part:
+        """Copy a part (and what it references) into the master package"""
+        package = self.master.part.package
+        template = re.sub(r"\d*(\.\w+)$", r"%d\1", str(src_part.partname))
+        partname = package.next_partname(template)
+        if isinstance(src_part, XmlPart):
+            new_part = type(src_part)(partname, src_part.content_type, copy.deepcopy(src_part.element), package)
+            self._remap_relationships(new_part, src_part, [new_part.element])
+        else:
+            new_part = Part(partname, src_part.content_type, src_part.blob, package)
+        return new_part
+
+    def _remap_relationships(self, dst_part: Part, src_part: Part, elements: List[etree._Element]):
+        """Re-point r:id / r:embed / r:link attributes copied from src_part to relationships of dst_part"""
+        copied = {}
+        for element in elements:
+            for node in element.iter():
+                for attr, rid in node.attrib.items():
+                    if not attr.startswith(f"{{{R_NS}}}") or rid not in src_part.rels:
+                        continue
+                    if rid not in copied:
+                        rel = src_part.rels[rid]
+                        if rel.is_external:
+                            copied[rid] = dst_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+                        elif rel.reltype == RT.IMAGE:
+                            copied[rid] = dst_part.get_or_add_image(io.BytesIO(rel.target_part.blob))[0]
+                        else:
+                            copied[rid] = dst_part.relate_to(self._copy_part(rel.target_part), rel.reltype)
+                    node.set(attr, copied[rid])
+
+    def _blank_part(self, kind: str) -> str:
+        """rId of an empty header or footer part shared by forms that have none"""
+        if kind not in self._blank:
+            part_class = HeaderPart if kind == "header" else FooterPart
+            reltype = RT.HEADER if kind == "header" else RT.FOOTER
+            self._blank[kind] = self.master.part.relate_to(part_class.new(self.master.part.package), reltype)
+        return self._blank[kind]
+
+    # -- numbering / styles / notes -------------------------------------------
+
+    def _copy_numbering(self, doc) -> Dict[str, str]:
+        """Copy list definitions with new ids; returns old numId -> new numId"""
+        src = doc.part.numbering_part.element if _has_part(doc.part, RT.NUMBERING) else None
+        if src is None or src.find(_w("num")) is None:
+            return {}
+        dst = self.master.part.numbering_part.element
+
+        abstract_nums = dst.findall(_w("abstractNum"))
+        nums = dst.findall(_w("num"))
+        next_abstract = max((int(a.get(_w("abstractNumId"))) for a in abstract_nums), default=-1) + 1
+        next_num = max((int(n.get(_w("numId"))) for n in nums), default=0) + 1
+        # Schema order: numPicBullet*, abstractNum*, num*, numIdMacAtCleanup?
+        anchor = abstract_nums[-1] if abstract_nums else (dst.findall(_w("numPicBullet")) or [None])[-1]
+
+        abstract_map = {}
+        for abstract in src.findall(_w("abstractNum")):
+            new = copy.deepcopy(abstract)
+            abstract_map[abstract.get(_w("abstractNumId"))] = str(next_abstract)
+            new.set(_w("abstractNumId"), str(next_abstract))
+            next_abstract += 1
+            # Same nsid in two forms would make Word continue one list into the other
+            nsid = new.find(_w("nsid"))
+            if nsid is not None:
+                new.remove(nsid)
+            if anchor is None:
+                dst.insert(0, new)
+            else:
+                anchor.addnext(new)
+            anchor = new
+
+        anchor = nums[-1] if nums else anchor
+        num_map = {}
+        for num in src.findall(_w("num")):
+            new = copy.deepcopy(num)
+            num_map[num.get(_w("numId"))] = str(next_num)
+            new.set(_w("numId"), str(next_num))
+            next_num += 1
+            ref = new.find(_w("abstractNumId"))
+            if ref is not None:
+                ref.set(_w("val"), abstract_map.get(ref.get(_w("val")), ref.get(_w("val"))))
+            if anchor is None:
+                dst.append(new)
+            else:
+                anchor.addnext(new)
+            anchor = new
+        return num_map
+
+    def _copy_styles(self, doc, num_map: Dict[str, str]):
+        """Add styles the master does not define (same-id styles keep the master's definition)"""
+        dst = self.master.styles.element
+        existing = {style.get(_w("styleId")) for style in dst.findall(_w("style"))}
+        for style in doc.styles.element.findall(_w("style")):
+            if style.get(_w("styleId")) not in existing:
+                new = copy.deepcopy(style)
+                _remap_num_ids([new], num_map)
+                dst.append(new)
+
+    def _copy_notes(self, doc, elements: List[etree._Element], reltype: str, tag: str):
+        """Copy footnotes or endnotes referenced by elements, renumbering the references"""
+        refs = [ref for element in elements for ref in element.iter(_w(f"{tag}Reference"))]
+        src_part = _related_part(doc.part, reltype)
+        if not refs or src_part is None:
+            return
+        src_notes = {note.get(_w("id")): note for note in etree.fromstring(src_part.blob).findall(_w(tag))}
+
+        dst_part = _related_part(self.master.part, reltype)
+        if dst_part is None:
+            # Take the source part (separators included) and empty it
+            dst_root = etree.fromstring(src_part.blob)
+            for note in dst_root.findall(_w(tag)):
+                if note.get(_w("type")) in (None, "normal"):
+                    dst_root.remove(note)
+            dst_part = Part(PackURI(str(src_part.partname)), src_part.content_type, b"", self.master.part.package)
+            self.master.part.relate_to(dst_part, reltype)
+        else:
+            dst_root = etree.fromstring(dst_part.blob)
+
+        next_id = max((int(n.get(_w("id"))) for n in dst_root.findall(_w(tag))), default=0) + 1
+        for ref in refs:
+            note = src_notes.get(ref.get(_w("id")))
+            if note is None:
+                continue
+            new = copy.deepcopy(note)
+            new.set(_w("id"), str(next_id))
+            ref.set(_w("id"), str(next_id))
+            next_id += 1
+            dst_root.append(new)
+            self._remap_relationships(dst_part, src_part, [new])
+        # Notes parts are not modelled by python-docx; replace the serialized blob
+        dst_part._blob = etree.tostring(dst_root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    # -- sections ---------------------------------------------------------------
+
+    def append(self, doc, label: str):
+        """Append doc as new section(s) starting on a new page"""
+        src_body = doc.element.body
+        src_sect = src_body.find(_w("sectPr"))
+        elements = [copy.deepcopy(child) for child in src_body if child.tag != _w("sectPr")]
+        final_sect = copy.deepcopy(src_sect) if src_sect is not None else None
+
+        num_map = self._copy_numbering(doc)
+        self._copy_styles(doc, num_map)
+        _remap_num_ids(elements, num_map)
+        self._copy_notes(doc, elements, RT.FOOTNOTES, "footnote")
+        self._copy_notes(doc, elements, RT.ENDNOTES, "endnote")
+        self._rename_bookmarks(elements)
+        self._mark_form(elements, label)
+        sections = [final_sect] if final_sect is not None else []
+        self._remap_relationships(self.master.part, doc.part, elements + sections)
+
+        # The form's first section must start on a new page and must not
+        # inherit the previous form's header/footer
+        inner = [s for element in elements for s in element.iter(_w("sectPr"))]
+        first_sect = inner[0] if inner else final_sect
+        if first_sect is not None:
+            section_type = first_sect.find(_w("type"))
+            if section_type is not None:
+                first_sect.remove(section_type)
+            for kind in ("header", "footer"):
+                if next(self.body.iter(_w(f"{kind}Reference")), None) is not None and not any(
+                    ref.get(_w("type")) == "default" for ref in first_sect.findall(_w(f"{kind}Reference"))
+                ):
+                    first_sect.insert(0, etree.Element(_w(f"{kind}Reference"), {
+                        _w("type"): "default", f"{{{R_NS}}}id": self._blank_part(kind)
+                    }))
+
+        # Close the master's last section in a paragraph of its own, then
+        # append the form and adopt its final section properties
+        master_sect = self.body.find(_w("sectPr"))
+        if master_sect is not None:
+            closing = etree.Element(W_P)
+            ppr = etree.SubElement(closing, _w("pPr"))
+            ppr.append(copy.deepcopy(master_sect))
+            master_sect.addprevious(closing)
+            anchor = master_sect
+        else:
+            anchor = None
+        for element in elements:
+            if anchor is not None:
+                anchor.addprevious(element)
+            else:
+                self.body.append(element)
+        if final_sect is not None:
+            if master_sect is not None:
+                master_sect.addprevious(final_sect)
+                self.body.remove(master_sect)
+            else:
+                self.body.append(final_sect)
+
+
+def _has_part(part: Part, reltype: str) -> bool:
+    return _related_part(part, reltype) is not None
+
+
+def _related_part(part: Part, reltype: str) -> Optional[Part]:
+    for rel in part.rels.values():
+        if rel.reltype == reltype and not rel.is_external:
+            return rel.target_part
+    return None
+
+
+def _remap_num_ids(elements: List[etree._Element], num_map: Dict[str, str]):
+    if not num_map:
+        return
+    for element in elements:
+        for num_id in element.iter(_w("numId")):
+            new = num_map.get(num_id.get(_w("val")))
+            if new is not None:
+                num_id.set(_w("val"), new)
+
+
+def merge_documents(documents: List[Tuple[str, Any]]):
+    """
+    Concatenate documents into the first one.
+
+    Args:
+        documents: (label, python-docx Document) pairs; the label names the
+            form_<label> bookmark of each part
+
+    Returns:
+        The first Document, extended in place
+    """
+    label, master = documents[0]
+    merger = _DocumentMerger(master)
+    merger._mark_form(list(master.element.body), label)
+    for label, doc in documents[1:]:
+        merger.append(doc, label)
+    return master
+
+
+def render_dossier(
+    engine: FormEngine,
+    items: List[Dict[str, Any]],
+    user_id: str = "system",
+    proposal_id: str = None,
+    strict: bool = False,
+    require_pdf: bool = True
+) -> Dict[str, Any]:
+    """
+    Render items ({"template_name", "context"}) into one DOCX and convert it once.
+
+    Returns:
+        The usual render result (paths, URLs, hashes, cache_hit) for the
+        combined document, plus "forms": the template names in order.
+        An identical earlier dossier is reused (cache_hit=True).
+
+    Raises:
+        FileNotFoundError: if a template does not exist
+        MissingVariables: with strict, if a context misses placeholders
+    """
+    started = time.perf_counter()
+    if not items:
+        raise ValueError("A dossier needs at least one form")
+    forms = [item["template_name"] for item in items]
+
+    compiled = []
+    for item in items:
+        if strict:
+            engine.check_context(item["template_name"], item.get("context") or {})
+        with observe_stage(item["template_name"], "template_load"):
+            compiled.append(get_template_cache().get(engine.template_dir, item["template_name"]))
+
+    result_cache = engine._result_cache()
+    cache_key = None
+    if result_cache is not None:
+        with observe_stage(DOSSIER_TEMPLATE, "cache_lookup"):
+            cache_key = dossier_key([(c.content_hash, item.get("context") or {}) for c, item in zip(compiled, items)])
+            cached = result_cache.lookup(cache_key, require_pdf=require_pdf and get_office_pool().available())
+        if cached is not None:
+            logger.info(f"Dossier cache hit: {cached['docx_path']}")
+            result = engine._finalize(
+                DOSSIER_TEMPLATE,
+                os.path.join(engine.output_dir, cached["docx_path"]),
+                os.path.join(engine.output_dir, cached["pdf_path"]) if cached["pdf_path"] else None,
+                user_id,
+                proposal_id,
+                sha256_docx=cached["sha256_docx"],
+                sha256_pdf=cached["sha256_pdf"],
+                cache_hit=True
+            )
+            observe_render(DOSSIER_TEMPLATE, time.perf_counter() - started, cache_hit=True)
+            return {**result, "forms": forms}
+
+    documents = []
+    for c, item in zip(compiled, items):
+        doc = engine._build_document(item["template_name"], item.get("context") or {}, compiled=c)
+        documents.append((item["template_name"].replace(".docx", ""), doc))
+
+    with observe_stage(DOSSIER_TEMPLATE, "merge"):
+        merged = merge_documents(documents)
+
+    base_name = f"dossier_{proposal_id}" if proposal_id else "dossier"
+    docx_output_path = engine._get_output_path(re.sub(r"[^\w.-]+", "_", base_name), "docx")
+    with observe_stage(DOSSIER_TEMPLATE, "save"):
+        sha256_docx = save_document(merged, docx_output_path)
+    logger.info(f"Generated dossier DOCX ({len(items)} forms): {docx_output_path}")
+
+    pdf_output_path = engine.convert_pdf(docx_output_path, DOSSIER_TEMPLATE)
+    result = engine._finalize(DOSSIER_TEMPLATE, docx_output_path, pdf_output_path, user_id, proposal_id,
+                              sha256_docx=sha256_docx)
+    if cache_key is not None:
+        result_cache.store(cache_key, DOSSIER_TEMPLATE, result["docx_path"], result["pdf_path"],
+                           result["sha256_docx"], result["sha256_pdf"])
+    observe_render(DOSSIER_TEMPLATE, time.perf_counter() - started, cache_hit=False)
+    return {**result, "forms": forms}
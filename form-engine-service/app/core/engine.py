@@ -4,15 +4,24 @@ Adapted from modul_create_temple for FastAPI service
 """
 
 import os
-import json
+import mmap
 import logging
-import subprocess
+import time
 import datetime
 import hashlib
-from typing import Dict, Any, Optional, List
-from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
 
 from .config import get_settings
+from .office import get_office_pool, ConversionTimeout
+from .template_cache import get_template_cache
+from .templates import get_template_registry
+from .result_cache import get_result_cache, render_key
+from .audit import get_audit_writer
+from .storage import get_output_storage
+from .table_rows import expand_rows
+from .substitution import substitute_paragraph, list_paragraphs, is_list_text, align_list_paragraph
+from .docx_zip import RenderedPackage
+from .metrics import observe_stage, observe_render, count_pdf_failure
 
 # Setup Logging
 logger = logging.getLogger(__name__)
@@ -66,35 +75,19 @@ def set_left_align_for_lists(doc, var_names: List[str] = None):
     - Contain variable names from var_names
     - Start with '-' (dash)
     - Start with '•' (bullet)
+
+    Renders do not call this: the rule is applied when the template is
+    compiled and, for paragraphs starting with a tag, after substitution.
     """
     try:
         from docx.enum.text import WD_ALIGN_PARAGRAPH
     except ImportError:
         return
 
-    def is_list_paragraph(text):
-        text = text.strip()
-        if var_names:
-            for var in var_names:
-                if var in text:
-                    return True
-        if text.startswith('-') or text.startswith('•'):
-            return True
-        return False
-
-    # Process body paragraphs
-    for p in doc.paragraphs:
-        if is_list_paragraph(p.text):
+    for p in list_paragraphs(doc.element.body):
+        if is_list_text(p.text, var_names):
             p.alignment = WD_ALIGN_PARAGRAPH.LEFT
 
-    # Process table paragraphs
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for p in cell.paragraphs:
-                    if is_list_paragraph(p.text):
-                        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
-
 
 def get_date_line(city: str = "Nam Dinh", day: str = None, month: str = None, year: str = None) -> str:
     """
@@ -113,12 +106,83 @@ def get_date_line(city: str = "Nam Dinh", day: str = None, month: str = None, ye
 
 
 def calculate_sha256(file_path: str) -> str:
-    """Calculate SHA256 hash of a file"""
-    sha256_hash = hashlib.sha256()
+    """
+    Calculate SHA256 hash of a file already on disk.
+
+    Uses hashlib.file_digest (Python 3.11+, large zero-copy reads) and falls
+    back to hashing an mmap of the file.
+    """
     with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return hashlib.sha256(m).hexdigest()
+
+
+class HashingWriter:
+    """
+    Write-only stream that hashes bytes on their way to the target file.
+
+    It deliberately has no seek(): zipfile then writes members sequentially
+    (sizes in data descriptors) instead of seeking back to patch headers, so
+    the digest matches the bytes on disk without reading the file back.
+    """
+
+    def __init__(self, target):
+        self._target = target
+        self._sha256 = hashlib.sha256()
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._sha256.update(data)
+        self._target.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        self._target.flush()
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+def save_document(doc, target) -> str:
+    """
+    Save a python-docx Document or RenderedPackage to a path or binary
+    stream, hashing while writing.
+
+    Returns:
+        SHA256 hex digest of the written bytes
+    """
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            return save_document(doc, f)
+    writer = HashingWriter(target)
+    doc.save(writer)
+    return writer.hexdigest()
+
+
+class MissingVariables(ValueError):
+    """Raised when a context lacks placeholders the template uses"""
+
+    def __init__(self, template_name: str, missing: List[str]):
+        super().__init__(f"Template '{template_name}' is missing variables: {', '.join(missing)}")
+        self.template_name = template_name
+        self.missing = missing
+
+
+def render_error(e: Exception) -> Dict[str, str]:
+    """API error payload for a failed render of one document"""
+    if isinstance(e, MissingVariables):
+        return {"code": "MISSING_VARIABLES", "message": str(e)}
+    if isinstance(e, FileNotFoundError):
+        return {"code": "TEMPLATE_NOT_FOUND", "message": str(e)}
+    return {"code": "RENDER_ERROR", "message": str(e)}
 
 
 class FormEngine:
@@ -131,177 +195,270 @@ class FormEngine:
         self.log_dir = log_dir or settings.log_dir
         self.base_url = settings.base_url
 
-        # Create today's output directory
-        self.today_dir = os.path.join(self.output_dir, datetime.datetime.now().strftime("%Y-%m-%d"))
-        os.makedirs(self.today_dir, exist_ok=True)
+        self.storage = get_output_storage(self.output_dir)
+        self.storage.day_dir()
         os.makedirs(self.log_dir, exist_ok=True)
 
+    @property
+    def today_dir(self) -> str:
+        """Output directory of the current day (rolls over at midnight)"""
+        return self.storage.day_dir()
+
     def _get_output_path(self, base_name: str, ext: str) -> str:
-        """Generate unique output file path with timestamp"""
-        timestamp = datetime.datetime.now().strftime("%H%M%S")
-        return os.path.join(self.today_dir, f"{base_name}_{timestamp}.{ext}")
+        """Reserve a unique output file path (see OutputStorage.new_path)"""
+        return self.storage.new_path(base_name, ext)
 
     def _replace_text_in_element(self, element, context: Dict[str, Any]):
-        """Replace template variables in a paragraph or cell element"""
-        if not element.text:
-            return
+        """
+        Replace template variables in a paragraph.
 
-        for key, val in context.items():
-            # Support multiple patterns: {{key}}, {{ key }}, {{key }}, {{ key}}
-            patterns = [
-                f"{{{{ {key} }}}}",
-                f"{{{{{key}}}}}",
-                f"{{{{ {key}}}}}",
-                f"{{{{{key} }}}}"
-            ]
-
-            val_str = str(val) if val is not None else ""
-
-            for pat in patterns:
-                if pat in element.text:
-                    # Handle newlines by adding breaks
-                    if '\n' in val_str:
-                        parts = val_str.split('\n')
-                        # Clear old runs
-                        for run in element.runs:
-                            run.text = ""
-
-                        # Add parts with breaks
-                        if element.runs:
-                            r = element.runs[0]
-                            r.text = parts[0]
-                            for part in parts[1:]:
-                                r.add_break()
-                                r.add_text(part)
-                        else:
-                            r = element.add_run(parts[0])
-                            for part in parts[1:]:
-                                r.add_break()
-                                r.add_text(part)
-                    else:
-                        # Normal replace
-                        new_text = element.text.replace(pat, val_str)
-                        for run in element.runs:
-                            run.text = ""
-                        if element.runs:
-                            element.runs[0].text = new_text
-                        else:
-                            element.add_run(new_text)
+        Substitution works on the paragraph's `w:t` nodes (see
+        substitution.substitute_paragraph): one scan, one write per changed
+        node, formatting of the tag's first run kept, hyperlink runs included.
+        Newlines in values become line breaks. Unknown tags are left untouched.
+        """
+        substitute_paragraph(element._p, context)
 
     def get_available_templates(self) -> List[Dict[str, Any]]:
-        """List all available templates"""
-        templates = []
-        template_path = Path(self.template_dir)
+        """List all available templates (from the in-memory registry)"""
+        return get_template_registry(self.template_dir).list()
 
-        if not template_path.exists():
-            return templates
+    def get_template_info(self, template_name: str) -> Optional[Dict[str, Any]]:
+        """Get info about a specific template, or None if it does not exist"""
+        return get_template_registry(self.template_dir).get(template_name)
 
-        for f in template_path.glob("*.docx"):
-            if f.name.startswith("~$"):  # Skip temp files
-                continue
-            templates.append({
-                "name": f.name,
-                "path": str(f),
-                "size": f.stat().st_size,
-                "modified": datetime.datetime.fromtimestamp(f.stat().st_mtime).isoformat()
-            })
+    def check_context(self, template_name: str, context: Dict[str, Any]):
+        """
+        Fail fast if the context does not cover every placeholder of the
+        template. Uses the in-memory registry only; unknown templates pass
+        and are reported by the render itself.
 
-        return sorted(templates, key=lambda x: x["name"])
+        Raises:
+            MissingVariables: listing the placeholders without a value
+        """
+        info = self.get_template_info(template_name)
+        if info is None:
+            return
+        missing = [name for name in info["placeholders"] if name not in context]
+        if missing:
+            raise MissingVariables(template_name, missing)
 
-    def get_template_info(self, template_name: str) -> Optional[Dict[str, Any]]:
-        """Get info about a specific template"""
-        template_path = Path(self.template_dir) / template_name
+    def _build_document(self, template_name: str, context: Dict[str, Any], compiled=None):
+        """
+        Fill a copy of the cached template and return the python-docx Document.
 
-        if not template_path.exists():
-            return None
+        Args:
+            compiled: Already loaded CompiledTemplate (skips the cache lookup)
+        """
+        if compiled is None:
+            with observe_stage(template_name, "template_load"):
+                compiled = get_template_cache().get(self.template_dir, template_name)
+
+        with observe_stage(template_name, "substitute"):
+            # Copy the cached document; repeating table rows are expanded
+            # first, then only tagged paragraphs (body, tables, headers,
+            # footers) are visited
+            doc, tagged_paragraphs, list_checks = compiled.instantiate()
+            expand_rows(doc, compiled.rows, context)
+            for p in tagged_paragraphs:
+                substitute_paragraph(p._p, context)
+
+            # List alignment: fixed list lines were aligned at compile time
+            for p in list_checks:
+                align_list_paragraph(p)
+        return doc
+
+    def _build_package(self, template_name: str, context: Dict[str, Any], compiled=None) -> RenderedPackage:
+        """
+        Fill a template for saving with zip member passthrough.
 
-        return {
-            "name": template_name,
-            "path": str(template_path),
-            "size": template_path.stat().st_size,
-            "modified": datetime.datetime.fromtimestamp(template_path.stat().st_mtime).isoformat()
-        }
+        Simple templates (no repeating rows) take the fast path: only the
+        main document and tagged headers/footers are copied and rewritten
+        as lxml trees. Other templates go through _build_document. Either
+        way only those story parts are serialized on save; every other zip
+        member is copied from the template as stored.
+        """
+        if compiled is None:
+            with observe_stage(template_name, "template_load"):
+                compiled = get_template_cache().get(self.template_dir, template_name)
+        settings = get_settings()
 
-    def render(
+        if compiled.rows or not settings.fast_render:
+            doc = self._build_document(template_name, context, compiled=compiled)
+            parts = compiled.rewritten_parts(doc)
+        else:
+            with observe_stage(template_name, "substitute"):
+                parts, tagged_paragraphs, list_checks = compiled.instantiate_parts()
+                for p in tagged_paragraphs:
+                    substitute_paragraph(p, context)
+                for p in list_checks:
+                    align_list_paragraph(p)
+        return RenderedPackage(compiled.package, parts, compresslevel=settings.docx_compress_level)
+
+    def render_docx(self, template_name: str, context: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Fill a template and save the DOCX (no PDF or audit).
+
+        Returns:
+            (absolute path of the generated DOCX, its SHA256 computed while writing)
+        """
+        doc = self._build_package(template_name, context)
+
+        base_name = template_name.replace(".docx", "")
+        docx_output_path = self._get_output_path(base_name, "docx")
+
+        # Save DOCX
+        with observe_stage(template_name, "save"):
+            sha256_docx = save_document(doc, docx_output_path)
+        logger.info(f"Generated DOCX: {docx_output_path}")
+        return docx_output_path, sha256_docx
+
+    def render_stream(
         self,
         template_name: str,
         context: Dict[str, Any],
+        fmt: str = "docx",
+        persist: bool = False,
         user_id: str = "system",
         proposal_id: str = None
     ) -> Dict[str, Any]:
         """
-        Render a template with provided context data.
+        Render into memory for a streamed response.
+
+        The DOCX is saved into a memory buffer and hashed there. Nothing is
+        written to the output directory unless persist=True; a non-persisted
+        PDF is converted in a scratch directory that is removed afterwards.
 
         Args:
-            template_name: Name of the template file (e.g., "1b.docx")
-            context: Dictionary of variables to replace in template
-            user_id: ID of user generating the document
-            proposal_id: Optional proposal ID for tracking
+            fmt: "docx" or "pdf"
+            persist: Also store the DOCX (and PDF) in the output directory
 
         Returns:
-            Dictionary with paths to generated DOCX and PDF files
-        """
-        from docx import Document
+            {"content": bytes, "sha256": str, "filename": str, "result": dict or None}
+            where result is the usual render result when persisted
 
-        template_path = os.path.join(self.template_dir, template_name)
-        if not os.path.exists(template_path):
-            raise FileNotFoundError(f"Template '{template_name}' not found")
+        Raises:
+            RuntimeError: if fmt is "pdf" and conversion failed (a persisted
+                DOCX is still audited)
+        """
+        import io
+        import shutil
+        import tempfile
 
+        doc = self._build_package(template_name, context)
         base_name = template_name.replace(".docx", "")
-        docx_output_path = self._get_output_path(base_name, "docx")
-
-        # Load Document
-        doc = Document(template_path)
-
-        # 1. Replace in body paragraphs
-        for p in doc.paragraphs:
-            self._replace_text_in_element(p, context)
-
-        # 2. Replace in tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for p in cell.paragraphs:
-                        self._replace_text_in_element(p, context)
-
-        # 3. Replace in headers
-        for section in doc.sections:
-            for p in section.header.paragraphs:
-                self._replace_text_in_element(p, context)
 
-        # 4. Replace in footers
-        for section in doc.sections:
-            for p in section.footer.paragraphs:
-                self._replace_text_in_element(p, context)
-
-        # 5. Apply list alignment
-        set_left_align_for_lists(doc)
+        buffer = io.BytesIO()
+        with observe_stage(template_name, "save"):
+            sha256_docx = save_document(doc, buffer)
+        docx_bytes = buffer.getvalue()
+
+        if not persist:
+            if fmt == "docx":
+                content, sha256 = docx_bytes, sha256_docx
+            else:
+                scratch_dir = tempfile.mkdtemp(prefix="form-engine-")
+                try:
+                    docx_path = os.path.join(scratch_dir, f"{base_name}.docx")
+                    with open(docx_path, "wb") as f:
+                        f.write(docx_bytes)
+                    try:
+                        with observe_stage(template_name, "pdf_convert"):
+                            pdf_path = get_office_pool().convert_to_pdf(docx_path, scratch_dir)
+                    except ConversionTimeout:
+                        count_pdf_failure(template_name, timeout=True)
+                        raise
+                    if not pdf_path:
+                        count_pdf_failure(template_name)
+                        raise RuntimeError("PDF conversion failed")
+                    with open(pdf_path, "rb") as f:
+                        content = f.read()
+                    sha256 = hashlib.sha256(content).hexdigest()
+                finally:
+                    shutil.rmtree(scratch_dir, ignore_errors=True)
+
+            self._write_audit({
+                "docx_path": None,
+                "pdf_path": None,
+                "template": template_name,
+                "timestamp": datetime.datetime.now().isoformat(),
+                "user_id": user_id,
+                "proposal_id": proposal_id,
+                "sha256_docx": sha256_docx,
+                "sha256_pdf": sha256 if fmt == "pdf" else None,
+                "streamed": fmt
+            })
+            return {"content": content, "sha256": sha256, "filename": f"{base_name}.{fmt}", "result": None}
 
-        # Save DOCX
-        doc.save(docx_output_path)
+        # Persisted: one write of the in-memory DOCX, no re-read for hashing
+        docx_output_path = self._get_output_path(base_name, "docx")
+        with open(docx_output_path, "wb") as f:
+            f.write(docx_bytes)
         logger.info(f"Generated DOCX: {docx_output_path}")
 
-        # Convert to PDF
+        pdf_output_path = self.convert_pdf(docx_output_path, template_name)
+        pdf_bytes, sha256_pdf = None, None
+        if pdf_output_path:
+            with open(pdf_output_path, "rb") as f:
+                pdf_bytes = f.read()
+            sha256_pdf = hashlib.sha256(pdf_bytes).hexdigest()
+
+        # The DOCX is on disk either way: audit and dedup it before reporting
+        # a failed conversion, as render() does for a DOCX without its PDF
+        result = self._finalize(template_name, docx_output_path, pdf_output_path, user_id, proposal_id,
+                                sha256_docx=sha256_docx, sha256_pdf=sha256_pdf)
+        if fmt == "pdf" and not pdf_output_path:
+            raise RuntimeError("PDF conversion failed")
+        if fmt == "docx":
+            content, sha256 = docx_bytes, sha256_docx
+        else:
+            content, sha256 = pdf_bytes, sha256_pdf
+        return {"content": content, "sha256": sha256, "filename": f"{base_name}.{fmt}", "result": result}
+
+    def convert_pdf(self, docx_output_path: str, template_name: str) -> Optional[str]:
+        """Convert a generated DOCX on a pooled office worker; None if conversion failed"""
         pdf_output_path = None
+        outdir = os.path.dirname(docx_output_path)
         try:
-            cmd_check = ["soffice", "--version"]
-            subprocess.run(cmd_check, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5)
-
-            cmd = ["soffice", "--headless", "--convert-to", "pdf", "--outdir", self.today_dir, docx_output_path]
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
-
-            expected_pdf = docx_output_path.replace(".docx", ".pdf")
-            if os.path.exists(expected_pdf):
-                pdf_output_path = expected_pdf
+            with observe_stage(template_name, "pdf_convert"):
+                pdf_output_path = get_office_pool().convert_to_pdf(docx_output_path, outdir)
+            if pdf_output_path:
                 logger.info(f"Generated PDF: {pdf_output_path}")
-        except subprocess.TimeoutExpired:
+            elif get_office_pool().available():
+                count_pdf_failure(template_name)
+        except ConversionTimeout:
             logger.warning("PDF conversion timed out")
+            count_pdf_failure(template_name, timeout=True)
         except Exception as e:
             logger.warning(f"PDF conversion failed: {e}")
+            if get_office_pool().available():
+                count_pdf_failure(template_name)
+        return pdf_output_path
 
+    def _finalize(
+        self,
+        template_name: str,
+        docx_output_path: str,
+        pdf_output_path: Optional[str],
+        user_id: str,
+        proposal_id: Optional[str],
+        sha256_docx: str = None,
+        sha256_pdf: str = None,
+        cache_hit: bool = False
+    ) -> Dict[str, Any]:
+        """Hash the outputs (unless hashes are given), build the result and write the audit record"""
         # Calculate hashes
-        sha256_docx = calculate_sha256(docx_output_path)
-        sha256_pdf = calculate_sha256(pdf_output_path) if pdf_output_path else None
+        if sha256_docx is None or (sha256_pdf is None and pdf_output_path):
+            with observe_stage(template_name, "hash"):
+                if sha256_docx is None:
+                    sha256_docx = calculate_sha256(docx_output_path)
+                if sha256_pdf is None and pdf_output_path:
+                    sha256_pdf = calculate_sha256(pdf_output_path)
+
+        # Identical bytes rendered earlier: keep one copy on disk
+        if not cache_hit:
+            self.storage.dedup(docx_output_path, sha256_docx)
+            self.storage.dedup(pdf_output_path, sha256_pdf)
 
         # Build relative paths for URLs and API responses
         relative_path = os.path.relpath(docx_output_path, self.output_dir)
@@ -319,12 +476,169 @@ class FormEngine:
             "user_id": user_id,
             "proposal_id": proposal_id,
             "sha256_docx": sha256_docx,
-            "sha256_pdf": sha256_pdf
+            "sha256_pdf": sha256_pdf,
+            "cache_hit": cache_hit
         }
 
-        # Audit Log
-        audit_path = os.path.join(self.log_dir, "audit.jsonl")
-        with open(audit_path, "a", encoding='utf-8') as f:
-            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        with observe_stage(template_name, "audit"):
+            self._write_audit(result)
+        return result
+
+    def _write_audit(self, record: Dict[str, Any]):
+        """Queue one record for the background audit writer"""
+        get_audit_writer(self.log_dir).write(record)
+
+    def render(
+        self,
+        template_name: str,
+        context: Dict[str, Any],
+        user_id: str = "system",
+        proposal_id: str = None
+    ) -> Dict[str, Any]:
+        """
+        Render a template with provided context data.
+
+        Args:
+            template_name: Name of the template file (e.g., "1b.docx")
+            context: Dictionary of variables to replace in template
+            user_id: ID of user generating the document
+            proposal_id: Optional proposal ID for tracking
 
+        Returns:
+            Dictionary with paths to generated DOCX and PDF files. An identical
+            earlier render (same template bytes and context) is reused and
+            reported with cache_hit=True.
+        """
+        started = time.perf_counter()
+        result_cache = self._result_cache()
+        cache_key = None
+        if result_cache is not None:
+            with observe_stage(template_name, "cache_lookup"):
+                compiled = get_template_cache().get(self.template_dir, template_name)
+                cache_key = render_key(compiled.content_hash, context)
+                cached = result_cache.lookup(cache_key, require_pdf=get_office_pool().available())
+            if cached is not None:
+                logger.info(f"Render cache hit for {template_name}: {cached['docx_path']}")
+                result = self._finalize(
+                    template_name,
+                    os.path.join(self.output_dir, cached["docx_path"]),
+                    os.path.join(self.output_dir, cached["pdf_path"]) if cached["pdf_path"] else None,
+                    user_id,
+                    proposal_id,
+                    sha256_docx=cached["sha256_docx"],
+                    sha256_pdf=cached["sha256_pdf"],
+                    cache_hit=True
+                )
+                observe_render(template_name, time.perf_counter() - started, cache_hit=True)
+                return result
+
+        docx_output_path, sha256_docx = self.render_docx(template_name, context)
+        pdf_output_path = self.convert_pdf(docx_output_path, template_name)
+        result = self._finalize(template_name, docx_output_path, pdf_output_path, user_id, proposal_id,
+                                sha256_docx=sha256_docx)
+
+        if cache_key is not None:
+            result_cache.store(cache_key, template_name, result["docx_path"], result["pdf_path"],
+                               result["sha256_docx"], result["sha256_pdf"])
+        observe_render(template_name, time.perf_counter() - started, cache_hit=False)
         return result
+
+    def _result_cache(self):
+        """The shared result cache, if enabled and rooted at this engine's output dir"""
+        result_cache = get_result_cache()
+        if result_cache is None or os.path.abspath(result_cache.output_dir) != os.path.abspath(self.output_dir):
+            return None
+        return result_cache
+
+    def render_batch(
+        self,
+        items: List[Dict[str, Any]],
+        user_id: str = "system",
+        proposal_id: str = None,
+        max_workers: int = None,
+        strict: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Render several templates: DOCX files in parallel, then all PDFs in a
+        single office session.
+
+        Args:
+            items: List of {"template_name": ..., "context": {...}}
+            user_id: ID of user generating the documents
+            proposal_id: Optional proposal ID for tracking
+            max_workers: Parallel DOCX renders (default: settings.render_workers)
+            strict: Fail items whose context misses placeholders before rendering
+
+        Returns:
+            One entry per item, in order: {"template_name", "success", "data", "error"}.
+            A failing item does not stop the others.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        outcomes = [{"template_name": item["template_name"], "success": False, "data": None, "error": None}
+                    for item in items]
+        if not items:
+            return outcomes
+
+        # 0. Context validation before any rendering
+        valid = []
+        for i, item in enumerate(items):
+            try:
+                if strict:
+                    self.check_context(item["template_name"], item.get("context") or {})
+                valid.append(i)
+            except MissingVariables as e:
+                outcomes[i]["error"] = render_error(e)
+
+        # 1. DOCX in parallel
+        workers = max(1, min(len(items), max_workers or get_settings().render_workers))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+            futures = {i: pool.submit(self.render_docx, items[i]["template_name"], items[i].get("context") or {})
+                       for i in valid}
+        docx_paths = [None] * len(items)
+        docx_hashes = [None] * len(items)
+        for i, future in futures.items():
+            try:
+                docx_paths[i], docx_hashes[i] = future.result()
+            except Exception as e:
+                logger.warning(f"Batch item {items[i]['template_name']} failed: {e}")
+                outcomes[i]["error"] = render_error(e)
+
+        # 2. All PDFs in one office session per output directory: each PDF goes
+        #    next to its DOCX, whose day directory may differ if the batch
+        #    crossed midnight
+        pdf_paths = {}
+        by_dir: Dict[str, List[str]] = {}
+        for path in docx_paths:
+            if path:
+                by_dir.setdefault(os.path.dirname(path), []).append(path)
+        if by_dir:
+            office = get_office_pool()
+            timed_out = set()
+            for outdir, rendered in by_dir.items():
+                try:
+                    pdf_paths.update(office.convert_many(rendered, outdir))
+                except ConversionTimeout:
+                    logger.warning(f"Batch PDF conversion timed out in {outdir}")
+                    timed_out.update(rendered)
+                except Exception as e:
+                    logger.warning(f"Batch PDF conversion failed in {outdir}: {e}")
+            available = office.available()
+            for i, path in enumerate(docx_paths):
+                if path and not pdf_paths.get(path) and (path in timed_out or available):
+                    count_pdf_failure(items[i]["template_name"], timeout=path in timed_out)
+
+        # 3. Hash + audit per item
+        for i, docx_path in enumerate(docx_paths):
+            if docx_path is None:
+                continue
+            try:
+                outcomes[i]["data"] = self._finalize(
+                    items[i]["template_name"], docx_path, pdf_paths.get(docx_path), user_id, proposal_id,
+                    sha256_docx=docx_hashes[i]
+                )
+                outcomes[i]["success"] = True
+            except Exception as e:
+                outcomes[i]["error"] = render_error(e)
+
+        return outcomes
@@ -0,0 +1,159 @@
+"""
+Bounded render executor
+
+Runs blocking render work (python-docx, hashing, LibreOffice) on a thread
+pool so it never blocks the event loop, and rejects new work once the
+configured number of in-flight renders is reached. Work that renders on
+several threads of its own (batches, mail merges) reserves one slot per
+thread.
+"""
+
+import math
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when the render queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Render queue is full, retry later")
+        self.retry_after = retry_after
+
+
+class RenderExecutor:
+    """
+    Thread pool with a max-in-flight limit and queue statistics.
+
+    A thread pool (not a process pool) is used on purpose: the heavy parts of
+    a render release the GIL (lxml parsing/serialising, hashing, waiting on
+    LibreOffice), and the template cache and office pool are per-process
+    singletons that a process pool would duplicate.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None):
+        settings = get_settings()
+        self.max_workers = max(1, max_workers or settings.render_workers)
+        self.max_queue = max_queue if max_queue is not None else settings.render_max_queue
+        self.capacity = self.max_workers + self.max_queue
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="render")
+        self._lock = threading.Lock()
+        self.closed = False
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        # Recent samples (seconds) for wait/run statistics
+        self._wait_times = deque(maxlen=200)
+        self._run_times = deque(maxlen=200)
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free, from recent run times"""
+        avg_run = sum(self._run_times) / len(self._run_times) if self._run_times else 1.0
+        queued = max(0, self.in_flight - self.running)
+        estimate = avg_run * (queued / self.max_workers + 1)
+        return int(min(60, max(1, math.ceil(estimate))))
+
+    def try_acquire(self, slots: int = 1) -> int:
+        """
+        Reserve in-flight slots (at most the whole capacity).
+
+        Returns:
+            The number of slots reserved, to pass to release()
+
+        Raises:
+            ExecutorSaturated: if fewer than slots are free
+        """
+        slots = max(1, min(slots, self.capacity))
+        with self._lock:
+            if self.in_flight + slots > self.capacity:
+                self.rejected += 1
+                raise ExecutorSaturated(self._retry_after())
+            self.in_flight += slots
+        return slots
+
+    def release(self, slots: int = 1):
+        with self._lock:
+            self.in_flight -= slots
+
+    def _wrap(self, fn: Callable, enqueued_at: float, slots: int) -> Callable:
+        def task():
+            started = time.monotonic()
+            with self._lock:
+                self.running += slots
+                self._wait_times.append(started - enqueued_at)
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self.running -= slots
+                    self.completed += 1
+                    self._run_times.append(time.monotonic() - started)
+        return task
+
+    async def run(self, fn: Callable, *args, slots: int = 1, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on the pool and await its result.
+
+        The slot is held until the work itself finishes: if the awaiting
+        request is cancelled (client disconnect), a render already running
+        keeps counting against the limit until its thread is done.
+
+        Args:
+            slots: In-flight slots fn occupies (the threads it renders on)
+
+        Raises:
+            ExecutorSaturated: if the queue is full (nothing is scheduled)
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, slots=slots, **kwargs))
+
+    def submit(self, fn: Callable, *args, slots: int = 1, **kwargs):
+        """Schedule fn and return its concurrent future; the slots are released when it finishes"""
+        slots = self.try_acquire(slots)
+        try:
+            future = self._pool.submit(self._wrap(lambda: fn(*args, **kwargs), time.monotonic(), slots))
+        except BaseException:
+            self.release(slots)
+            raise
+        future.add_done_callback(lambda _: self.release(slots))
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "running": self.running,
+                "queued": max(0, self.in_flight - self.running),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                "p95_wait_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+            }
+
+    def shutdown(self):
+        self.closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton executor shared by all routes in the process
+_executor = None
+
+
+def get_render_executor() -> RenderExecutor:
+    global _executor
+    if _executor is None or _executor.closed:
+        _executor = RenderExecutor()
+    return _executor
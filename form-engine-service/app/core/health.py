@@ -0,0 +1,145 @@
+"""
+Background health monitor
+
+Component checks (templates, output directory, LibreOffice pool, render
+queue, jobs) run on an interval in a background task and the latest snapshot
+is served from memory, so liveness/readiness probes never touch the disk or
+fork `soffice`. The snapshot also carries the cache statistics and output
+usage that /metrics publishes.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import datetime
+from typing import Dict, Any, Optional
+
+from .config import get_settings
+from .office import get_office_pool
+from .executor import get_render_executor
+from .jobs import get_job_store
+from .storage import get_retention_sweeper
+from .templates import get_template_registry
+from .result_cache import get_result_cache
+from .template_cache import get_template_cache
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Periodically computes component status; readers get the cached snapshot"""
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or get_settings().health_check_interval
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.checked_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def check(self) -> Dict[str, Any]:
+        """Run all component checks (blocking; called off the event loop)"""
+        settings = get_settings()
+        components = {}
+
+        count = len(get_template_registry(settings.template_dir).list())
+        components["templates"] = {"ok": count > 0, "count": count}
+
+        # Usage as measured by the last retention sweep (None until one ran)
+        sweep = get_retention_sweeper().last_result
+        components["output_dir"] = {
+            "ok": os.path.isdir(settings.output_dir) and os.access(settings.output_dir, os.W_OK),
+            "used_bytes": sweep["used_bytes"] if sweep and not sweep["skipped"] else None,
+        }
+
+        # PDF conversion is optional: without LibreOffice DOCX renders still work
+        pool = get_office_pool()
+        office = pool.stats()
+        office["available"] = pool.available()
+        office["ok"] = not office["available"] or (office["started"] and office["alive"] > 0)
+        components["libreoffice"] = office
+
+        try:
+            jobs = get_job_store().count_by_status()
+            components["jobs"] = {"ok": True, **jobs}
+        except Exception as e:
+            components["jobs"] = {"ok": False, "error": str(e)}
+
+        caches = {"template": get_template_cache().stats()}
+        result_cache = get_result_cache()
+        if result_cache is not None:
+            caches["result"] = result_cache.stats()
+
+        return {
+            "components": components,
+            "caches": caches,
+            "timestamp": datetime.datetime.now().isoformat(),
+        }
+
+    async def refresh(self):
+        try:
+            self.snapshot = await asyncio.to_thread(self.check)
+            self.checked_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Health check failed: {e}")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+
+    async def start(self):
+        """Take a first snapshot, then keep refreshing in the background"""
+        await self.refresh()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def healthy(self) -> bool:
+        """
+        Every checked component is ok. Render queue saturation is load, not
+        a failure, and only affects readiness.
+        """
+        snapshot = self.snapshot
+        return snapshot is not None and all(c.get("ok", False) for c in snapshot["components"].values())
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Latest snapshot plus live render queue saturation.
+
+        Not ready when no snapshot exists or it is stale (monitor stuck), a
+        required component failed, or the render queue is full.
+        """
+        queue = get_render_executor().stats()
+        capacity = queue["workers"] + queue["max_queue"]
+        queue["saturation"] = round(queue["in_flight"] / capacity, 3) if capacity else 1.0
+        queue["ok"] = queue["in_flight"] < capacity
+
+        snapshot = self.snapshot or {"components": {}, "timestamp": None}
+        components = dict(snapshot["components"], render_queue=queue)
+        stale = self.snapshot is None or time.monotonic() - self.checked_at > 3 * self.interval
+        ready = not stale and all(c.get("ok", False) for c in components.values())
+        return {
+            "ready": ready,
+            "stale": stale,
+            "checked_at": snapshot["timestamp"],
+            "components": components,
+        }
+
+
+# Singleton monitor shared by the health routes
+_monitor = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    global _monitor
+    if _monitor is None:
+        _monitor = HealthMonitor()
+    return _monitor
@@ -0,0 +1,368 @@
+"""
+Asynchronous render jobs
+
+Jobs are persisted in a local SQLite database and rendered by background
+worker threads through the shared render executor (so they count against
+the in-flight limit), so callers do not have to hold an HTTP request open
+for the whole render + PDF conversion and queued jobs survive a restart.
+
+Several service processes may share the database. A claimed job records its
+owner (one id per process) and a lease that the owner's heartbeat keeps
+extending; only jobs whose lease ran out, because their process died, are
+put back in the queue, and a job that has used up FORM_ENGINE_JOB_MAX_ATTEMPTS
+is failed instead. A render running longer than FORM_ENGINE_JOB_TIMEOUT
+fails the job.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Any, Optional, List, Tuple
+
+from .config import get_settings
+from .executor import get_render_executor, ExecutorSaturated
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    template_name TEXT NOT NULL,
+    context TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    proposal_id TEXT,
+    callback_url TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns added after the first release, for databases created before them
+_MIGRATIONS = {
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "lease_until": "ALTER TABLE jobs ADD COLUMN lease_until REAL",
+}
+
+# Identifies the jobs claimed by this process (pid alone is reused across restarts)
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat()
+
+
+class JobStore:
+    """SQLite-backed job table"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in _MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["context"] = json.loads(job["context"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["error"] = json.loads(job["error"]) if job["error"] else None
+        return job
+
+    def create(self, template_name: str, context: Dict[str, Any], user_id: str,
+               proposal_id: str = None, callback_url: str = None) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, template_name, context, user_id, proposal_id, callback_url, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, template_name, json.dumps(context, ensure_ascii=False),
+                 user_id, proposal_id, callback_url, _now())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def claim_next(self, owner: str = PROCESS_ID, lease: float = 60) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running under owner's lease and return it"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, lease_until = ? "
+                "WHERE id = ?",
+                (JOB_RUNNING, _now(), owner, time.time() + lease, row["id"])
+            )
+            conn.execute("COMMIT")
+        return self.get(row["id"])
+
+    def finish(self, job_id: str, result: Dict[str, Any] = None, error: Dict[str, str] = None,
+               owner: str = PROCESS_ID) -> bool:
+        """
+        Record the outcome of a running job.
+
+        Returns:
+            False if owner no longer holds the job (its lease expired and the
+            job was requeued); nothing is written then
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (
+                    JOB_FAILED if error else JOB_SUCCEEDED,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    json.dumps(error, ensure_ascii=False) if error else None,
+                    _now(),
+                    job_id,
+                    JOB_RUNNING,
+                    owner,
+                )
+            )
+            return cur.rowcount == 1
+
+    def renew_leases(self, owner: str = PROCESS_ID, lease: float = 60) -> int:
+        """Extend the leases of all jobs owner is running (heartbeat)"""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE status = ? AND owner = ?",
+                (time.time() + lease, JOB_RUNNING, owner)
+            )
+            return cur.rowcount
+
+    def release(self, job_id: str, owner: str = PROCESS_ID) -> bool:
+        """Put a job owner claimed but could not start back in the queue, without counting the attempt"""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts - 1, owner = NULL, lease_until = NULL "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (JOB_QUEUED, job_id, JOB_RUNNING, owner)
+            )
+            return cur.rowcount == 1
+
+    def requeue_expired(self, max_attempts: int = 3) -> Tuple[int, List[str]]:
+        """
+        Recover running jobs whose lease ran out (owner process gone).
+
+        Jobs with attempts left go back in the queue; the others, which
+        crashed or hung their worker max_attempts times, are failed.
+
+        Returns:
+            (number of jobs requeued, ids of the jobs failed)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+            failed = [row["id"] for row in conn.execute(
+                f"SELECT id FROM jobs WHERE {expired} AND attempts >= ?", (JOB_RUNNING, now, max_attempts)
+            )]
+            if failed:
+                error = {
+                    "code": "MAX_ATTEMPTS_EXCEEDED",
+                    "message": f"Job was interrupted {max_attempts} time(s) (worker crashed or hung); not retried"
+                }
+                conn.executemany(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, owner = NULL, lease_until = NULL "
+                    "WHERE id = ?",
+                    [(JOB_FAILED, json.dumps(error), _now(), job_id) for job_id in failed]
+                )
+            cur = conn.execute(
+                f"UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL WHERE {expired}",
+                (JOB_QUEUED, JOB_RUNNING, now)
+            )
+            conn.execute("COMMIT")
+            return cur.rowcount, failed
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class JobRunner:
+    """Background worker threads that execute queued jobs"""
+
+    def __init__(self, store: JobStore, workers: int = None, poll_interval: float = None):
+        settings = get_settings()
+        self.store = store
+        self.workers = max(1, workers or settings.job_workers)
+        self.poll_interval = poll_interval or settings.job_poll_interval
+        self.callback_timeout = settings.job_callback_timeout
+        self.lease = settings.job_lease_seconds
+        self.max_attempts = max(1, settings.job_max_attempts)
+        self.timeout = settings.job_timeout
+        self.owner = PROCESS_ID
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._requeue_expired()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"render-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat, name="render-job-lease", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _requeue_expired(self):
+        try:
+            requeued, failed = self.store.requeue_expired(self.max_attempts)
+        except Exception as e:
+            logger.error(f"Could not requeue expired render jobs: {e}")
+            return
+        if requeued:
+            logger.info(f"Requeued {requeued} render job(s) whose process stopped")
+            self._wakeup.set()
+        for job_id in failed:
+            logger.error(f"Render job {job_id} failed after {self.max_attempts} interrupted attempt(s)")
+            job = self.store.get(job_id)
+            if job and job["callback_url"]:
+                self._send_callback(job_id, job["callback_url"])
+
+    def _heartbeat(self):
+        """Keep this process's leases alive and recover jobs of processes that died"""
+        while not self._stop.wait(self.lease / 3):
+            try:
+                self.store.renew_leases(self.owner, self.lease)
+            except Exception as e:
+                logger.error(f"Could not renew render job leases: {e}")
+            self._requeue_expired()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
+
+    def notify(self):
+        """Wake idle workers after a job was enqueued"""
+        self._wakeup.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim_next(self.owner, self.lease)
+            except Exception as e:
+                logger.error(f"Could not claim render job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]):
+        from .engine import FormEngine
+
+        try:
+            future = get_render_executor().submit(
+                FormEngine().render,
+                template_name=job["template_name"],
+                context=job["context"],
+                user_id=job["user_id"],
+                proposal_id=job["proposal_id"]
+            )
+        except ExecutorSaturated as e:
+            # Interactive renders fill the executor: retry the job later
+            self.store.release(job["id"], self.owner)
+            self._stop.wait(min(e.retry_after, self.poll_interval))
+            return
+
+        result, error = None, None
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The render keeps its executor slot until it ends; its result is dropped
+            logger.error(f"Render job {job['id']} did not finish within {self.timeout}s")
+            error = {"code": "RENDER_TIMEOUT", "message": f"Render did not finish within {self.timeout}s"}
+        except FileNotFoundError as e:
+            error = {"code": "TEMPLATE_NOT_FOUND", "message": str(e)}
+        except Exception as e:
+            logger.exception(f"Render job {job['id']} failed: {e}")
+            error = {"code": "RENDER_ERROR", "message": str(e)}
+
+        if not self.store.finish(job["id"], result=result, error=error, owner=self.owner):
+            logger.warning(f"Render job {job['id']} lost its lease before finishing; result discarded")
+            return
+        if job["callback_url"]:
+            self._send_callback(job["id"], job["callback_url"])
+
+    def _send_callback(self, job_id: str, callback_url: str):
+        import httpx
+
+        job = self.store.get(job_id)
+        payload = {k: job[k] for k in ("id", "status", "template_name", "user_id", "proposal_id",
+                                        "result", "error", "created_at", "finished_at")}
+        try:
+            httpx.post(callback_url, json=payload, timeout=self.callback_timeout).raise_for_status()
+        except Exception as e:
+            logger.warning(f"Callback for render job {job_id} to {callback_url} failed: {e}")
+
+
+# Singletons shared by the API routes
+_store = None
+_runner = None
+
+
+def get_job_store() -> JobStore:
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = JobStore(settings.jobs_db or os.path.join(settings.log_dir, "jobs.db"))
+    return _store
+
+
+def get_job_runner() -> JobRunner:
+    global _runner
+    if _runner is None:
+        _runner = JobRunner(get_job_store())
+    return _runner
@@ -0,0 +1,409 @@
+"""
+Bulk mail merge
+
+One template, many contexts. Rows are read lazily from CSV (header = variable
+names) or JSONL (one context object per line, the flat shape used by
+app.sample_data), filled from a single parsed copy of the template on a
+thread pool, converted to PDF in batches on the office pool and moved one by
+one into a zip archive or a directory next to manifest.jsonl (name, SHA256
+and error per row). Only a bounded window of rows is in flight at any time,
+so memory does not grow with the input.
+
+    python -m app.core.merge 1b.docx proposals.csv -o merge-1b.zip --format both
+"""
+
+import io
+import os
+import re
+import csv
+import sys
+import json
+import time
+import shutil
+import zipfile
+import logging
+import argparse
+import datetime
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple, TextIO
+
+from .config import get_settings
+from .engine import FormEngine, save_document, calculate_sha256, render_error
+from .office import get_office_pool, ConversionTimeout
+from .template_cache import get_template_cache
+from .metrics import observe_stage, count_pdf_failure
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("docx", "pdf", "both")
+INPUT_FORMATS = ("csv", "jsonl")
+
+# Failed rows listed in the summary (all of them are in the manifest)
+MAX_SUMMARY_ERRORS = 20
+
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_input_format(filename: str) -> str:
+    """csv or jsonl from a file name"""
+    ext = os.path.splitext(filename.lower())[1]
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the input format of '{filename}' (expected .csv or .jsonl)")
+
+
+def iter_contexts(stream: TextIO, input_format: str) -> Iterator[Row]:
+    """
+    Read contexts lazily.
+
+    Yields:
+        (row number, context, None) or (row number, None, error message) for
+        a row that cannot be used; a bad row does not stop the merge
+    """
+    if input_format == "csv":
+        reader = csv.DictReader(stream, restval="")
+        if reader.fieldnames:
+            reader.fieldnames = [name.strip() for name in reader.fieldnames]
+        for row_no, row in enumerate(reader, 1):
+            if None in row:
+                yield row_no, None, "Row has more cells than the header"
+                continue
+            yield row_no, row, None
+        return
+
+    row_no = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        row_no += 1
+        try:
+            context = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(context, dict):
+            yield row_no, None, "Row is not a JSON object"
+            continue
+        yield row_no, context, None
+
+
+class _DirectorySink:
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+
+    def add(self, src_path: str, arcname: str, compress: bool = False):
+        shutil.move(src_path, os.path.join(self.path, arcname))
+
+    def close(self):
+        pass
+
+
+class _ZipSink:
+    def __init__(self, path: str):
+        self._zip = zipfile.ZipFile(path, "w", allowZip64=True)
+
+    def add(self, src_path: str, arcname: str, compress: bool = False):
+        # DOCX and PDF are already compressed; only the manifest is deflated
+        self._zip.write(src_path, arcname, compress_type=zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
+        os.remove(src_path)
+
+    def close(self):
+        self._zip.close()
+
+
+class MailMerge:
+    """Render one template once per context row into a zip archive or directory"""
+
+    def __init__(
+        self,
+        engine: FormEngine = None,
+        workers: int = None,
+        pdf_batch_size: int = None,
+        user_id: str = "system",
+        proposal_id: str = None,
+        strict: bool = False,
+        name_field: str = None,
+        defaults: Dict[str, Any] = None
+    ):
+        """
+        Args:
+            workers: Parallel DOCX renders (default: settings.render_workers)
+            pdf_batch_size: Documents per office conversion (default: settings.merge_pdf_batch_size)
+            proposal_id: Audit proposal ID for rows without a proposal_id value
+            strict: Fail rows whose context misses template placeholders
+            name_field: Context key appended to each output file name
+            defaults: Values used for variables a row does not set
+        """
+        settings = get_settings()
+        self.engine = engine or FormEngine()
+        self.workers = max(1, workers or settings.render_workers)
+        self.pdf_batch_size = max(1, pdf_batch_size or settings.merge_pdf_batch_size)
+        self.user_id = user_id
+        self.proposal_id = proposal_id
+        self.strict = strict
+        self.name_field = name_field
+        self.defaults = defaults or {}
+
+    def threads(self, fmt: str = "docx") -> int:
+        """Threads run() renders and converts on (render executor slots to reserve)"""
+        if fmt in ("pdf", "both"):
+            return self.workers + max(1, get_office_pool().size)
+        return self.workers
+
+    def _name(self, base_name: str, row_no: int, context: Optional[Dict[str, Any]]) -> str:
+        """Output stem; the row number keeps names unique"""
+        name = f"{base_name}_{row_no:05d}"
+        value = (context or {}).get(self.name_field) if self.name_field else None
+        if value:
+            safe = re.sub(r"[^\w.-]+", "_", str(value)).strip("._")[:80]
+            if safe:
+                name = f"{name}_{safe}"
+        return name
+
+    def run(self, template_name: str, rows: Iterable[Row], target: str, fmt: str = "docx") -> Dict[str, Any]:
+        """
+        Merge every row into target (".zip" path = archive, otherwise a directory).
+
+        Args:
+            rows: (row number, context, error) tuples, e.g. from iter_contexts()
+            fmt: "docx", "pdf" or "both"
+
+        Returns:
+            {"template", "format", "output", "sha256" (archive only), "total",
+             "succeeded", "failed", "seconds", "errors" (first failed rows)}
+
+        Raises:
+            FileNotFoundError: if the template does not exist
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+        started = time.perf_counter()
+        engine = self.engine
+        # Parsed once for the whole merge, even if the cache evicts it meanwhile
+        with observe_stage(template_name, "template_load"):
+            compiled = get_template_cache().get(engine.template_dir, template_name)
+        base_name = template_name.replace(".docx", "")
+        archive_name = os.path.basename(os.path.normpath(target))
+        want_docx = fmt in ("docx", "both")
+        want_pdf = fmt in ("pdf", "both")
+
+        office = get_office_pool()
+        pdf_slots = max(1, office.size)
+        # Rows rendered, waiting for or in PDF conversion, and not yet written out
+        window = self.workers * 2 + (self.pdf_batch_size * pdf_slots if want_pdf else 0)
+
+        scratch_dir = tempfile.mkdtemp(prefix="form-engine-merge-")
+        sink = _ZipSink(target) if target.lower().endswith(".zip") else _DirectorySink(target)
+        manifest_path = os.path.join(scratch_dir, "manifest.jsonl")
+        manifest = open(manifest_path, "w", encoding="utf-8")
+        pool = ThreadPoolExecutor(max_workers=self.threads(fmt), thread_name_prefix="merge")
+
+        totals = {"total": 0, "succeeded": 0, "failed": 0}
+        errors: List[Dict[str, Any]] = []
+        pending = {}  # future -> ("render", item) | ("pdf", [items])
+        state = {"in_flight": 0, "converting": 0, "batch": [], "ready": []}
+
+        def render_one(item: Dict[str, Any]) -> Tuple[str, str]:
+            if self.strict:
+                engine.check_context(template_name, item["context"])
+            doc = engine._build_package(template_name, item["context"], compiled=compiled)
+            docx_path = os.path.join(scratch_dir, f"{item['name']}.docx")
+            with observe_stage(template_name, "save"):
+                return docx_path, save_document(doc, docx_path)
+
+        def convert_batch(items: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+            sources = [item["docx_path"] for item in items]
+            timed_out = False
+            converted = {}
+            try:
+                with observe_stage(template_name, "pdf_convert"):
+                    converted = office.convert_many(sources, scratch_dir)
+            except ConversionTimeout:
+                logger.warning(f"Merge PDF batch of {len(sources)} timed out")
+                timed_out = True
+            except Exception as e:
+                logger.warning(f"Merge PDF batch of {len(sources)} failed: {e}")
+            if timed_out or office.available():
+                for src in sources:
+                    if not converted.get(src):
+                        count_pdf_failure(template_name, timeout=timed_out)
+            return converted
+
+        def finish(item: Dict[str, Any]):
+            """Move the row's files into the sink and record it in the manifest and audit log"""
+            docx_path, pdf_path = item.get("docx_path"), item.get("pdf_path")
+            entry = {"index": item["index"], "name": item["name"], "docx": None, "pdf": None,
+                     "error": item.get("error")}
+            if docx_path and want_docx:
+                sink.add(docx_path, f"{item['name']}.docx")
+                entry["docx"] = {"path": f"{item['name']}.docx", "sha256": item["sha256_docx"]}
+            elif docx_path:
+                os.remove(docx_path)
+            if pdf_path:
+                sha256_pdf = calculate_sha256(pdf_path)
+                sink.add(pdf_path, f"{item['name']}.pdf")
+                entry["pdf"] = {"path": f"{item['name']}.pdf", "sha256": sha256_pdf}
+            elif want_pdf and docx_path and entry["error"] is None:
+                entry["error"] = {"code": "PDF_CONVERSION_FAILED", "message": "PDF conversion failed"}
+
+            entry["status"] = "ok" if entry["error"] is None else "failed"
+            manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if entry["status"] == "ok":
+                totals["succeeded"] += 1
+            else:
+                totals["failed"] += 1
+                if len(errors) < MAX_SUMMARY_ERRORS:
+                    errors.append({"index": item["index"], "name": item["name"], "error": entry["error"]})
+
+            if docx_path:
+                context = item["context"]
+                engine._write_audit({
+                    "docx_path": None,
+                    "pdf_path": None,
+                    "template": template_name,
+                    "timestamp": datetime.datetime.now().isoformat(),
+                    "user_id": self.user_id,
+                    "proposal_id": context.get("proposal_id") or self.proposal_id,
+                    "sha256_docx": item.get("sha256_docx"),
+                    "sha256_pdf": entry["pdf"]["sha256"] if entry["pdf"] else None,
+                    "merge": f"{archive_name}/{item['name']}"
+                })
+            state["in_flight"] -= 1
+
+        def submit_ready():
+            while state["ready"] and state["converting"] < pdf_slots:
+                items = state["ready"].pop(0)
+                state["converting"] += 1
+                pending[pool.submit(convert_batch, items)] = ("pdf", items)
+
+        def queue_for_pdf(item: Dict[str, Any]):
+            state["batch"].append(item)
+            if len(state["batch"]) >= self.pdf_batch_size:
+                state["ready"].append(state["batch"])
+                state["batch"] = []
+                submit_ready()
+
+        def collect():
+            """Wait for at least one future and hand its rows on"""
+            if state["batch"] and not any(kind == "render" for kind, _ in pending.values()):
+                # Nothing left to fill the partial batch: convert it now
+                state["ready"].append(state["batch"])
+                state["batch"] = []
+                submit_ready()
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, payload = pending.pop(future)
+                if kind == "render":
+                    try:
+                        payload["docx_path"], payload["sha256_docx"] = future.result()
+                    except Exception as e:
+                        payload["error"] = render_error(e)
+                        finish(payload)
+                        continue
+                    if want_pdf:
+                        queue_for_pdf(payload)
+                    else:
+                        finish(payload)
+                else:
+                    state["converting"] -= 1
+                    converted = future.result()
+                    for item in payload:
+                        item["pdf_path"] = converted.get(item["docx_path"])
+                        finish(item)
+                    submit_ready()
+
+        try:
+            for row_no, context, error in rows:
+                totals["total"] += 1
+                state["in_flight"] += 1
+                if error is not None:
+                    finish({"index": row_no, "name": self._name(base_name, row_no, None),
+                            "error": {"code": "INVALID_ROW", "message": error}})
+                    continue
+                if self.defaults:
+                    context = {**self.defaults, **context}
+                item = {"index": row_no, "name": self._name(base_name, row_no, context), "context": context}
+                pending[pool.submit(render_one, item)] = ("render", item)
+                while state["in_flight"] >= window:
+                    collect()
+
+            while state["in_flight"]:
+                collect()
+
+            manifest.close()
+            sink.add(manifest_path, "manifest.jsonl", compress=True)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            if not manifest.closed:
+                manifest.close()
+            sink.close()
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        summary = {
+            "template": template_name,
+            "format": fmt,
+            "output": target,
+            "sha256": calculate_sha256(target) if isinstance(sink, _ZipSink) else None,
+            **totals,
+            "seconds": round(time.perf_counter() - started, 3),
+            "errors": errors,
+        }
+        logger.info(f"Mail merge of {template_name}: {totals['succeeded']}/{totals['total']} "
+                    f"succeeded in {summary['seconds']}s -> {target}")
+        return summary
+
+
+def open_input(path: str, input_format: str = None) -> Tuple[TextIO, str]:
+    """Text stream and input format for a CLI argument ('-' = stdin)"""
+    if path == "-":
+        if input_format is None:
+            raise ValueError("--input-format is required when reading stdin")
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline=""), input_format
+    return open(path, "r", encoding="utf-8-sig", newline=""), input_format or detect_input_format(path)
+
+
+def main(argv: Optional[List[str]] = None):
+    from .audit import close_audit_writers
+
+    parser = argparse.ArgumentParser(description="Render one template for every row of a CSV or JSONL file")
+    parser.add_argument("template", help="Template file name, e.g. 1b.docx")
+    parser.add_argument("input", help="CSV (header = variable names) or JSONL file, '-' for stdin")
+    parser.add_argument("-o", "--output", required=True, help="Output .zip archive or directory")
+    parser.add_argument("--format", choices=FORMATS, default="docx", help="Files per row (default: docx)")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS, default=None, help="Default: from the file name")
+    parser.add_argument("--name-field", default=None, help="Context key appended to each file name")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel renders (default: settings)")
+    parser.add_argument("--pdf-batch-size", type=int, default=None, help="Documents per PDF conversion")
+    parser.add_argument("--sample", metavar="FORM_ID", default=None,
+                        help="Fill variables a row does not set from app.sample_data for this form")
+    parser.add_argument("--strict", action="store_true", help="Fail rows whose context misses placeholders")
+    parser.add_argument("--user-id", default="mail-merge", help="User ID written to the audit log")
+    args = parser.parse_args(argv)
+
+    defaults = None
+    if args.sample:
+        from ..sample_data import get_sample_data
+        defaults = get_sample_data(args.sample)
+
+    stream, input_format = open_input(args.input, args.input_format)
+    merge = MailMerge(workers=args.workers, pdf_batch_size=args.pdf_batch_size, user_id=args.user_id,
+                      strict=args.strict, name_field=args.name_field, defaults=defaults)
+    try:
+        summary = merge.run(args.template, iter_contexts(stream, input_format), args.output, args.format)
+    finally:
+        stream.close()
+        get_office_pool().close()
+        close_audit_writers()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Prometheus metrics
+
+Per-stage render timings (template load, substitution, save, PDF conversion,
+hashing, audit), PDF conversion failure/timeout counters, and live gauges
+read from the executor, caches, office pool and output filesystem at scrape
+time. Without prometheus_client installed every helper is a no-op.
+"""
+
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Counter, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+    from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+except ImportError:  # Metrics disabled
+    REGISTRY = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Render stages, in pipeline order
+STAGES = ("cache_lookup", "template_load", "substitute", "merge", "save", "pdf_convert", "hash", "audit")
+
+# DOCX stages take milliseconds, PDF conversion seconds
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+if REGISTRY is not None:
+    RENDER_STAGE_SECONDS = Histogram(
+        "form_engine_render_stage_seconds", "Time spent in each render stage",
+        ["template", "stage"], buckets=_BUCKETS
+    )
+    RENDER_SECONDS = Histogram(
+        "form_engine_render_seconds", "End-to-end FormEngine.render time",
+        ["template", "cache_hit"], buckets=_BUCKETS
+    )
+    PDF_FAILURES = Counter(
+        "form_engine_pdf_conversion_failures_total", "PDF conversions that produced no PDF", ["template"]
+    )
+    PDF_TIMEOUTS = Counter(
+        "form_engine_pdf_conversion_timeouts_total", "PDF conversions killed by the job timeout", ["template"]
+    )
+    AUDIT_WRITE_SECONDS = Histogram(
+        "form_engine_audit_write_seconds", "Time to write (and fsync) one audit batch", buckets=_BUCKETS
+    )
+
+
+# Extra consumers of raw stage timings (e.g. the benchmark harness)
+_stage_listeners = []
+
+
+def add_stage_listener(listener):
+    """Call listener(template_name, stage, seconds) for every recorded stage"""
+    _stage_listeners.append(listener)
+
+
+@contextmanager
+def observe_stage(template_name: str, stage: str):
+    """Time a render stage; failed stages are not recorded (bounded template labels)"""
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    if REGISTRY is not None:
+        RENDER_STAGE_SECONDS.labels(template=template_name, stage=stage).observe(elapsed)
+    for listener in _stage_listeners:
+        listener(template_name, stage, elapsed)
+
+
+def observe_render(template_name: str, seconds: float, cache_hit: bool):
+    if REGISTRY is not None:
+        RENDER_SECONDS.labels(template=template_name, cache_hit=str(cache_hit).lower()).observe(seconds)
+
+
+def count_pdf_failure(template_name: str, timeout: bool = False):
+    if REGISTRY is not None:
+        (PDF_TIMEOUTS if timeout else PDF_FAILURES).labels(template=template_name).inc()
+
+
+def observe_audit_write(seconds: float):
+    if REGISTRY is not None:
+        AUDIT_WRITE_SECONDS.observe(seconds)
+
+
+class _LiveStatsCollector:
+    """Gauges computed on scrape from the in-process singletons"""
+
+    def collect(self):
+        from .executor import get_render_executor
+        from .office import get_office_pool
+        from .health import get_health_monitor
+
+        queue = get_render_executor().stats()
+        in_flight = GaugeMetricFamily("form_engine_renders_in_flight", "Renders running or queued on the executor")
+        in_flight.add_metric([], queue["in_flight"])
+        yield in_flight
+        queued = GaugeMetricFamily("form_engine_renders_queued", "Renders waiting for an executor thread")
+        queued.add_metric([], queue["queued"])
+        yield queued
+        rejected = CounterMetricFamily("form_engine_renders_rejected", "Renders rejected with 503")
+        rejected.add_metric([], queue["rejected"])
+        yield rejected
+
+        office = get_office_pool().stats()
+        workers = GaugeMetricFamily("form_engine_office_workers", "LibreOffice pool workers", labels=["state"])
+        workers.add_metric(["idle"], office["idle"])
+        workers.add_metric(["busy"], office["busy"])
+        workers.add_metric(["alive"], office["alive"])
+        yield workers
+
+        # Cache and disk figures come from the health monitor's background
+        # snapshot: a scrape never queries SQLite or walks the output directory
+        snapshot = get_health_monitor().snapshot
+        if snapshot is None:
+            return
+
+        hits = CounterMetricFamily("form_engine_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("form_engine_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("form_engine_cache_hit_ratio", "Cache hits / lookups since start", labels=["cache"])
+        for name, stats in snapshot["caches"].items():
+            lookups = stats["hits"] + stats["misses"]
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats["hits"] / lookups if lookups else 0.0)
+        yield hits
+        yield misses
+        yield ratio
+
+        used = snapshot["components"]["output_dir"].get("used_bytes")
+        if used is not None:
+            output = GaugeMetricFamily("form_engine_output_used_bytes",
+                                       "Bytes used by the output directory at the last retention sweep")
+            output.add_metric([], used)
+            yield output
+
+
+if REGISTRY is not None:
+    REGISTRY.register(_LiveStatsCollector())
+
+
+def render_latest() -> bytes:
+    """Exposition-format payload for /metrics"""
+    if REGISTRY is None:
+        return b"# prometheus_client is not installed\n"
+    return generate_latest(REGISTRY)
@@ -0,0 +1,446 @@
+"""
+LibreOffice conversion pool
+
+Keeps a small set of long-lived headless LibreOffice instances and lends them
+to renders for DOCX -> PDF conversion, so a render no longer pays the office
+cold start on every document.
+"""
+
+import os
+import queue
+import shutil
+import socket
+import logging
+import tempfile
+import threading
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import uno  # Provided by the python3-uno package next to LibreOffice
+except ImportError:
+    uno = None
+
+
+class OfficeUnavailable(RuntimeError):
+    """Raised when no LibreOffice binary can be found"""
+
+
+class ConversionTimeout(TimeoutError):
+    """Raised when a conversion (or waiting for a free worker) times out"""
+
+
+def _props(**kwargs):
+    """Build a tuple of UNO PropertyValue structs"""
+    values = []
+    for name, value in kwargs.items():
+        prop = uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+        prop.Name = name
+        prop.Value = value
+        values.append(prop)
+    return tuple(values)
+
+
+def _port_free(port: int) -> bool:
+    """Whether nothing listens on 127.0.0.1:port (bind probe)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+    return True
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class OfficeWorker:
+    """
+    One headless LibreOffice instance with its own user profile.
+
+    With the UNO bridge available the office process is started once with a
+    socket listener and every conversion is a load/store call on it. Without
+    UNO the worker falls back to `soffice --convert-to` against its private,
+    already initialised profile, which still avoids profile creation and lets
+    workers convert in parallel.
+    """
+
+    def __init__(self, index: int, binary: str, port: int, profile_root: str, startup_timeout: float = 30,
+                 port_span: int = 1, port_offset: int = 0):
+        self.index = index
+        self.binary = binary
+        # Listener port range [port, port + port_span): another process on
+        # the host may hold a port, so start() probes from port + port_offset
+        self.first_port = port
+        self.port_span = max(1, port_span)
+        self.port = port + port_offset % self.port_span
+        self.profile_dir = os.path.join(profile_root, f"worker_{index}")
+        self.startup_timeout = startup_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.jobs_done = 0
+        self._desktop = None
+        self._timed_out = False
+
+    @property
+    def uses_uno(self) -> bool:
+        return uno is not None
+
+    @property
+    def profile_url(self) -> str:
+        return Path(self.profile_dir).resolve().as_uri()
+
+    def start(self):
+        """Start the office listener (UNO mode only)"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.jobs_done = 0
+        self._timed_out = False
+
+        if not self.uses_uno:
+            return
+
+        self.port = self._pick_port()
+        cmd = [
+            self.binary, "--headless", "--invisible", "--nologo", "--norestore",
+            "--nodefault", "--nolockcheck",
+            f"-env:UserInstallation={self.profile_url}",
+            f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            try:
+                ctx = resolver.resolve(
+                    f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+                )
+                self._desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"Office worker {self.index} failed to start on port {self.port}")
+                time.sleep(0.25)
+
+        logger.info(f"Office worker {self.index} listening on port {self.port} (pid {self.process.pid})")
+
+    def _pick_port(self) -> int:
+        """First free port of this worker's range (starting with the last one used)"""
+        start = self.port - self.first_port
+        candidates = [self.first_port + (start + i) % self.port_span for i in range(self.port_span)]
+        for port in candidates:
+            if _port_free(port):
+                return port
+        raise RuntimeError(
+            f"Office worker {self.index}: no free port in {self.first_port}-{self.first_port + self.port_span - 1}"
+        )
+
+    def stop(self):
+        """Terminate the office process"""
+        self._desktop = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def is_alive(self) -> bool:
+        if not self.uses_uno:
+            return True
+        return self.process is not None and self.process.poll() is None and self._desktop is not None
+
+    def _kill(self):
+        self._timed_out = True
+        if self.process is not None and self.process.poll() is None:
+            logger.warning(f"Office worker {self.index} exceeded job timeout, killing pid {self.process.pid}")
+            self.process.kill()
+
+    def convert(self, src_path: str, outdir: str, timeout: float) -> str:
+        """
+        Convert one document to PDF.
+
+        Returns:
+            Path of the generated PDF
+        """
+        pdf_path = os.path.join(outdir, Path(src_path).stem + ".pdf")
+
+        if self.uses_uno:
+            self._convert_uno(src_path, pdf_path, timeout)
+        else:
+            self._convert_cli(src_path, outdir, timeout)
+
+        self.jobs_done += 1
+        return pdf_path
+
+    def convert_many(self, src_paths: List[str], outdir: str, timeout: float) -> Dict[str, Optional[str]]:
+        """
+        Convert several documents in one office session.
+
+        Returns:
+            Mapping of source path -> PDF path (None when that file failed)
+        """
+        results = {}
+        if self.uses_uno:
+            for src_path in src_paths:
+                if not self.is_alive():
+                    results[src_path] = None
+                    continue
+                try:
+                    results[src_path] = self.convert(src_path, outdir, timeout)
+                except Exception as e:
+                    logger.warning(f"PDF conversion of {src_path} failed: {e}")
+                    results[src_path] = None
+        else:
+            # soffice accepts many input files in one invocation; a bad file
+            # only lacks its PDF, which the existence check below reports
+            self._convert_cli_many(src_paths, outdir, timeout * len(src_paths))
+            self.jobs_done += len(src_paths)
+            for src_path in src_paths:
+                results[src_path] = os.path.join(outdir, Path(src_path).stem + ".pdf")
+
+        return {src: (pdf if pdf and os.path.exists(pdf) else None) for src, pdf in results.items()}
+
+    def _convert_uno(self, src_path: str, pdf_path: str, timeout: float):
+        watchdog = threading.Timer(timeout, self._kill)
+        watchdog.start()
+        try:
+            doc = self._desktop.loadComponentFromURL(
+                Path(src_path).resolve().as_uri(), "_blank", 0, _props(Hidden=True, ReadOnly=True)
+            )
+            try:
+                doc.storeToURL(Path(pdf_path).resolve().as_uri(), _props(FilterName="writer_pdf_Export"))
+            finally:
+                doc.close(True)
+        except Exception:
+            if self._timed_out:
+                raise ConversionTimeout(f"PDF conversion exceeded {timeout}s")
+            self._desktop = None  # Bridge is unusable, force a respawn
+            raise
+        finally:
+            watchdog.cancel()
+
+    def _convert_cli(self, src_path: str, outdir: str, timeout: float):
+        self._convert_cli_many([src_path], outdir, timeout)
+
+    def _convert_cli_many(self, src_paths: List[str], outdir: str, timeout: float):
+        cmd = [
+            self.binary, "--headless", "--norestore",
+            f"-env:UserInstallation={self.profile_url}",
+            "--convert-to", "pdf", "--outdir", outdir, *src_paths,
+        ]
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise ConversionTimeout(f"PDF conversion exceeded {timeout}s")
+        if result.returncode != 0:
+            # Success is decided per file by whether its PDF exists
+            logger.warning(
+                f"soffice exited with {result.returncode} converting {len(src_paths)} file(s): "
+                f"{result.stderr.decode(errors='replace').strip()[:500]}"
+            )
+
+
+class OfficePool:
+    """Pool of OfficeWorker instances with borrow/return semantics"""
+
+    def __init__(
+        self,
+        size: int = None,
+        binary: str = None,
+        base_port: int = None,
+        profile_dir: str = None,
+        job_timeout: float = None,
+        acquire_timeout: float = None,
+        max_jobs_per_worker: int = None,
+    ):
+        settings = get_settings()
+        self.size = max(1, size or settings.office_pool_size)
+        self.binary = binary or settings.office_binary
+        self.base_port = base_port or settings.office_base_port
+        self.profile_dir = profile_dir or settings.office_profile_dir or os.path.join(
+            tempfile.gettempdir(), "form-engine-office"
+        )
+        self.job_timeout = job_timeout or settings.office_job_timeout
+        self.acquire_timeout = acquire_timeout or settings.office_acquire_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker or settings.office_max_jobs_per_worker
+        self.port_span = max(1, settings.office_port_span)
+        # Several service processes (uvicorn --workers) may run pools on one
+        # host: each gets its own profiles, and its workers probe for a free
+        # port in their own range starting at a per-process offset
+        self.process_profile_dir = os.path.join(self.profile_dir, f"pid_{os.getpid()}")
+
+        self._idle: "queue.Queue[OfficeWorker]" = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self.respawns = 0
+
+    def available(self) -> bool:
+        """Whether a LibreOffice binary is installed"""
+        return shutil.which(self.binary) is not None
+
+    def start(self):
+        """Spawn all workers. Safe to call more than once."""
+        with self._lock:
+            if self._started:
+                return
+            if not self.available():
+                raise OfficeUnavailable(f"LibreOffice binary '{self.binary}' not found")
+            self._closed = False
+            self._prune_profiles()
+            for i in range(self.size):
+                worker = OfficeWorker(i, self.binary, self.base_port + i * self.port_span, self.process_profile_dir,
+                                      port_span=self.port_span, port_offset=os.getpid())
+                try:
+                    worker.start()
+                except Exception as e:
+                    logger.warning(f"Office worker {i} did not start: {e}")
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self._started = True
+            logger.info(f"Office pool started with {self.size} worker(s), uno={'yes' if uno else 'no'}")
+
+    def close(self):
+        """Stop all workers"""
+        with self._lock:
+            self._closed = True
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+            self._idle = queue.Queue()
+            self._started = False
+            shutil.rmtree(self.process_profile_dir, ignore_errors=True)
+
+    def _prune_profiles(self):
+        """Remove profile directories left behind by service processes that are gone"""
+        try:
+            names = os.listdir(self.profile_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.startswith("pid_") or not name[4:].isdigit():
+                continue
+            pid = int(name[4:])
+            if pid != os.getpid() and not _pid_alive(pid):
+                shutil.rmtree(os.path.join(self.profile_dir, name), ignore_errors=True)
+
+    def _respawn(self, worker: OfficeWorker):
+        """Restart a crashed or recycled worker in the background and return it to the pool"""
+        def run():
+            worker.stop()
+            try:
+                worker.start()
+            except Exception as e:
+                logger.error(f"Office worker {worker.index} respawn failed: {e}")
+            self.respawns += 1
+            if not self._closed:
+                self._idle.put(worker)
+
+        threading.Thread(target=run, name=f"office-respawn-{worker.index}", daemon=True).start()
+
+    def _borrow(self) -> OfficeWorker:
+        if not self._started:
+            self.start()
+        try:
+            worker = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise ConversionTimeout(f"No office worker free after {self.acquire_timeout}s")
+        if not worker.is_alive():
+            logger.warning(f"Office worker {worker.index} found dead, restarting")
+            worker.stop()
+            try:
+                worker.start()
+            except Exception:
+                self._idle.put(worker)
+                raise
+            self.respawns += 1
+        return worker
+
+    def _release(self, worker: OfficeWorker):
+        if self._closed:
+            worker.stop()
+        elif not worker.is_alive() or worker.jobs_done >= self.max_jobs_per_worker:
+            self._respawn(worker)
+        else:
+            self._idle.put(worker)
+
+    def convert_to_pdf(self, src_path: str, outdir: str, timeout: float = None) -> Optional[str]:
+        """
+        Convert a document to PDF on a pooled worker.
+
+        Args:
+            src_path: DOCX file to convert
+            outdir: Directory that receives the PDF
+            timeout: Per-job timeout in seconds (default: settings.office_job_timeout)
+
+        Returns:
+            PDF path, or None if the converter produced no file
+        """
+        worker = self._borrow()
+        try:
+            pdf_path = worker.convert(src_path, outdir, timeout or self.job_timeout)
+        finally:
+            self._release(worker)
+        return pdf_path if os.path.exists(pdf_path) else None
+
+    def convert_many(self, src_paths: List[str], outdir: str, timeout: float = None) -> Dict[str, Optional[str]]:
+        """
+        Convert several documents on a single pooled worker (one office session).
+
+        Args:
+            src_paths: DOCX files to convert
+            outdir: Directory that receives the PDFs
+            timeout: Per-document timeout in seconds
+
+        Returns:
+            Mapping of source path -> PDF path (None for files that failed)
+        """
+        worker = self._borrow()
+        try:
+            return worker.convert_many(src_paths, outdir, timeout or self.job_timeout)
+        finally:
+            self._release(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool saturation snapshot"""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "busy": max(0, len(self._workers) - self._idle.qsize()) if self._started else 0,
+            "started": self._started,
+            "alive": sum(1 for w in self._workers if w.is_alive()) if self._started else 0,
+            "uno": uno is not None,
+            "respawns": self.respawns,
+        }
+
+
+# Singleton pool shared by all engines in the process
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_office_pool() -> OfficePool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OfficePool()
+        return _pool
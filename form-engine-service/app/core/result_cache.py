@@ -0,0 +1,169 @@
+"""
+Content-addressed render result cache
+
+Maps SHA-256(template content hash + canonical context JSON) to the files
+produced by an earlier identical render, so repeated "regenerate" clicks
+return the existing DOCX/PDF instead of rendering and converting again.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS render_cache (
+    key TEXT PRIMARY KEY,
+    template TEXT NOT NULL,
+    docx_path TEXT NOT NULL,
+    pdf_path TEXT,
+    sha256_docx TEXT NOT NULL,
+    sha256_pdf TEXT,
+    bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_render_cache_last_hit ON render_cache (last_hit_at);
+"""
+
+
+def canonical_json(context: Dict[str, Any]) -> str:
+    """Stable JSON for a context: sorted keys, no whitespace, non-JSON values as str"""
+    return json.dumps(context, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def render_key(template_hash: str, context: Dict[str, Any]) -> str:
+    """Cache key of a render: SHA-256 over the template hash and the canonical context"""
+    digest = hashlib.sha256()
+    digest.update(template_hash.encode("ascii"))
+    digest.update(b"\0")
+    digest.update(canonical_json(context).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    SQLite index of rendered outputs, bounded by entry count, the total
+    size of the outputs it indexes and age.
+
+    The bounds apply to the index only. Evicting an entry forgets it but
+    never deletes its files: earlier responses (and audit records) still
+    point to them, and with hardlink dedup one file may back several
+    renders. Disk use of the output directory is governed by the retention
+    sweeper in storage.py (FORM_ENGINE_OUTPUT_RETENTION_DAYS / _QUOTA_BYTES).
+    """
+
+    def __init__(self, db_path: str, output_dir: str, max_entries: int = None, max_indexed_bytes: int = None,
+                 max_age_seconds: float = None):
+        settings = get_settings()
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.max_entries = max_entries or settings.result_cache_max_entries
+        self.max_indexed_bytes = max_indexed_bytes or settings.result_cache_max_indexed_bytes
+        self.max_age_seconds = max_age_seconds or settings.result_cache_max_age_hours * 3600
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _exists(self, relative_path: Optional[str]) -> bool:
+        return relative_path is not None and os.path.exists(os.path.join(self.output_dir, relative_path))
+
+    def lookup(self, key: str, require_pdf: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached entry for key, or None.
+
+        Entries whose files have disappeared are dropped. With require_pdf,
+        an entry rendered without a PDF counts as a miss.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM render_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and (
+                time.time() - row["created_at"] > self.max_age_seconds
+                or not self._exists(row["docx_path"])
+                or (row["pdf_path"] and not self._exists(row["pdf_path"]))
+            ):
+                conn.execute("DELETE FROM render_cache WHERE key = ?", (key,))
+                row = None
+            if row is None or (require_pdf and not row["pdf_path"]):
+                self.misses += 1
+                return None
+            conn.execute("UPDATE render_cache SET last_hit_at = ? WHERE key = ?", (time.time(), key))
+
+        self.hits += 1
+        return dict(row)
+
+    def store(self, key: str, template: str, docx_path: str, pdf_path: Optional[str], sha256_docx: str,
+              sha256_pdf: Optional[str]):
+        """Record a render's outputs (paths relative to output_dir) and evict if over budget"""
+        size = sum(
+            os.path.getsize(os.path.join(self.output_dir, p)) for p in (docx_path, pdf_path) if self._exists(p)
+        )
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO render_cache "
+                "(key, template, docx_path, pdf_path, sha256_docx, sha256_pdf, bytes, created_at, last_hit_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, template, docx_path, pdf_path, sha256_docx, sha256_pdf, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired, then least recently hit index rows; files are left to the storage sweeper"""
+        conn.execute("DELETE FROM render_cache WHERE created_at < ?", (now - self.max_age_seconds,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM render_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_indexed_bytes:
+            return
+        # Drop least recently hit entries until both budgets are met
+        for row in conn.execute("SELECT key, bytes FROM render_cache ORDER BY last_hit_at").fetchall():
+            if count <= self.max_entries and total <= self.max_indexed_bytes:
+                break
+            conn.execute("DELETE FROM render_cache WHERE key = ?", (row["key"],))
+            count -= 1
+            total -= row["bytes"]
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM render_cache").fetchone()
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+
+# Singleton cache shared by all engines in the process
+_cache = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """The process-wide result cache, or None when disabled"""
+    global _cache
+    settings = get_settings()
+    if not settings.result_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = ResultCache(
+            settings.result_cache_db or os.path.join(settings.log_dir, "render_cache.db"),
+            settings.output_dir
+        )
+    return _cache
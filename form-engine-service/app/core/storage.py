@@ -0,0 +1,320 @@
+"""
+Output storage lifecycle
+
+Generated files live in `<output_dir>/<YYYY-MM-DD>/` under collision-free
+names (`<template>_<HHMMSS>_<uuid>.<ext>`). Byte-identical outputs are
+hardlinked to one copy in a content store (`<output_dir>/.store/`), and a
+background sweeper deletes files past the retention age or beyond the disk
+quota, oldest first. Files referenced by audit records filed against a
+proposal are never deleted. A sweep can also be run by hand:
+
+    python -m app.core.storage sweep [--dry-run]
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import datetime
+import threading
+from typing import Dict, Any, Optional, List, Set
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = ".store"
+
+# Files younger than this are never swept: their audit records may still be
+# queued in the writer and responses have just handed out their URLs
+_GRACE_SECONDS = 3600
+
+
+class OutputStorage:
+    """Naming, dedup and retention of the files under one output directory"""
+
+    def __init__(self, output_dir: str, log_dir: str = None, dedup: bool = None, retention_days: int = None,
+                 quota_bytes: int = None, keep_audited: bool = None):
+        settings = get_settings()
+        self.output_dir = output_dir
+        self.log_dir = log_dir or settings.log_dir
+        self.dedup_enabled = settings.output_dedup if dedup is None else dedup
+        self.retention_days = settings.output_retention_days if retention_days is None else retention_days
+        self.quota_bytes = settings.output_quota_bytes if quota_bytes is None else quota_bytes
+        self.keep_audited = settings.output_keep_audited if keep_audited is None else keep_audited
+        self.store_dir = os.path.join(output_dir, STORE_DIR)
+        self._day = None
+        self._day_dir = None
+        self._lock = threading.Lock()
+
+    def day_dir(self) -> str:
+        """Today's output directory (created on first use each day)"""
+        day = datetime.date.today().isoformat()
+        if day != self._day:
+            with self._lock:
+                path = os.path.join(self.output_dir, day)
+                os.makedirs(path, exist_ok=True)
+                self._day, self._day_dir = day, path
+        return self._day_dir
+
+    def new_path(self, base_name: str, ext: str) -> str:
+        """
+        Reserve a new output file path.
+
+        The random suffix keeps names unique across threads and processes;
+        the file is created with O_EXCL so a name is never handed out twice.
+        """
+        timestamp = datetime.datetime.now().strftime("%H%M%S")
+        day_dir = self.day_dir()
+        while True:
+            path = os.path.join(day_dir, f"{base_name}_{timestamp}_{uuid.uuid4().hex[:8]}.{ext}")
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return path
+            except FileExistsError:
+                continue
+
+    def dedup(self, path: str, sha256: Optional[str]) -> bool:
+        """
+        Hardlink path to the stored copy of identical content.
+
+        The first file with a given hash becomes the stored copy; later ones
+        are replaced by a link to it. Returns True when path now shares an
+        existing copy. Filesystems without hardlinks just keep the file.
+        """
+        if not self.dedup_enabled or not sha256 or not path:
+            return False
+        blob = os.path.join(self.store_dir, sha256[:2], sha256 + os.path.splitext(path)[1])
+        try:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(path, blob)
+                return False
+            except FileExistsError:
+                pass
+            if os.path.samefile(path, blob):
+                return False
+            tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            os.link(blob, tmp)
+            os.replace(tmp, path)
+            # The shared inode is in use again; restart its retention clock
+            os.utime(path)
+            logger.debug(f"Deduplicated {path} -> {blob}")
+            return True
+        except OSError as e:
+            logger.debug(f"Dedup skipped for {path}: {e}")
+            return False
+
+    def _audited_paths(self) -> Optional[Set[str]]:
+        """Relative paths filed against a proposal, or None when the audit store is unavailable"""
+        if not get_settings().audit_index_enabled:
+            return None
+        from .audit_store import get_audit_store
+        return {os.path.normpath(p) for p in get_audit_store(self.log_dir).referenced_paths()}
+
+    def sweep(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Delete expired files, then the oldest files until under the quota.
+
+        Usage is counted per inode, so deduplicated copies are counted once
+        and only free space when their last link goes. Stored copies no
+        longer linked from any output file are removed too.
+
+        Returns:
+            {"deleted": files, "freed_bytes", "used_bytes", "kept_audited", "skipped"}
+        """
+        stats = {"deleted": 0, "freed_bytes": 0, "used_bytes": 0, "kept_audited": 0, "skipped": None}
+        if not self.retention_days and not self.quota_bytes:
+            stats["skipped"] = "retention and quota disabled"
+            return stats
+
+        protected: Set[str] = set()
+        if self.keep_audited:
+            protected = self._audited_paths()
+            if protected is None:
+                logger.warning("Output sweep skipped: audit index disabled, referenced files unknown")
+                stats["skipped"] = "audit index disabled"
+                return stats
+
+        now = time.time()
+        files = []  # (mtime, relative path, inode)
+        links: Dict[tuple, int] = {}  # inode -> output files linking it
+        blobs: Dict[tuple, str] = {}
+        sizes: Dict[tuple, int] = {}
+        for root, dirs, names in os.walk(self.output_dir):
+            in_store = os.path.relpath(root, self.output_dir).split(os.sep)[0] == STORE_DIR
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                inode = (st.st_dev, st.st_ino)
+                sizes[inode] = st.st_size
+                if in_store:
+                    blobs[inode] = path
+                    continue
+                links[inode] = links.get(inode, 0) + 1
+                files.append((st.st_mtime, os.path.relpath(path, self.output_dir), inode))
+        used = sum(sizes.values())
+
+        def remove(relative: str, inode: tuple):
+            nonlocal used
+            if not dry_run:
+                try:
+                    os.remove(os.path.join(self.output_dir, relative))
+                except FileNotFoundError:
+                    pass
+            stats["deleted"] += 1
+            links[inode] -= 1
+            if links[inode] == 0:
+                blob = blobs.pop(inode, None)
+                if blob is not None and not dry_run:
+                    try:
+                        os.remove(blob)
+                    except FileNotFoundError:
+                        pass
+                used -= sizes[inode]
+                stats["freed_bytes"] += sizes[inode]
+
+        files.sort()
+        expire_before = now - self.retention_days * 86400 if self.retention_days else None
+        remaining = []
+        for mtime, relative, inode in files:
+            if relative in protected:
+                stats["kept_audited"] += 1
+            elif now - mtime >= _GRACE_SECONDS:
+                if expire_before is not None and mtime < expire_before:
+                    remove(relative, inode)
+                else:
+                    remaining.append((relative, inode))
+        if self.quota_bytes:
+            for relative, inode in remaining:
+                if used <= self.quota_bytes:
+                    break
+                remove(relative, inode)
+            if used > self.quota_bytes:
+                logger.warning(f"Output directory still over quota after sweep: {used} > {self.quota_bytes} bytes")
+
+        # Stored copies whose output files were all deleted earlier
+        for inode, blob in blobs.items():
+            if links.get(inode, 0) == 0:
+                if not dry_run:
+                    try:
+                        os.remove(blob)
+                    except FileNotFoundError:
+                        continue
+                used -= sizes[inode]
+                stats["freed_bytes"] += sizes[inode]
+
+        if not dry_run:
+            self._remove_empty_dirs()
+        stats["used_bytes"] = used
+        logger.info(
+            f"Output sweep{' (dry run)' if dry_run else ''}: deleted {stats['deleted']} file(s), "
+            f"freed {stats['freed_bytes']} bytes, {used} bytes in use"
+        )
+        return stats
+
+    def _remove_empty_dirs(self):
+        today = os.path.join(self.output_dir, datetime.date.today().isoformat())
+        for root, dirs, names in os.walk(self.output_dir, topdown=False):
+            if root in (self.output_dir, today, self.store_dir) or names:
+                continue
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+
+class RetentionSweeper:
+    """Runs OutputStorage.sweep on an interval in a background task"""
+
+    def __init__(self, storage: OutputStorage, interval: float = None):
+        self.storage = storage
+        self.interval = interval or get_settings().output_sweep_interval
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.storage.retention_days or self.storage.quota_bytes)
+
+    async def _loop(self):
+        while True:
+            try:
+                self.last_result = await asyncio.to_thread(self.storage.sweep)
+            except Exception as e:
+                logger.error(f"Output sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        if not self.enabled:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# One storage per output directory in the process
+_storages: Dict[str, OutputStorage] = {}
+_storages_lock = threading.Lock()
+
+
+def get_output_storage(output_dir: str = None) -> OutputStorage:
+    path = os.path.abspath(output_dir or get_settings().output_dir)
+    with _storages_lock:
+        storage = _storages.get(path)
+        if storage is None:
+            storage = OutputStorage(path)
+            _storages[path] = storage
+        return storage
+
+
+# Singleton sweeper for the service's output directory
+_sweeper = None
+
+
+def get_retention_sweeper() -> RetentionSweeper:
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = RetentionSweeper(get_output_storage())
+    return _sweeper
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Output storage maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sweeper = sub.add_parser("sweep", help="Delete expired / over-quota output files")
+    sweeper.add_argument("--output-dir", default=None, help="Output directory (default: settings)")
+    sweeper.add_argument("--retention-days", type=int, default=None, help="Override FORM_ENGINE_OUTPUT_RETENTION_DAYS")
+    sweeper.add_argument("--quota-bytes", type=int, default=None, help="Override FORM_ENGINE_OUTPUT_QUOTA_BYTES")
+    sweeper.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    args = parser.parse_args(argv)
+
+    storage = OutputStorage(
+        os.path.abspath(args.output_dir or get_settings().output_dir),
+        retention_days=args.retention_days,
+        quota_bytes=args.quota_bytes
+    )
+    stats = storage.sweep(dry_run=args.dry_run)
+    if stats["skipped"]:
+        print(f"Skipped: {stats['skipped']}")
+    else:
+        print(f"Deleted {stats['deleted']} file(s), freed {stats['freed_bytes']} bytes, "
+              f"{stats['used_bytes']} bytes in use, {stats['kept_audited']} audited file(s) kept")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,220 @@
+"""
+Run-aware placeholder substitution
+
+Works on the `w:t` nodes of a paragraph instead of python-docx Run proxies,
+so runs inside hyperlinks, smart tags and tracked insertions are covered and
+nothing else in a run (breaks, tabs, rendered page breaks, field codes) is
+rebuilt. The paragraph text is gathered once and scanned once; a tag split
+across runs is written into the `w:t` holding its opening braces (keeping
+that run's formatting) and its remaining characters are dropped from the
+later nodes. Every changed `w:t` is written once, and paragraphs without a
+matching tag are not touched at all.
+"""
+
+import re
+import bisect
+from typing import Dict, Any, List, Tuple
+
+from .template_cache import W_NS, W_P, W_TBL, PLACEHOLDER_PATTERN
+
+W_T = f"{{{W_NS}}}t"
+W_TR = f"{{{W_NS}}}tr"
+W_TC = f"{{{W_NS}}}tc"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Paragraphs starting with one of these are list lines and get left-aligned
+LIST_MARKERS = ("-", "•")
+
+_BREAKS = re.compile(r"(\n|\t)")
+
+
+def paragraph_text_nodes(p) -> list:
+    """The `w:t` nodes of a paragraph, excluding those of nested text-box paragraphs"""
+    if p.find(f".//{W_P}") is None:
+        return list(p.iter(W_T))
+    return [t for t in p.iter(W_T) if next(t.iterancestors(W_P)) is p]
+
+
+def split_tags(texts: List[str], matches: list) -> List[Tuple[int, list]]:
+    """
+    Distribute the literal text and the matched tags over the `w:t` nodes.
+
+    Args:
+        texts: Text of each `w:t` node of one paragraph
+        matches: Regex matches over "".join(texts), in order
+
+    Returns:
+        (node index, pieces) for every node overlapping a tag, where pieces
+        are literal strings and the matches the node now owns
+    """
+    full_text = "".join(texts)
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text)
+
+    pieces: Dict[int, list] = {}
+
+    def node_at(pos: int) -> int:
+        # Last node starting at or before pos; skip back over empty nodes
+        i = bisect.bisect_right(starts, pos) - 1
+        while i > 0 and not texts[i]:
+            i -= 1
+        return i
+
+    def keep(begin: int, end: int):
+        """Copy untouched text [begin, end) back into the touched nodes that own it"""
+        while begin < end:
+            i = node_at(begin)
+            chunk_end = min(end, starts[i] + len(texts[i]))
+            if i in pieces:
+                pieces[i].append(full_text[begin:chunk_end])
+            begin = chunk_end
+
+    # Nodes overlapping a tag are rewritten; all others keep their text
+    for m in matches:
+        first, last = node_at(m.start()), node_at(m.end() - 1)
+        for i in range(first, last + 1):
+            pieces.setdefault(i, [])
+
+    cursor = 0
+    for m in matches:
+        keep(cursor, m.start())
+        pieces[node_at(m.start())].append(m)
+        cursor = m.end()
+    keep(cursor, len(full_text))
+
+    return sorted(pieces.items())
+
+
+def substitute_paragraph(p, context: Dict[str, Any], pattern=PLACEHOLDER_PATTERN) -> bool:
+    """
+    Replace the `{{key}}` tags of one paragraph element in place.
+
+    Args:
+        p: `w:p` element
+        context: Values by tag name (group 1 of pattern); unknown tags are left untouched
+
+    Returns:
+        True if the paragraph was changed
+    """
+    nodes = paragraph_text_nodes(p)
+    if not nodes:
+        return False
+    texts = [t.text or "" for t in nodes]
+    full_text = "".join(texts)
+    if "{{" not in full_text:
+        return False
+
+    matches = [m for m in pattern.finditer(full_text) if m.group(1) in context]
+    if not matches:
+        return False
+
+    def value_of(m) -> str:
+        value = context[m.group(1)]
+        return str(value) if value is not None else ""
+
+    for i, pieces in split_tags(texts, matches):
+        text = "".join(piece if isinstance(piece, str) else value_of(piece) for piece in pieces)
+        if text != texts[i]:
+            set_text(nodes[i], text)
+    return True
+
+
+def set_text(t, text: str):
+    """Set a `w:t` text; newlines and tabs become `w:br`/`w:tab` siblings in the same run"""
+    if "\n" not in text and "\t" not in text:
+        t.text = text
+        if text[:1].isspace() or text[-1:].isspace():
+            t.set(XML_SPACE, "preserve")
+        return
+
+    from docx.oxml import OxmlElement
+
+    parent = t.getparent()
+    index = parent.index(t)
+    parent.remove(t)
+    for part in _BREAKS.split(text):
+        if part == "\n":
+            node = OxmlElement("w:br")
+        elif part == "\t":
+            node = OxmlElement("w:tab")
+        elif part:
+            node = OxmlElement("w:t")
+            node.text = part
+            if part[:1].isspace() or part[-1:].isspace():
+                node.set(XML_SPACE, "preserve")
+        else:
+            continue
+        parent.insert(index, node)
+        index += 1
+
+
+def is_list_text(text: str, var_names: List[str] = None) -> bool:
+    """List-alignment rule: a dash/bullet line, or one mentioning any of var_names"""
+    text = text.strip()
+    if var_names and any(var in text for var in var_names):
+        return True
+    return text.startswith(LIST_MARKERS)
+
+
+def list_paragraphs(body):
+    """Paragraphs the list rule applies to: those of `w:body` and of its tables' cells"""
+    yield from body.iterchildren(W_P)
+    for tbl in body.iterchildren(W_TBL):
+        for tr in tbl.iterchildren(W_TR):
+            for tc in tr.iterchildren(W_TC):
+                yield from tc.iterchildren(W_P)
+
+
+def starts_list(chunks) -> bool:
+    """
+    List rule (without var_names) on a text given as consecutive chunks:
+    only the chunks up to the first non-blank character are looked at.
+    """
+    for chunk in chunks:
+        chunk = chunk.lstrip()
+        if chunk:
+            return chunk.startswith(LIST_MARKERS)
+    return False
+
+
+def left_align(p):
+    """Left-align one `w:p`"""
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+
+def align_list_paragraph(p) -> bool:
+    """Left-align one `w:p` if the list rule matches its current text"""
+    if not is_list_text(p.text):
+        return False
+    left_align(p)
+    return True
+
+
+def prepare_list_alignment(paragraphs) -> list:
+    """
+    Decide the list rule once per template.
+
+    Whether a paragraph is a list line only depends on the start of its
+    text, which substitution keeps unless the text starts with a tag. Those
+    paragraphs are returned to be checked after substitution; the other
+    list lines are left-aligned here, in the cached template, so every
+    render inherits the alignment.
+
+    Args:
+        paragraphs: `w:p` elements of the cached template the rule applies to
+
+    Returns:
+        The paragraphs whose rule depends on the substituted text
+    """
+    dynamic = []
+    for p in paragraphs:
+        if p.text.lstrip().startswith("{{"):
+            dynamic.append(p)
+        else:
+            align_list_paragraph(p)
+    return dynamic
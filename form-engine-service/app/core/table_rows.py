@@ -0,0 +1,207 @@
+"""
+Repeating table rows
+
+A table row whose cells use `{{item.<field>}}` tags is repeated once per
+element of a list from the context. The list is named by a
+`{{#each <list>}}` marker anywhere in the row (rows without a marker bind to
+`items`):
+
+    | {{#each danh_sach_de_tai}}{{item.stt}} | {{item.ten_de_tai}} | ... |
+
+The row is analysed once when the template is compiled: every `w:t` whose
+text depends on the item is turned into a list of literal and tag pieces.
+Rendering deep-copies the row XML (borders, shading and run formatting come
+along) and rewrites only those `w:t` nodes, so large tables cost one lxml
+copy per row. `{{item.stt}}` defaults to the 1-based position and tags may add
+an offset (`{{item.stt+2}}`). Other `{{key}}` tags in the row are filled from
+the context. An empty list removes the row; a missing list leaves it as is
+(minus the marker). In a body-level table, cell paragraphs starting with a
+tag get the list-alignment rule per copy, decided from the text pieces
+rendered for that copy rather than by re-reading the paragraph.
+"""
+
+import re
+import copy
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from .template_cache import W_NS, W_P, iter_story_parts
+from .substitution import (
+    W_T, W_TC, paragraph_text_nodes, split_tags, set_text, prepare_list_alignment, starts_list, left_align
+)
+
+logger = logging.getLogger(__name__)
+
+W_TR = f"{{{W_NS}}}tr"
+W_BODY = f"{{{W_NS}}}body"
+
+DEFAULT_LIST = "items"
+
+# {{#each list}}, {{item.field}}, {{item.field+N}}, {{key}}
+TAG_PATTERN = re.compile(
+    r"\{\{\s*(?:#each\s+(?P<each>\w+)|item\.(?P<field>\w+)\s*(?:(?P<sign>[+-])\s*(?P<offset>\d+))?|(?P<key>\w+))\s*\}\}"
+)
+
+
+class _Tag:
+    """A tag inside a repeating row; renders itself for one item (None = keep the row as is)"""
+
+    __slots__ = ("text", "each", "field", "offset", "key")
+
+    def __init__(self, match):
+        self.text = match.group(0)
+        self.each = match.group("each")
+        self.field = match.group("field")
+        self.offset = int(match.group("offset") or 0) * (-1 if match.group("sign") == "-" else 1)
+        self.key = match.group("key")
+
+    def render(self, item, position: int, context: Dict[str, Any]) -> str:
+        if self.each is not None:
+            return ""
+        if item is None:
+            return self.text
+        if self.key is not None:
+            if self.key not in context:
+                return self.text
+            value = context[self.key]
+            return str(value) if value is not None else ""
+        value = item.get(self.field) if isinstance(item, dict) else getattr(item, self.field, None)
+        if value is None and self.field == "stt":
+            value = position
+        if value is None:
+            return ""
+        if self.offset:
+            try:
+                return str(int(value) + self.offset)
+            except (TypeError, ValueError):
+                pass
+        return str(value)
+
+
+class RowTemplate:
+    """
+    A repeating row of a compiled template.
+
+    Attributes:
+        partname: Story part holding the row
+        position: Index of the `w:tr` in document order within that part
+        list_name: Context key of the list the row repeats over
+        fields: Item fields used by the row
+        plan: (index of a `w:t` in the row, pieces) for every `w:t` to rewrite
+        list_checks: (index of a `w:p` in the row, sources) for the cell
+            paragraphs the list rule depends on; sources are the paragraph's
+            texts in order, literal strings or indexes into plan
+    """
+
+    def __init__(self, partname: str, position: int, list_name: str, fields: List[str],
+                 plan: List[Tuple[int, list]], list_checks: List[Tuple[int, list]] = None):
+        self.partname = partname
+        self.position = position
+        self.list_name = list_name
+        self.fields = fields
+        self.plan = plan
+        self.list_checks = list_checks or []
+
+    def _fill(self, tr, item, position: int, context: Dict[str, Any]):
+        texts = list(tr.iter(W_T))
+        rendered = []
+        for index, pieces in self.plan:
+            text = "".join(
+                piece if isinstance(piece, str) else piece.render(item, position, context) for piece in pieces
+            )
+            set_text(texts[index], text)
+            rendered.append(text)
+        paragraphs = None
+        for index, sources in self.list_checks:
+            if starts_list(source if isinstance(source, str) else rendered[source] for source in sources):
+                if paragraphs is None:
+                    paragraphs = list(tr.iter(W_P))
+                left_align(paragraphs[index])
+
+    def expand(self, tr, context: Dict[str, Any]):
+        """Replace tr (this row in a document copy) with one filled copy per list element"""
+        items = context.get(self.list_name)
+        if items is None:
+            self._fill(tr, None, 0, context)
+            return
+        if isinstance(items, dict) or not isinstance(items, (list, tuple)):
+            logger.warning(f"Context '{self.list_name}' is not a list; table row left unfilled")
+            self._fill(tr, None, 0, context)
+            return
+
+        anchor = tr
+        for position, item in enumerate(items, 1):
+            row = copy.deepcopy(tr)
+            self._fill(row, item, position, context)
+            anchor.addnext(row)
+            anchor = row
+        tr.getparent().remove(tr)
+
+
+def _plan_paragraph(texts: List[str]) -> List[Tuple[int, list]]:
+    """Literal and tag pieces of the `w:t` nodes of one paragraph that hold a row tag"""
+    matches = list(TAG_PATTERN.finditer("".join(texts)))
+    if not matches:
+        return []
+    return [
+        (i, [piece if isinstance(piece, str) else _Tag(piece) for piece in pieces])
+        for i, pieces in split_tags(texts, matches)
+    ]
+
+
+def _row_template(partname: str, position: int, tr) -> Optional[RowTemplate]:
+    nodes = list(tr.iter(W_T))
+    if "{{" not in "".join(t.text or "" for t in nodes):
+        return None
+
+    index_of = {t: i for i, t in enumerate(nodes)}
+    plan = []
+    planned = {}  # w:t -> its index in plan
+    for p in tr.iter(W_P):
+        ts = paragraph_text_nodes(p)
+        for local, pieces in _plan_paragraph([t.text or "" for t in ts]):
+            planned[ts[local]] = len(plan)
+            plan.append((index_of[ts[local]], pieces))
+
+    tags = [piece for _, pieces in plan for piece in pieces if not isinstance(piece, str)]
+    fields = sorted({tag.field for tag in tags if tag.field})
+    lists = [tag.each for tag in tags if tag.each]
+    if not fields and not lists:
+        return None
+
+    list_checks = []
+    if tr.getparent().getparent().tag == W_BODY:
+        cells = [p for tc in tr.iterchildren(W_TC) for p in tc.iterchildren(W_P)]
+        dynamic = prepare_list_alignment(cells)
+        if dynamic:
+            position_of = {p: i for i, p in enumerate(tr.iter(W_P))}
+            list_checks = [
+                (position_of[p], [planned.get(t, t.text or "") for t in paragraph_text_nodes(p)])
+                for p in dynamic
+            ]
+    return RowTemplate(partname, position, lists[0] if lists else DEFAULT_LIST, fields, plan, list_checks)
+
+
+def find_repeating_rows(doc) -> List[RowTemplate]:
+    """Repeating rows of a parsed template, in document order per story part"""
+    rows = []
+    for partname, part in iter_story_parts(doc):
+        for position, tr in enumerate(part.element.iter(W_TR)):
+            row = _row_template(partname, position, tr)
+            if row is not None:
+                rows.append(row)
+    return rows
+
+
+def expand_rows(doc, rows: List[RowTemplate], context: Dict[str, Any]):
+    """Expand the repeating rows of a fresh template copy for one render"""
+    if not rows:
+        return
+    # Locate every row before inserting copies (positions refer to the template)
+    located = []
+    parts = dict(iter_story_parts(doc))
+    for partname in {row.partname for row in rows}:
+        trs = list(parts[partname].element.iter(W_TR))
+        located.extend((row, trs[row.position]) for row in rows if row.partname == partname)
+    for row, tr in located:
+        row.expand(tr, context)
@@ -0,0 +1,344 @@
+"""
+Compiled template cache
+
+Parses each .docx template once and keeps the python-docx tree in memory
+together with an index of the paragraphs that contain `{{...}}` tags and the
+plans of its repeating table rows. Renders deep-copy the cached tree instead
+of re-reading the zip, and only visit the indexed paragraphs. List lines are
+left-aligned once in the cached tree; renders only re-check the few whose
+text starts with a tag.
+
+The template's zip bytes are kept as well: a rendered document is saved by
+re-serializing only the story parts a render rewrites and passing every
+other member through unchanged (see docx_zip). Simple templates (plain
+`{{key}}` tags, no repeating rows) skip the python-docx copy altogether and
+only copy those story parts.
+"""
+
+import io
+import os
+import re
+import copy
+import hashlib
+import logging
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_P = f"{{{W_NS}}}p"
+W_TBL = f"{{{W_NS}}}tbl"
+
+# Template variable tag: {{key}}, {{ key }}, {{key }}, {{ key}}
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+def safe_template_path(template_dir: str, template_name: str) -> Optional[str]:
+    """
+    Join a template name onto the template directory, or return None if the
+    name is not a plain `.docx` file name (path separators, `..`, lock files).
+    """
+    if (
+        not template_name
+        or template_name != os.path.basename(template_name)
+        or "/" in template_name or "\\" in template_name
+        or template_name.startswith(("~$", "."))
+        or not template_name.endswith(".docx")
+    ):
+        return None
+    return os.path.join(os.path.abspath(template_dir), template_name)
+
+
+class _StoryParent:
+    """Minimal parent giving Paragraph proxies access to their owning part"""
+
+    def __init__(self, part):
+        self.part = part
+
+
+def iter_story_parts(doc):
+    """
+    Yield (partname, part) for the main document and every header/footer part.
+
+    Unlike `section.header`, this covers first-page and even-page variants too.
+    """
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+
+    yield str(doc.part.partname), doc.part
+    for rel in doc.part.rels.values():
+        if rel.is_external:
+            continue
+        if rel.reltype in (RT.HEADER, RT.FOOTER):
+            yield str(rel.target_part.partname), rel.target_part
+
+
+def build_placeholder_index(doc) -> Dict[str, List[int]]:
+    """
+    Map each story partname to the positions (in document order) of `w:p`
+    elements whose text contains a `{{` tag opener.
+    """
+    index = {}
+    for partname, part in iter_story_parts(doc):
+        positions = [
+            i for i, p in enumerate(part.element.iter(W_P))
+            if "{{" in "".join(p.itertext())
+        ]
+        if positions:
+            index[partname] = positions
+    return index
+
+
+class CompiledTemplate:
+    """A parsed template plus its placeholder index and repeating rows"""
+
+    def __init__(self, name: str, path: str, mtime_ns: int, size: int, content_hash: str, document,
+                 index: Dict[str, List[int]], approx_bytes: int, rows: list = None, package=None,
+                 list_checks: List[int] = None):
+        self.name = name
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.content_hash = content_hash
+        self.document = document
+        self.index = index
+        self.approx_bytes = approx_bytes
+        # RowTemplate per repeating table row (see table_rows)
+        self.rows = rows or []
+        # DocxPackage of the template file (zip member passthrough on save)
+        self.package = package
+        # Positions (main document `w:p` order) of list-rule paragraphs starting with a tag
+        self.list_checks = list_checks or []
+        self._schema: Optional[Dict[str, List[str]]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return (self.name, self.mtime_ns, self.size)
+
+    def schema(self) -> Dict[str, Any]:
+        """
+        Placeholder names by location: body paragraphs, table cells, headers
+        and footers, plus the item fields of each repeating-row list. Computed
+        on first use and kept with the compiled template.
+        """
+        if self._schema is None:
+            found = {"body": set(), "tables": set(), "headers": set(), "footers": set()}
+            for partname, part in iter_story_parts(self.document):
+                positions = self.index.get(partname)
+                if not positions:
+                    continue
+                content_type = part.content_type
+                elements = list(part.element.iter(W_P))
+                for i in positions:
+                    p = elements[i]
+                    if content_type.endswith("header+xml"):
+                        location = "headers"
+                    elif content_type.endswith("footer+xml"):
+                        location = "footers"
+                    elif next(p.iterancestors(W_TBL), None) is not None:
+                        location = "tables"
+                    else:
+                        location = "body"
+                    found[location].update(PLACEHOLDER_PATTERN.findall("".join(p.itertext())))
+            schema = {location: sorted(names) for location, names in found.items()}
+            lists: Dict[str, set] = {}
+            for row in self.rows:
+                lists.setdefault(row.list_name, set()).update(row.fields)
+            schema["lists"] = {name: sorted(fields) for name, fields in lists.items()}
+            self._schema = schema
+        return self._schema
+
+    def placeholders(self) -> List[str]:
+        """Sorted names of all `{{name}}` tags and repeating-row lists in the template"""
+        schema = self.schema()
+        locations = [names for location, names in schema.items() if location != "lists"]
+        return sorted(set(schema["lists"]).union(*locations))
+
+    def instantiate(self):
+        """
+        Deep-copy the cached document for a single render.
+
+        Returns:
+            (document, paragraphs, list_checks) where paragraphs are Paragraph
+            proxies for the indexed locations in the copy and list_checks the
+            `w:p` elements to run the list rule on after substitution
+        """
+        from docx.text.paragraph import Paragraph
+
+        with self._lock:
+            doc = copy.deepcopy(self.document)
+
+        paragraphs, list_checks = [], []
+        main = str(doc.part.partname)
+        for partname, part in iter_story_parts(doc):
+            positions = self.index.get(partname)
+            if not positions:
+                continue
+            parent = _StoryParent(part)
+            elements = list(part.element.iter(W_P))
+            paragraphs.extend(Paragraph(elements[i], parent) for i in positions)
+            if partname == main:
+                list_checks = [elements[i] for i in self.list_checks]
+        return doc, paragraphs, list_checks
+
+    def rewritten_parts(self, doc) -> Dict[str, Any]:
+        """
+        Root elements of the story parts of doc (this template or a copy)
+        that a render rewrites: the main document and every header/footer
+        with a tag, by zip member name. All other parts are saved unchanged.
+        """
+        main = str(doc.part.partname)
+        return {
+            partname.lstrip("/"): part.element
+            for partname, part in iter_story_parts(doc)
+            if partname == main or self.index.get(partname)
+        }
+
+    def instantiate_parts(self):
+        """
+        Deep-copy only the story parts a fast-path render rewrites.
+
+        Returns:
+            ({zip member name: root element}, `w:p` elements at the indexed
+            locations, `w:p` elements to run the list rule on, as in instantiate)
+        """
+        parts, paragraphs, list_checks = {}, [], []
+        main = str(self.document.part.partname)
+        for name, element in self.rewritten_parts(self.document).items():
+            with self._lock:
+                element = copy.deepcopy(element)
+            parts[name] = element
+            positions = self.index.get("/" + name)
+            if positions:
+                elements = list(element.iter(W_P))
+                paragraphs.extend(elements[i] for i in positions)
+                if "/" + name == main:
+                    list_checks = [elements[i] for i in self.list_checks]
+        return parts, paragraphs, list_checks
+
+
+def compile_template(name: str, path: str) -> CompiledTemplate:
+    """Parse a template file and build its placeholder index, row plans and list alignment"""
+    from docx import Document
+    from .table_rows import find_repeating_rows
+    from .docx_zip import DocxPackage
+    from .substitution import list_paragraphs, prepare_list_alignment
+
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    document = Document(io.BytesIO(data))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        # Uncompressed part size is a cheap proxy for the parsed tree footprint
+        approx_bytes = sum(info.file_size for info in zf.infolist())
+    # The zip bytes are kept for saving renders with member passthrough
+    approx_bytes += len(data)
+    list_checks = prepare_list_alignment(list(list_paragraphs(document.element.body)))
+    if list_checks:
+        position = {p: i for i, p in enumerate(document.element.iter(W_P))}
+        list_checks = [position[p] for p in list_checks]
+    return CompiledTemplate(
+        name=name,
+        path=path,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        content_hash=hashlib.sha256(data).hexdigest(),
+        document=document,
+        index=build_placeholder_index(document),
+        approx_bytes=approx_bytes,
+        rows=find_repeating_rows(document),
+        package=DocxPackage(data),
+        list_checks=list_checks,
+    )
+
+
+class TemplateCache:
+    """LRU cache of CompiledTemplate keyed by name + mtime + size, bounded by count and memory"""
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None):
+        settings = get_settings()
+        self.max_entries = max_entries or settings.template_cache_max_entries
+        self.max_bytes = max_bytes or settings.template_cache_max_bytes
+        self._entries: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_dir: str, template_name: str) -> CompiledTemplate:
+        """
+        Return the compiled template, (re)compiling it if the file changed.
+
+        Raises:
+            FileNotFoundError: if the template does not exist
+        """
+        path = safe_template_path(template_dir, template_name)
+        if path is None:
+            raise FileNotFoundError(f"Template '{template_name}' not found")
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            raise FileNotFoundError(f"Template '{template_name}' not found")
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+
+        self.misses += 1
+        entry = compile_template(template_name, path)
+        logger.info(f"Compiled template {template_name}: {sum(len(v) for v in entry.index.values())} tagged paragraphs")
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.total_bytes -= old.approx_bytes
+            if entry.approx_bytes <= self.max_bytes:
+                self._entries[path] = entry
+                self.total_bytes += entry.approx_bytes
+                self._evict()
+        return entry
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, old = self._entries.popitem(last=False)
+            self.total_bytes -= old.approx_bytes
+
+    def invalidate(self, path: Optional[str] = None):
+        """Drop one template (by path) or the whole cache"""
+        path = os.path.abspath(path) if path is not None else None
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.total_bytes = 0
+                return
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.total_bytes -= old.approx_bytes
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Singleton cache shared by all engines in the process
+_cache = None
+
+
+def get_template_cache() -> TemplateCache:
+    global _cache
+    if _cache is None:
+        _cache = TemplateCache()
+    return _cache
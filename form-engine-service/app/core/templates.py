@@ -0,0 +1,187 @@
+"""
+Template registry
+
+Keeps the list of templates (name, size, mtime, content hash, placeholders
+by location) in memory so /templates requests do not glob and stat the
+directory. The registry is loaded at startup and refreshed by watchdog
+events when the package is installed, otherwise by an mtime poll. A changed
+or deleted file drops its entry from the parsed-template cache.
+"""
+
+import os
+import logging
+import datetime
+import threading
+from typing import Dict, Any, List, Optional
+
+from .config import get_settings
+from .template_cache import get_template_cache, safe_template_path
+
+logger = logging.getLogger(__name__)
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # Fall back to polling
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Wakes the registry thread on any change in the template directory"""
+
+    def __init__(self, wakeup: threading.Event):
+        self._wakeup = wakeup
+
+    def on_any_event(self, event):
+        self._wakeup.set()
+
+
+class TemplateRegistry:
+    """In-memory index of the templates in one directory"""
+
+    def __init__(self, template_dir: str, poll_interval: float = None):
+        self.template_dir = template_dir
+        self.poll_interval = poll_interval or get_settings().template_poll_interval
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # One scan at a time: templates are compiled once
+        self._loaded = False
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+
+    def refresh(self) -> List[str]:
+        """
+        Rescan the directory; (re)index new or changed files and drop deleted ones.
+
+        Returns:
+            Names of the templates that were added, changed or removed
+        """
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self) -> List[str]:
+        seen = {}
+        try:
+            with os.scandir(self.template_dir) as entries:
+                for entry in entries:
+                    if safe_template_path(self.template_dir, entry.name) and entry.is_file():
+                        seen[entry.name] = entry.stat()
+        except FileNotFoundError:
+            pass
+
+        cache = get_template_cache()
+        changed = []
+        for name, stat in seen.items():
+            current = self._entries.get(name)
+            if current is not None and current["mtime_ns"] == stat.st_mtime_ns and current["size"] == stat.st_size:
+                continue
+            path = os.path.join(self.template_dir, name)
+            cache.invalidate(path)
+            try:
+                compiled = cache.get(self.template_dir, name)
+            except Exception as e:
+                # Half-copied or corrupt file: retry on the next scan
+                logger.warning(f"Could not index template {name}: {e}")
+                continue
+            entry = {
+                "name": name,
+                "path": path,
+                "size": compiled.size,
+                "modified": datetime.datetime.fromtimestamp(compiled.mtime_ns / 1e9).isoformat(),
+                "mtime_ns": compiled.mtime_ns,
+                "sha256": compiled.content_hash,
+                "placeholders": compiled.placeholders(),
+                "schema": compiled.schema(),
+            }
+            with self._lock:
+                self._entries[name] = entry
+            changed.append(name)
+
+        for name in set(self._entries) - set(seen):
+            cache.invalidate(os.path.join(self.template_dir, name))
+            with self._lock:
+                self._entries.pop(name, None)
+            changed.append(name)
+
+        self._loaded = True
+        if changed:
+            logger.info(f"Template registry updated: {', '.join(sorted(changed))}")
+        return changed
+
+    def _ensure_loaded(self):
+        # Normally done by start(); concurrent first callers wait for one scan
+        if not self._loaded:
+            with self._refresh_lock:
+                if not self._loaded:
+                    self._refresh()
+
+    def list(self) -> List[Dict[str, Any]]:
+        """All templates sorted by name"""
+        self._ensure_loaded()
+        with self._lock:
+            return [dict(self._entries[name]) for name in sorted(self._entries)]
+
+    def get(self, template_name: str) -> Optional[Dict[str, Any]]:
+        """One template's entry, or None if it is unknown"""
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(template_name)
+            return dict(entry) if entry is not None else None
+
+    def start(self):
+        """Load the registry and start watching the directory"""
+        self.refresh()
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        if Observer is not None and os.path.isdir(self.template_dir):
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_ChangeHandler(self._wakeup), self.template_dir, recursive=False)
+                self._observer.start()
+            except Exception as e:
+                logger.warning(f"Template watcher unavailable, polling instead: {e}")
+                self._observer = None
+        self._thread = threading.Thread(target=self._loop, name="template-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # Watchdog events wake the thread early; the poll still runs as a safety net
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Template registry refresh failed: {e}")
+
+
+# One registry per template directory in the process
+_registries: Dict[str, TemplateRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_template_registry(template_dir: str = None) -> TemplateRegistry:
+    template_dir = os.path.abspath(template_dir or get_settings().template_dir)
+    with _registries_lock:
+        registry = _registries.get(template_dir)
+        if registry is None:
+            registry = TemplateRegistry(template_dir)
+            _registries[template_dir] = registry
+        return registry
@@ -4,7 +4,9 @@ Form Engine Service - FastAPI Application
 A microservice for generating DOCX and PDF documents from templates.
 """
 
+import asyncio
 import logging
+import threading
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -13,7 +15,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from .core.config import get_settings
-from .api.routes import forms, health
+from .core.office import get_office_pool
+from .core.executor import get_render_executor
+from .core.jobs import get_job_runner
+from .core.audit import close_audit_writers
+from .core.audit_store import backfill_audit_index
+from .core.health import get_health_monitor
+from .core.storage import get_retention_sweeper
+from .core.templates import get_template_registry
+from .api.routes import forms, health, jobs, audit, metrics
 
 # Configure logging
 logging.basicConfig(
@@ -35,9 +45,46 @@ async def lifespan(app: FastAPI):
     Path(settings.output_dir).mkdir(parents=True, exist_ok=True)
     Path(settings.log_dir).mkdir(parents=True, exist_ok=True)
 
+    # Index templates (also warms the parsed-template cache) and watch for changes
+    template_registry = get_template_registry(settings.template_dir)
+    await asyncio.to_thread(template_registry.start)
+
+    # Warm up the LibreOffice pool so the first render does not pay the cold start
+    office_pool = get_office_pool()
+    try:
+        office_pool.start()
+    except Exception as e:
+        logger.warning(f"LibreOffice pool not started, PDF conversion disabled: {e}")
+
+    # Resume persisted render jobs
+    job_runner = get_job_runner()
+    job_runner.start()
+
+    # Index audit records that reached audit.jsonl but not the index (e.g. a
+    # failing index write right before the last shutdown)
+    if settings.audit_index_enabled:
+        threading.Thread(
+            target=backfill_audit_index, args=(settings.log_dir,), name="audit-backfill", daemon=True
+        ).start()
+
+    # Component checks run in the background; probes read the snapshot
+    health_monitor = get_health_monitor()
+    await health_monitor.start()
+
+    # Delete expired / over-quota output files (when retention or a quota is set)
+    retention_sweeper = get_retention_sweeper()
+    await retention_sweeper.start()
+
     yield
 
     logger.info("Shutting down Form Engine Service")
+    await health_monitor.stop()
+    await retention_sweeper.stop()
+    job_runner.stop()
+    template_registry.stop()
+    get_render_executor().shutdown()
+    office_pool.close()
+    close_audit_writers()
 
 
 def create_app() -> FastAPI:
@@ -60,9 +107,20 @@ A microservice for generating DOCX and PDF documents from Word templates.
 
 ### Endpoints:
 - `POST /api/v1/forms/render` - Render a template
+- `POST /api/v1/forms/render-batch` - Render several templates at once
+- `POST /api/v1/forms/dossier` - Merge several forms into one PDF/DOCX
+- `POST /api/v1/forms/merge` - Mail merge one template over a CSV/JSONL upload
+- `POST /api/v1/forms/jobs` - Enqueue an asynchronous render
+- `GET /api/v1/forms/jobs/{id}` - Render job status and result
+- `GET /api/v1/forms/queue` - Render queue statistics
 - `GET /api/v1/forms/templates` - List available templates
 - `GET /api/v1/forms/templates/{name}` - Get template info
+- `GET /api/v1/forms/templates/{name}/schema` - Placeholders a template expects
+- `GET /api/v1/audit` - Search the audit log
 - `GET /api/v1/health` - Health check
+- `GET /api/v1/health/live` - Liveness probe
+- `GET /api/v1/health/ready` - Readiness probe (503 when saturated)
+- `GET /metrics` - Prometheus metrics
         """,
         lifespan=lifespan,
         docs_url="/docs",
@@ -85,7 +143,10 @@ A microservice for generating DOCX and PDF documents from Word templates.
 
     # Include routers
     app.include_router(health.router, prefix="/api/v1")
+    app.include_router(jobs.router, prefix="/api/v1")
     app.include_router(forms.router, prefix="/api/v1")
+    app.include_router(audit.router, prefix="/api/v1")
+    app.include_router(metrics.router)
 
     # Root route
     @app.get("/")
@@ -98,8 +98,20 @@ FORM_DATA = {
     },
 
     "4b": lambda _: {
-        "so_de_tai": "5",
-        # Table data handled separately
+        "so_de_tai": str(len(TABLE_DATA_4B)),
+        "danh_sach_de_tai": [
+            {
+                "ten_de_tai": item["ten"],
+                "ban_chu_nhiem": item["cn"],
+                "muc_tieu": item["mt"],
+                "tinh_cap_thien_va_tinh_moi": item["tm"],
+                "noi_dung_chinh": "- Nội dung 1\n- Nội dung 2",
+                "ket_qua_du_kien": item["kq"],
+                "kha_nang_va_dia_chi_ung_dung": item["ud"],
+                "kinh_phi": item["kp"],
+            }
+            for item in TABLE_DATA_4B
+        ],
     },
 
     "5b": lambda _: {
@@ -123,6 +135,7 @@ FORM_DATA = {
 
     "8b": lambda _: {
         "ten_khoa": "CÔNG NGHỆ THÔNG TIN",
+        "danh_sach_uy_vien": COUNCIL_MEMBERS,
     },
 
     "9b": lambda _: {
@@ -154,7 +167,9 @@ FORM_DATA = {
         "ho_ten_phan_bien": "PGS.TS. Trần Phản Biện",
     },
 
-    "13b": lambda _: {},
+    "13b": lambda _: {
+        "danh_sach_uy_vien": COUNCIL_MEMBERS,
+    },
 
     "14b": lambda is_approved: {
         "ho_ten": "TS. Phạm Văn D",
@@ -206,6 +221,14 @@ TABLE_DATA_4B = [
 ]
 
 
+# Council members after the chair and secretary (forms 8b, 13b)
+COUNCIL_MEMBERS = [
+    {"ho_ten_uy_vien": "TS. Phạm Văn C", "don_vi_ct_uy_vien": "Khoa Điện"},
+    {"ho_ten_uy_vien": "TS. Hoàng Văn D", "don_vi_ct_uy_vien": "Khoa Cơ khí"},
+    {"ho_ten_uy_vien": "ThS. Đỗ Thị E", "don_vi_ct_uy_vien": "Khoa Công nghệ Thông tin"},
+]
+
+
 # List of valid form IDs for validation
 VALID_FORM_IDS = [
     '1b', '2b', '3b', '4b', '5b', '6b', '7b', '8b', '9b',
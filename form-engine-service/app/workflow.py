@@ -0,0 +1,32 @@
+"""
+Proposal workflow - forms required by each proposal status.
+
+Adapted from WORKFLOW_TRANSITIONS in
+modul_create_temple/form_engine/src/schemas/all_forms.py for FastAPI service.
+"""
+from typing import List
+
+
+# Forms that must be produced to leave each status
+REQUIRED_FORMS = {
+    "DRAFT": ["1b"],
+    "FACULTY_REVIEW": ["2b", "3b"],
+    "SCHOOL_SELECTION": ["5b"],
+    "COUNCIL_REVIEW": ["6b", "7b"],
+    "APPROVED": [],
+    "IN_PROGRESS": [],
+    "FACULTY_ACCEPTANCE": ["8b", "9b", "10b", "11b"],
+    "SCHOOL_ACCEPTANCE": ["12b", "14b", "15b", "16b"],
+    "COMPLETED": ["17b"],
+}
+
+
+def get_required_forms(status: str) -> List[str]:
+    """Form IDs required for a proposal status (e.g. 'FACULTY_ACCEPTANCE' -> 8b..11b)"""
+    return REQUIRED_FORMS.get(status.upper(), [])
+
+
+def form_template_name(form_id: str) -> str:
+    """Template file for a form ID ('pl1' -> 'PL1.docx', '8b' -> '8b.docx')"""
+    form_id = form_id.lower()
+    return f"{form_id.upper() if form_id.startswith('pl') else form_id}.docx"
@@ -0,0 +1,314 @@
+"""
+Render benchmark
+
+Renders every template in templates/ with the sample contexts from
+app.sample_data (approved and rejected variants) and writes a JSON report:
+
+- direct: per-template latency percentiles of FormEngine.render, single thread
+- stages: per-stage (and per-template, per-stage) percentiles
+- http: throughput and latency of POST /api/v1/forms/render at each
+  concurrency level, against the app in-process through httpx's ASGI transport
+- peak RSS of the process (and of reaped child processes)
+
+Usage (from form-engine-service/):
+
+    python benchmarks/bench.py --mode docx --iterations 20 --concurrency 1,4,8 -o bench-docx.json
+    python benchmarks/bench.py --mode pdf --iterations 3 --concurrency 1,2 -o bench-pdf.json
+    python benchmarks/bench.py compare bench-before.json bench-after.json
+
+The result cache is disabled unless --result-cache is given, so every
+iteration measures a real render.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import datetime
+import subprocess
+from collections import defaultdict
+from typing import Dict, Any, List
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p90/p95/p99/mean/max in milliseconds"""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(1000 * ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))], 3)
+
+    return {
+        "n": len(ordered),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": round(1000 * sum(ordered) / len(ordered), 3),
+        "max": round(1000 * ordered[-1], 3),
+    }
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident set size (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def configure_environment(args, work_dir: str):
+    """Point the service at scratch dirs; must run before importing app modules"""
+    os.environ["FORM_ENGINE_TEMPLATE_DIR"] = args.template_dir
+    os.environ["FORM_ENGINE_OUTPUT_DIR"] = os.path.join(work_dir, "output")
+    os.environ["FORM_ENGINE_LOG_DIR"] = os.path.join(work_dir, "logs")
+    os.environ["FORM_ENGINE_OFFICE_PROFILE_DIR"] = os.path.join(work_dir, "office")
+    os.environ["FORM_ENGINE_RESULT_CACHE_ENABLED"] = "true" if args.result_cache else "false"
+    os.environ["FORM_ENGINE_RENDER_WORKERS"] = str(args.render_workers)
+    # Queue everything: the benchmark measures latency, not 503 behaviour
+    os.environ["FORM_ENGINE_RENDER_MAX_QUEUE"] = str(max(args.concurrency) * 4)
+    if args.mode == "docx":
+        os.environ["FORM_ENGINE_OFFICE_BINARY"] = "form-engine-bench-no-office"
+    sys.path.insert(0, SERVICE_DIR)
+
+
+def build_cases(template_dir: str, only: List[str]) -> List[Dict[str, Any]]:
+    from app.sample_data import get_sample_data
+
+    names = sorted(n for n in os.listdir(template_dir) if n.endswith(".docx") and not n.startswith("~$"))
+    if only:
+        names = [n for n in names if n in only or n[:-5] in only]
+    return [
+        {"template": name, "variant": "approved" if approved else "rejected",
+         "context": get_sample_data(name[:-5].lower(), is_approved=approved)}
+        for name in names for approved in (True, False)
+    ]
+
+
+def run_direct(cases: List[Dict[str, Any]], iterations: int) -> Dict[str, Any]:
+    """Single-threaded FormEngine.render latencies plus stage timings"""
+    from app.core.engine import FormEngine
+    from app.core.metrics import add_stage_listener
+
+    engine = FormEngine()
+    stage_samples = defaultdict(list)
+    template_stage_samples = defaultdict(lambda: defaultdict(list))
+    recording = {"on": False}
+
+    def on_stage(template_name: str, stage: str, seconds: float):
+        if recording["on"]:
+            stage_samples[stage].append(seconds)
+            template_stage_samples[template_name][stage].append(seconds)
+
+    add_stage_listener(on_stage)
+
+    latencies = defaultdict(lambda: defaultdict(list))
+    started = time.perf_counter()
+    for case in cases:
+        # Warm-up: compiles the template and starts office workers
+        engine.render(case["template"], case["context"], user_id="bench")
+        recording["on"] = True
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            engine.render(case["template"], case["context"], user_id="bench")
+            latencies[case["template"]][case["variant"]].append(time.perf_counter() - t0)
+        recording["on"] = False
+    elapsed = time.perf_counter() - started
+
+    all_samples = [s for variants in latencies.values() for v in variants.values() for s in v]
+    return {
+        "renders": len(all_samples),
+        "elapsed_s": round(elapsed, 3),
+        "overall": percentiles(all_samples),
+        "templates": {
+            template: {
+                "all": percentiles([s for v in variants.values() for s in v]),
+                **{variant: percentiles(samples) for variant, samples in variants.items()},
+            }
+            for template, variants in sorted(latencies.items())
+        },
+        "stages": {stage: percentiles(samples) for stage, samples in stage_samples.items()},
+        "template_stages": {
+            template: {stage: percentiles(samples) for stage, samples in stages.items()}
+            for template, stages in sorted(template_stage_samples.items())
+        },
+    }
+
+
+async def run_http(cases: List[Dict[str, Any]], concurrency_levels: List[int], requests: int) -> List[Dict[str, Any]]:
+    """POST /render through the ASGI app at each concurrency level"""
+    import httpx
+    from app.main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            for concurrency in concurrency_levels:
+                semaphore = asyncio.Semaphore(concurrency)
+                latencies, errors, rejected = [], 0, 0
+
+                async def one(i: int):
+                    nonlocal errors, rejected
+                    case = cases[i % len(cases)]
+                    async with semaphore:
+                        t0 = time.perf_counter()
+                        response = await client.post("/api/v1/forms/render", json={
+                            "template_name": case["template"],
+                            "context": case["context"],
+                            "user_id": "bench",
+                        })
+                        latencies.append(time.perf_counter() - t0)
+                    if response.status_code == 503:
+                        rejected += 1
+                    elif response.status_code != 200 or not response.json().get("success"):
+                        errors += 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(one(i) for i in range(requests)))
+                elapsed = time.perf_counter() - started
+                results.append({
+                    "concurrency": concurrency,
+                    "requests": requests,
+                    "errors": errors,
+                    "rejected": rejected,
+                    "elapsed_s": round(elapsed, 3),
+                    "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+                    "latency": percentiles(latencies),
+                })
+                print(f"  concurrency {concurrency}: {results[-1]['throughput_rps']} req/s, "
+                      f"p95 {results[-1]['latency'].get('p95')} ms, errors {errors}, rejected {rejected}")
+    return results
+
+
+def run(args) -> Dict[str, Any]:
+    work_dir = tempfile.mkdtemp(prefix="form-engine-bench-")
+    try:
+        configure_environment(args, work_dir)
+        logging.basicConfig(level=logging.ERROR)
+
+        if args.mode == "pdf":
+            from app.core.office import get_office_pool
+            if not get_office_pool().available():
+                sys.exit("PDF mode needs LibreOffice ('soffice') on PATH")
+            get_office_pool().start()
+
+        cases = build_cases(args.template_dir, args.templates)
+        print(f"{len(cases)} cases ({len(cases) // 2} templates x approved/rejected), mode={args.mode}")
+
+        print("Direct renders...")
+        direct = run_direct(cases, args.iterations)
+        print(f"  {direct['renders']} renders, p50 {direct['overall'].get('p50')} ms, "
+              f"p95 {direct['overall'].get('p95')} ms")
+
+        print("HTTP (in-process ASGI)...")
+        http = asyncio.run(run_http(cases, args.concurrency, args.requests or len(cases) * 2))
+
+        return {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "mode": args.mode,
+                "iterations": args.iterations,
+                "render_workers": args.render_workers,
+                "result_cache": args.result_cache,
+            },
+            "direct": direct,
+            "http": http,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    finally:
+        from app.core.office import get_office_pool
+        from app.core.audit import close_audit_writers
+        get_office_pool().close()
+        close_audit_writers()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(before_path: str, after_path: str):
+    """Print p50/p95 changes per template and stage between two reports"""
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+
+    def row(label: str, old: Dict[str, Any], new: Dict[str, Any]):
+        cells = []
+        for key in ("p50", "p95"):
+            if key in old and key in new and old[key]:
+                change = 100 * (new[key] - old[key]) / old[key]
+                cells.append(f"{key} {old[key]:>9.2f} -> {new[key]:>9.2f} ms ({change:+6.1f}%)")
+        print(f"{label:<28} " + "   ".join(cells))
+
+    print(f"{before['meta'].get('commit') or before_path} -> {after['meta'].get('commit') or after_path}")
+    row("overall", before["direct"]["overall"], after["direct"]["overall"])
+    for template, stats in after["direct"]["templates"].items():
+        if template in before["direct"]["templates"]:
+            row(template, before["direct"]["templates"][template]["all"], stats["all"])
+    for stage, stats in after["direct"]["stages"].items():
+        if stage in before["direct"]["stages"]:
+            row(f"stage:{stage}", before["direct"]["stages"][stage], stats)
+    old_http = {h["concurrency"]: h for h in before["http"]}
+    for h in after["http"]:
+        if h["concurrency"] in old_http:
+            print(f"{'http c=' + str(h['concurrency']):<28} "
+                  f"{old_http[h['concurrency']]['throughput_rps']} -> {h['throughput_rps']} req/s")
+
+
+def main(argv: List[str] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "compare":
+        parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+        parser.add_argument("before")
+        parser.add_argument("after")
+        args = parser.parse_args(argv[1:])
+        compare(args.before, args.after)
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark template rendering")
+    parser.add_argument("--mode", choices=["docx", "pdf"], default="docx", help="DOCX only, or DOCX + PDF")
+    parser.add_argument("--iterations", type=int, default=10, help="Timed direct renders per template variant")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated HTTP concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="HTTP requests per level (default: 2 x cases)")
+    parser.add_argument("--render-workers", type=int, default=4, help="FORM_ENGINE_RENDER_WORKERS")
+    parser.add_argument("--templates", nargs="*", default=[], help="Only these templates (e.g. 1b 4b.docx)")
+    parser.add_argument("--template-dir", default=os.path.join(SERVICE_DIR, "templates"))
+    parser.add_argument("--result-cache", action="store_true", help="Keep the render result cache enabled")
+    parser.add_argument("-o", "--output", default="", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    report = run(args)
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+        print(f"Report written to {args.output} (peak RSS {report['peak_rss_mb']['self']} MB)")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
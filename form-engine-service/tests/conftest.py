@@ -0,0 +1,29 @@
+"""
+Shared fixtures: every test session gets its own template, output and log
+directories so the service never touches the real ones.
+"""
+
+import os
+import tempfile
+
+_root = tempfile.mkdtemp(prefix="form-engine-tests-")
+for _name in ("templates", "output", "logs"):
+    os.makedirs(os.path.join(_root, _name), exist_ok=True)
+os.environ["FORM_ENGINE_TEMPLATE_DIR"] = os.path.join(_root, "templates")
+os.environ["FORM_ENGINE_OUTPUT_DIR"] = os.path.join(_root, "output")
+os.environ["FORM_ENGINE_LOG_DIR"] = os.path.join(_root, "logs")
+
+import pytest
+from docx import Document
+
+
+@pytest.fixture
+def make_template(tmp_path):
+    """Write a small .docx template with one paragraph per line and return its directory"""
+    def make(name: str, *lines: str) -> str:
+        document = Document()
+        for line in lines:
+            document.add_paragraph(line)
+        document.save(str(tmp_path / f"{name}.docx"))
+        return str(tmp_path)
+    return make
@@ -0,0 +1,123 @@
+import os
+import glob
+import gzip
+import json
+import time
+import datetime
+from collections import Counter
+
+from app.core.audit import AuditWriter
+from app.core.audit_store import AuditStore
+
+
+def make_writer(tmp_path, **options) -> AuditWriter:
+    options.setdefault("batch_size", 100)
+    options.setdefault("flush_interval", 60)
+    options.setdefault("max_bytes", 1024 * 1024)
+    options.setdefault("rotate_daily", False)
+    options.setdefault("compress", False)
+    options.setdefault("fsync", False)
+    return AuditWriter(str(tmp_path / "audit.jsonl"), **options)
+
+
+def record(i: int) -> dict:
+    return {"timestamp": f"2026-01-01T00:00:{i % 60:02d}", "template": "1b.docx", "seq": i}
+
+
+def read_all(tmp_path) -> list:
+    """Every record of audit.jsonl and its rotated segments, compressed or not"""
+    records = []
+    for path in glob.glob(str(tmp_path / "audit*.jsonl*")):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_full_batch_is_written_without_waiting_for_the_interval(tmp_path):
+    writer = make_writer(tmp_path, batch_size=5)
+    batches = []
+    writer.add_listener(batches.append)
+
+    for i in range(5):
+        writer.write(record(i))
+    started = time.monotonic()
+    writer.flush()
+
+    assert time.monotonic() - started < 5
+    assert [len(b) for b in batches] == [5]
+    assert [r["seq"] for r in read_all(tmp_path)] == list(range(5))
+    writer.close()
+
+
+def test_partial_batch_is_written_after_the_flush_interval(tmp_path):
+    writer = make_writer(tmp_path, flush_interval=0.05)
+    batches = []
+    writer.add_listener(batches.append)
+
+    writer.write(record(0))
+    writer.write(record(1))
+    writer.flush()
+
+    assert [[r["seq"] for r in b] for b in batches] == [[0, 1]]
+    writer.close()
+
+
+def test_size_rotation_loses_and_duplicates_nothing(tmp_path):
+    writer = make_writer(tmp_path, batch_size=4, flush_interval=0.01, max_bytes=300, compress=True)
+    for i in range(60):
+        writer.write(record(i))
+    writer.close()
+
+    rotated = glob.glob(str(tmp_path / "audit-*.jsonl.gz"))
+    assert len(rotated) > 1
+    # Compressed segments replace the plain ones, and none outgrew the limit
+    assert not glob.glob(str(tmp_path / "audit-*.jsonl"))
+    for path in rotated:
+        with gzip.open(path, "rb") as f:
+            assert len(f.read()) <= 300
+    assert Counter(r["seq"] for r in read_all(tmp_path)) == Counter(range(60))
+
+
+def test_daily_rotation_names_the_segment_after_its_day(tmp_path):
+    writer = make_writer(tmp_path, flush_interval=0.01, rotate_daily=True)
+    writer.write(record(0))
+    writer.flush()
+    yesterday = time.time() - 86400
+    os.utime(writer.path, (yesterday, yesterday))
+
+    writer.write(record(1))
+    writer.close()
+
+    day = datetime.date.fromtimestamp(yesterday).strftime("%Y%m%d")
+    (segment,) = glob.glob(str(tmp_path / f"audit-{day}-*.jsonl"))
+    with open(segment, encoding="utf-8") as f:
+        assert [json.loads(line)["seq"] for line in f] == [0]
+    with open(writer.path, encoding="utf-8") as f:
+        assert [json.loads(line)["seq"] for line in f] == [1]
+
+
+def test_failed_listener_gets_its_records_with_the_next_batch(tmp_path):
+    store = AuditStore(str(tmp_path / "audit.db"))
+    calls = []
+
+    def flaky_index(records):
+        calls.append([r["seq"] for r in records])
+        if len(calls) == 1:
+            raise OSError("database is locked")
+        store.insert_many(records)
+
+    writer = make_writer(tmp_path, batch_size=2)
+    writer.add_listener(flaky_index)
+    for i in range(4):
+        writer.write(record(i))
+        if i % 2:
+            writer.flush()
+    writer.close()
+
+    assert calls == [[0, 1], [0, 1, 2, 3]]
+    total, rows = store.query(limit=10)
+    assert total == 4
+    assert sorted(r["seq"] for r in rows) == [0, 1, 2, 3]
+    # Offering the same records again does not duplicate them
+    assert store.insert_many(record(i) for i in range(4)) == 0
@@ -0,0 +1,97 @@
+import io
+import zipfile
+
+import pytest
+from docx import Document
+
+from app.core import docx_zip
+from app.core.docx_zip import DocxPackage
+
+DOCUMENT = "word/document.xml"
+IMAGE = "word/media/image1.png"
+
+
+class Unseekable(io.RawIOBase):
+    """Write-only stream without tell/seek, like a response body"""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def make_template() -> bytes:
+    """
+    A .docx written the way some editors do: through a non-seekable stream,
+    so every member carries a data descriptor, plus one stored member.
+    """
+    document = Document()
+    document.add_paragraph("Name: {{name}}")
+    source = io.BytesIO()
+    document.save(source)
+
+    stream = Unseekable()
+    with zipfile.ZipFile(io.BytesIO(source.getvalue())) as src, zipfile.ZipFile(stream, "w") as dst:
+        for info in src.infolist():
+            member = zipfile.ZipInfo(info.filename, date_time=(2024, 5, 6, 7, 8, 10))
+            member.compress_type = zipfile.ZIP_DEFLATED
+            with dst.open(member, "w") as f:
+                f.write(src.read(info))
+        image = zipfile.ZipInfo(IMAGE, date_time=(2024, 5, 6, 7, 8, 10))
+        image.compress_type = zipfile.ZIP_STORED
+        with dst.open(image, "w") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4)
+    return stream.buffer.getvalue()
+
+
+@pytest.fixture(params=["raw copy", "writestr fallback"])
+def passthrough(request, monkeypatch):
+    if request.param == "writestr fallback":
+        monkeypatch.setattr(docx_zip, "raw_copy_supported", lambda zf: False)
+    return request.param
+
+
+@pytest.mark.parametrize("seekable", [True, False])
+def test_write_round_trips_every_member(passthrough, seekable):
+    data = make_template()
+    with zipfile.ZipFile(io.BytesIO(data)) as template:
+        members = template.infolist()
+        assert all(info.flag_bits & 0x08 for info in members)
+        assert template.getinfo(IMAGE).compress_type == zipfile.ZIP_STORED
+        new_document = template.read(DOCUMENT).replace(b"{{name}}", b"Nguyen Van A")
+        contents = {info.filename: template.read(info) for info in members}
+
+    target = io.BytesIO() if seekable else Unseekable()
+    DocxPackage(data).write(target, {DOCUMENT: new_document})
+    output = target.getvalue() if seekable else target.buffer.getvalue()
+
+    with zipfile.ZipFile(io.BytesIO(output)) as rendered:
+        assert rendered.testzip() is None
+        assert rendered.namelist() == [info.filename for info in members]
+        for info in members:
+            copy = rendered.getinfo(info.filename)
+            assert copy.date_time == info.date_time
+            if info.filename == DOCUMENT:
+                assert rendered.read(copy) == new_document
+                continue
+            assert rendered.read(copy) == contents[info.filename]
+            assert copy.compress_type == info.compress_type
+            assert copy.CRC == info.CRC
+
+    assert [p.text for p in Document(io.BytesIO(output)).paragraphs] == ["Name: Nguyen Van A"]
+
+
+def test_raw_copy_keeps_compressed_bytes():
+    data = make_template()
+    package = DocxPackage(data)
+    target = io.BytesIO()
+    package.write(target, {})
+
+    copied = DocxPackage(target.getvalue())
+    for info, copy in zip(package.members, copied.members):
+        assert bytes(copied.raw(copy)) == bytes(package.raw(info))
+        assert not copy.flag_bits & 0x08
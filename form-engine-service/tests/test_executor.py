@@ -0,0 +1,42 @@
+import time
+import threading
+
+import pytest
+
+from app.core.executor import RenderExecutor, ExecutorSaturated
+
+
+def wait_idle(executor):
+    """Slots are released by a done-callback, which may run just after result() returns"""
+    deadline = time.monotonic() + 5
+    while executor.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return executor.stats()["in_flight"]
+
+
+def test_multi_slot_work_counts_against_the_limit():
+    executor = RenderExecutor(max_workers=2, max_queue=2)
+    started, finish = threading.Event(), threading.Event()
+
+    def batch():
+        started.set()
+        finish.wait(5)
+
+    future = executor.submit(batch, slots=3)
+    started.wait(5)
+    assert executor.stats()["in_flight"] == 3
+    with pytest.raises(ExecutorSaturated):
+        executor.submit(lambda: None, slots=2)
+    assert executor.submit(lambda: "single").result(5) == "single"
+
+    finish.set()
+    future.result(5)
+    assert wait_idle(executor) == 0
+    executor.shutdown()
+
+
+def test_slots_are_capped_at_capacity():
+    executor = RenderExecutor(max_workers=1, max_queue=1)
+    assert executor.submit(lambda: "done", slots=10).result(5) == "done"
+    assert wait_idle(executor) == 0
+    executor.shutdown()
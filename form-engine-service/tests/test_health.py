@@ -0,0 +1,43 @@
+import time
+import asyncio
+
+from app.api.routes import health as health_routes
+from app.core import health
+from app.core.health import HealthMonitor
+
+
+class FullExecutor:
+    def stats(self):
+        return {"workers": 2, "max_queue": 2, "in_flight": 4, "queued": 2, "rejected": 7}
+
+
+def make_monitor(monkeypatch, **components) -> HealthMonitor:
+    monitor = HealthMonitor(interval=10)
+    monitor.snapshot = {"components": components, "caches": {}, "timestamp": None}
+    monitor.checked_at = time.monotonic()
+    monkeypatch.setattr(health, "_monitor", monitor)
+    monkeypatch.setattr(health, "get_render_executor", FullExecutor)
+    return monitor
+
+
+def test_saturated_queue_fails_readiness_but_not_health(monkeypatch):
+    make_monitor(monkeypatch, templates={"ok": True, "count": 3}, output_dir={"ok": True})
+
+    ready = asyncio.run(health_routes.readiness())
+    summary = asyncio.run(health_routes.health_check())
+
+    assert ready.status_code == 503
+    assert summary.status == "healthy"
+    assert summary.components["render_queue"]["ok"] is False
+
+
+def test_failed_component_makes_health_unhealthy(monkeypatch):
+    make_monitor(monkeypatch, templates={"ok": False, "count": 0}, output_dir={"ok": True})
+
+    assert asyncio.run(health_routes.health_check()).status == "unhealthy"
+
+
+def test_no_snapshot_yet_is_unhealthy(monkeypatch):
+    monkeypatch.setattr(health, "_monitor", HealthMonitor(interval=10))
+
+    assert asyncio.run(health_routes.health_check()).status == "unhealthy"
@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import Future
+
+from app.core import jobs
+from app.core.executor import ExecutorSaturated
+from app.core.jobs import JobStore, JobRunner
+
+
+def make_store(tmp_path) -> JobStore:
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def enqueue(store: JobStore, callback_url: str = None) -> str:
+    return store.create(template_name="1b.docx", context={}, user_id="u", callback_url=callback_url)["id"]
+
+
+def test_only_expired_leases_are_requeued(tmp_path):
+    store = make_store(tmp_path)
+    live, dead = enqueue(store), enqueue(store)
+    store.claim_next("live-process", lease=60)
+    store.claim_next("dead-process", lease=0.01)
+    time.sleep(0.05)
+
+    assert store.requeue_expired() == (1, [])
+    assert store.get(live)["status"] == "running"
+    assert store.get(dead)["status"] == "queued"
+    # The dead process cannot report a result for a job it lost
+    assert not store.finish(dead, result={}, owner="dead-process")
+
+
+def test_job_fails_once_its_attempts_are_used_up(tmp_path):
+    store = make_store(tmp_path)
+    job_id = enqueue(store)
+    for attempt in range(1, 4):
+        assert store.claim_next("crashing", lease=0.01)["attempts"] == attempt
+        time.sleep(0.05)
+        requeued, failed = store.requeue_expired(max_attempts=3)
+        assert (requeued, failed) == ((1, []) if attempt < 3 else (0, [job_id]))
+
+    job = store.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"]["code"] == "MAX_ATTEMPTS_EXCEEDED"
+    assert store.claim_next("crashing") is None
+
+
+class FakeExecutor:
+    def __init__(self, saturated=False):
+        self.saturated = saturated
+        self.submitted = []
+
+    def submit(self, fn, *args, **kwargs):
+        if self.saturated:
+            raise ExecutorSaturated(1)
+        self.submitted.append(kwargs["template_name"])
+        future = Future()
+        future.set_result({"docx_path": "x.docx"})
+        return future
+
+
+def test_runner_renders_through_the_executor(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    job_id = enqueue(store)
+    executor = FakeExecutor()
+    monkeypatch.setattr(jobs, "get_render_executor", lambda: executor)
+    runner = JobRunner(store)
+
+    runner._run(store.claim_next(runner.owner))
+
+    assert executor.submitted == ["1b.docx"]
+    job = store.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"docx_path": "x.docx"}
+
+
+def test_runner_puts_the_job_back_when_the_executor_is_full(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    job_id = enqueue(store)
+    monkeypatch.setattr(jobs, "get_render_executor", lambda: FakeExecutor(saturated=True))
+    runner = JobRunner(store, poll_interval=0.01)
+
+    runner._run(store.claim_next(runner.owner))
+
+    job = store.get(job_id)
+    assert job["status"] == "queued"
+    assert job["attempts"] == 0
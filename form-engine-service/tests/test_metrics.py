@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from app.core import health, metrics, result_cache
+from app.core.health import HealthMonitor
+from app.core.storage import get_retention_sweeper
+
+
+def samples(collector) -> dict:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in collector.collect() for sample in family.samples
+    }
+
+
+def test_scrape_reads_cache_and_output_figures_from_the_snapshot(monkeypatch):
+    monitor = HealthMonitor(interval=10)
+    monitor.snapshot = {
+        "components": {"output_dir": {"ok": True, "used_bytes": 1234}},
+        "caches": {"template": {"hits": 3, "misses": 1}, "result": {"hits": 0, "misses": 0}},
+        "timestamp": None,
+    }
+    monkeypatch.setattr(health, "_monitor", monitor)
+
+    def unreachable():
+        raise AssertionError("scrape queried the result cache")
+    monkeypatch.setattr(result_cache, "get_result_cache", unreachable)
+
+    values = samples(metrics._LiveStatsCollector())
+
+    assert values[("form_engine_cache_hits_total", (("cache", "template"),))] == 3
+    assert values[("form_engine_cache_hit_ratio", (("cache", "template"),))] == 0.75
+    assert values[("form_engine_cache_hit_ratio", (("cache", "result"),))] == 0.0
+    assert values[("form_engine_output_used_bytes", ())] == 1234
+
+
+def test_no_cache_or_output_figures_before_the_first_snapshot(monkeypatch):
+    monkeypatch.setattr(health, "_monitor", HealthMonitor(interval=10))
+
+    names = {name for name, _ in samples(metrics._LiveStatsCollector())}
+
+    assert "form_engine_renders_in_flight" in names
+    assert not any(name.startswith(("form_engine_cache", "form_engine_output")) for name in names)
+
+
+def test_snapshot_takes_output_usage_from_the_last_sweep(monkeypatch):
+    sweeper = get_retention_sweeper()
+    monkeypatch.setattr(sweeper, "last_result", {"used_bytes": 42, "skipped": None})
+
+    snapshot = HealthMonitor(interval=10).check()
+
+    assert snapshot["components"]["output_dir"]["used_bytes"] == 42
+    assert set(snapshot["caches"]["template"]) >= {"hits", "misses"}
+
+    monkeypatch.setattr(sweeper, "last_result", {"used_bytes": 0, "skipped": "retention and quota disabled"})
+    assert HealthMonitor(interval=10).check()["components"]["output_dir"]["used_bytes"] is None
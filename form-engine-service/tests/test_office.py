@@ -0,0 +1,25 @@
+import time
+import threading
+
+from app.core import office
+
+
+def test_concurrent_first_calls_share_one_pool(monkeypatch):
+    created = []
+
+    class SlowPool:
+        def __init__(self):
+            time.sleep(0.05)
+            created.append(self)
+
+    monkeypatch.setattr(office, "OfficePool", SlowPool)
+    monkeypatch.setattr(office, "_pool", None)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(office.get_office_pool())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(pool is created[0] for pool in pools)
@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+from app.core import engine as engine_module
+from app.core.engine import FormEngine
+
+
+class FakeOffice:
+    """Office pool that "converts" by writing an empty PDF into outdir"""
+
+    def __init__(self):
+        self.calls = []
+
+    def available(self):
+        return True
+
+    def convert_many(self, src_paths, outdir, timeout=None):
+        self.calls.append((list(src_paths), outdir))
+        result = {}
+        for path in src_paths:
+            pdf = os.path.join(outdir, os.path.splitext(os.path.basename(path))[0] + ".pdf")
+            with open(pdf, "wb") as f:
+                f.write(b"%PDF-1.4\n")
+            result[path] = pdf
+        return result
+
+
+def test_batch_crossing_midnight_puts_each_pdf_next_to_its_docx(make_template, tmp_path, monkeypatch):
+    template_dir = make_template("note", "Name: {{name}}")
+    output_dir = str(tmp_path / "output")
+    engine = FormEngine(template_dir=template_dir, output_dir=output_dir)
+
+    day_dirs = [os.path.join(output_dir, day) for day in ("2026-10-16", "2026-10-17")]
+    for path in day_dirs:
+        os.makedirs(path, exist_ok=True)
+    current = {"dir": day_dirs[0]}
+    monkeypatch.setattr(engine.storage, "day_dir", lambda: current["dir"])
+
+    # Midnight passes after the first document is rendered: the second one
+    # lands in the next day's directory and the conversion runs "tomorrow"
+    render_docx = engine.render_docx
+
+    def render_then_midnight(*args, **kwargs):
+        result = render_docx(*args, **kwargs)
+        current["dir"] = day_dirs[1]
+        return result
+
+    monkeypatch.setattr(engine, "render_docx", render_then_midnight)
+    office = FakeOffice()
+    monkeypatch.setattr(engine_module, "get_office_pool", lambda: office)
+
+    outcomes = engine.render_batch(
+        [{"template_name": "note.docx", "context": {"name": "A"}},
+         {"template_name": "note.docx", "context": {"name": "B"}}],
+        max_workers=1
+    )
+
+    assert [o["success"] for o in outcomes] == [True, True]
+    assert sorted(outdir for _, outdir in office.calls) == day_dirs
+    for outcome, day in zip(outcomes, ["2026-10-16", "2026-10-17"]):
+        data = outcome["data"]
+        assert data["docx_path"].startswith(day + os.sep)
+        assert data["pdf_path"] == data["docx_path"].replace(".docx", ".pdf")
+        assert os.path.isfile(os.path.join(output_dir, data["pdf_path"]))
+
+
+def test_timeout_in_one_directory_only_marks_its_own_items(make_template, tmp_path, monkeypatch):
+    template_dir = make_template("note", "Name: {{name}}")
+    output_dir = str(tmp_path / "output")
+    engine = FormEngine(template_dir=template_dir, output_dir=output_dir)
+
+    day_dirs = [os.path.join(output_dir, day) for day in ("2026-10-16", "2026-10-17")]
+    for path in day_dirs:
+        os.makedirs(path, exist_ok=True)
+    current = {"dir": day_dirs[0]}
+    monkeypatch.setattr(engine.storage, "day_dir", lambda: current["dir"])
+    render_docx = engine.render_docx
+
+    def render_then_midnight(*args, **kwargs):
+        result = render_docx(*args, **kwargs)
+        current["dir"] = day_dirs[1]
+        return result
+
+    monkeypatch.setattr(engine, "render_docx", render_then_midnight)
+
+    class TimesOutYesterday(FakeOffice):
+        def convert_many(self, src_paths, outdir, timeout=None):
+            if outdir == day_dirs[0]:
+                raise engine_module.ConversionTimeout("timeout")
+            return {path: None for path in src_paths}
+
+    office = TimesOutYesterday()
+    monkeypatch.setattr(engine_module, "get_office_pool", lambda: office)
+    failures = []
+    monkeypatch.setattr(engine_module, "count_pdf_failure",
+                        lambda template, timeout=False: failures.append(timeout))
+
+    outcomes = engine.render_batch(
+        [{"template_name": "note.docx", "context": {"name": "A"}},
+         {"template_name": "note.docx", "context": {"name": "B"}}],
+        max_workers=1
+    )
+
+    assert [o["success"] for o in outcomes] == [True, True]
+    assert sorted(failures) == [False, True]
+
+
+class BrokenOffice(FakeOffice):
+    def convert_to_pdf(self, src_path, outdir, timeout=None):
+        return None
+
+
+def test_failed_persisted_pdf_stream_still_audits_the_docx(make_template, tmp_path, monkeypatch):
+    template_dir = make_template("note", "Name: {{name}}")
+    engine = FormEngine(template_dir=template_dir, output_dir=str(tmp_path / "output"),
+                        log_dir=str(tmp_path / "logs"))
+    monkeypatch.setattr(engine_module, "get_office_pool", lambda: BrokenOffice())
+    audited = []
+    monkeypatch.setattr(engine, "_write_audit", audited.append)
+    deduplicated = []
+    monkeypatch.setattr(engine.storage, "dedup", lambda path, digest: deduplicated.append(path))
+
+    with pytest.raises(RuntimeError, match="PDF conversion failed"):
+        engine.render_stream("note.docx", {"name": "A"}, fmt="pdf", persist=True)
+
+    (record,) = audited
+    assert record["pdf_path"] is None and record["sha256_pdf"] is None
+    docx_path = os.path.join(engine.output_dir, record["docx_path"])
+    assert os.path.isfile(docx_path)
+    assert docx_path in deduplicated
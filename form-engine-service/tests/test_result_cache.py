@@ -0,0 +1,88 @@
+import os
+import time
+
+from app.core.result_cache import ResultCache, render_key
+
+
+def make_cache(tmp_path, **options) -> ResultCache:
+    return ResultCache(str(tmp_path / "cache.db"), str(tmp_path / "output"), **options)
+
+
+def output(cache: ResultCache, relative: str, size: int = 10) -> str:
+    path = os.path.join(cache.output_dir, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return relative
+
+
+def remember(cache: ResultCache, name: str, size: int = 10, pdf: bool = False) -> str:
+    key = render_key("template-hash", {"name": name})
+    pdf_path = output(cache, f"d/{name}.pdf", size) if pdf else None
+    cache.store(key, "1b.docx", output(cache, f"d/{name}.docx", size), pdf_path, "sha-docx", "sha-pdf" if pdf else None)
+    return key
+
+
+def test_hit_returns_the_stored_paths(tmp_path):
+    cache = make_cache(tmp_path)
+    key = remember(cache, "a", pdf=True)
+
+    entry = cache.lookup(key)
+
+    assert entry["docx_path"] == "d/a.docx"
+    assert entry["pdf_path"] == "d/a.pdf"
+    assert cache.stats() == {"entries": 1, "bytes": 20, "hits": 1, "misses": 0}
+
+
+def test_unknown_key_is_a_miss(tmp_path):
+    cache = make_cache(tmp_path)
+
+    assert cache.lookup(render_key("template-hash", {"name": "a"})) is None
+    assert cache.misses == 1
+
+
+def test_deleted_output_is_a_miss_and_drops_the_entry(tmp_path):
+    cache = make_cache(tmp_path)
+    key = remember(cache, "a")
+    os.remove(os.path.join(cache.output_dir, "d/a.docx"))
+
+    assert cache.lookup(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_require_pdf_misses_an_entry_rendered_without_one(tmp_path):
+    cache = make_cache(tmp_path)
+    key = remember(cache, "a")
+
+    assert cache.lookup(key, require_pdf=True) is None
+    # The DOCX-only entry is still good for a DOCX request
+    assert cache.lookup(key)["docx_path"] == "d/a.docx"
+
+
+def test_indexed_bytes_limit_evicts_least_recently_hit_and_keeps_files(tmp_path):
+    cache = make_cache(tmp_path, max_indexed_bytes=250)
+    first = remember(cache, "first", size=100)
+    time.sleep(0.01)
+    second = remember(cache, "second", size=100)
+    time.sleep(0.01)
+    assert cache.lookup(first)  # first is now the most recently hit
+    time.sleep(0.01)
+
+    third = remember(cache, "third", size=100)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] == 200
+    assert cache.lookup(second) is None
+    assert cache.lookup(first) and cache.lookup(third)
+    # Evicting forgets the entry; the file is left to the storage sweeper
+    assert os.path.exists(os.path.join(cache.output_dir, "d/second.docx"))
+
+
+def test_entry_limit_evicts_least_recently_hit(tmp_path):
+    cache = make_cache(tmp_path, max_entries=1)
+    first = remember(cache, "first")
+    time.sleep(0.01)
+    second = remember(cache, "second")
+
+    assert cache.lookup(first) is None
+    assert cache.lookup(second)
@@ -0,0 +1,165 @@
+import os
+import time
+import hashlib
+
+from app.core.audit_store import get_audit_store
+from app.core.storage import OutputStorage, STORE_DIR
+
+DAY = 86400
+
+
+def make_storage(tmp_path, **options) -> OutputStorage:
+    options.setdefault("retention_days", 0)
+    options.setdefault("quota_bytes", 0)
+    options.setdefault("keep_audited", False)
+    options.setdefault("dedup", True)
+    return OutputStorage(str(tmp_path / "output"), log_dir=str(tmp_path / "logs"), **options)
+
+
+def put(storage: OutputStorage, relative: str, content: bytes, age: float) -> str:
+    """Write an output file last modified age seconds ago"""
+    path = os.path.join(storage.output_dir, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def tree(storage: OutputStorage) -> dict:
+    return {
+        os.path.relpath(os.path.join(root, name), storage.output_dir): os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(storage.output_dir) for name in names
+    }
+
+
+def test_expired_files_are_deleted_recent_ones_kept(tmp_path):
+    storage = make_storage(tmp_path, retention_days=1)
+    put(storage, "2026-01-01/old.docx", b"x" * 10, 2 * DAY)
+    put(storage, "2026-01-02/recent.docx", b"x" * 10, 2 * 3600)
+    put(storage, "2026-01-03/just-written.docx", b"x" * 10, 60)
+
+    stats = storage.sweep()
+
+    assert stats["deleted"] == 1
+    assert stats["freed_bytes"] == 10
+    assert sorted(tree(storage)) == ["2026-01-02/recent.docx", "2026-01-03/just-written.docx"]
+    # Emptied day directories are removed too
+    assert not os.path.exists(os.path.join(storage.output_dir, "2026-01-01"))
+
+
+def test_quota_evicts_oldest_first_and_spares_the_grace_period(tmp_path):
+    storage = make_storage(tmp_path, quota_bytes=250)
+    put(storage, "d/a.docx", b"a" * 100, 4 * DAY)
+    put(storage, "d/b.docx", b"b" * 100, 3 * DAY)
+    put(storage, "d/c.docx", b"c" * 100, 2 * DAY)
+    put(storage, "d/new.docx", b"n" * 100, 60)
+
+    stats = storage.sweep()
+
+    assert stats["deleted"] == 2
+    assert stats["used_bytes"] == 200
+    assert sorted(tree(storage)) == ["d/c.docx", "d/new.docx"]
+
+
+def test_quota_never_deletes_inside_the_grace_period(tmp_path):
+    storage = make_storage(tmp_path, quota_bytes=50)
+    put(storage, "d/new.docx", b"n" * 100, 60)
+
+    stats = storage.sweep()
+
+    assert stats["deleted"] == 0
+    assert stats["used_bytes"] == 100
+
+
+def test_deduplicated_pair_counts_once_and_is_freed_with_its_last_link(tmp_path):
+    storage = make_storage(tmp_path, quota_bytes=150)
+    content = b"same" * 25
+    digest = hashlib.sha256(content).hexdigest()
+    first = put(storage, "d/first.docx", content, 0)
+    second = put(storage, "d/second.docx", content, 0)
+    assert storage.dedup(first, digest) is False
+    assert storage.dedup(second, digest) is True
+    assert os.path.samefile(first, second)
+    blob = os.path.join(storage.output_dir, STORE_DIR, digest[:2], digest + ".docx")
+    stamp = time.time() - 3 * DAY
+    os.utime(first, (stamp, stamp))  # Links share the inode, so both age together
+    put(storage, "d/other.docx", b"o" * 100, DAY)
+
+    # Three names, two inodes: 200 bytes in use, not 300
+    dry = storage.sweep(dry_run=True)
+    assert dry["used_bytes"] == 100 and dry["freed_bytes"] == 100
+
+    stats = storage.sweep()
+
+    assert stats["deleted"] == 2
+    assert stats["freed_bytes"] == 100
+    assert stats["used_bytes"] == 100
+    assert not os.path.exists(blob)
+    assert sorted(tree(storage)) == ["d/other.docx"]
+
+
+def test_one_deleted_link_frees_nothing(tmp_path):
+    storage = make_storage(tmp_path, retention_days=1)
+    content = b"same" * 25
+    digest = hashlib.sha256(content).hexdigest()
+    old = put(storage, "2026-01-01/old.docx", content, 0)
+    storage.dedup(old, digest)
+    stamp = time.time() - 2 * DAY
+    os.utime(old, (stamp, stamp))
+    # A newer render of the same bytes links the shared inode and restarts its clock
+    storage.dedup(put(storage, "2026-01-05/new.docx", content, 0), digest)
+
+    stats = storage.sweep()
+
+    assert stats["deleted"] == 0
+    assert sorted(name for name in tree(storage) if not name.startswith(STORE_DIR)) == [
+        "2026-01-01/old.docx", "2026-01-05/new.docx"
+    ]
+
+
+def test_files_audited_against_a_proposal_are_kept(tmp_path):
+    storage = make_storage(tmp_path, retention_days=1, keep_audited=True)
+    put(storage, "2026-01-01/filed.docx", b"f" * 10, 5 * DAY)
+    put(storage, "2026-01-01/filed.pdf", b"f" * 10, 5 * DAY)
+    put(storage, "2026-01-01/loose.docx", b"l" * 10, 5 * DAY)
+    get_audit_store(storage.log_dir).insert_many([
+        {"timestamp": "2026-01-01T10:00:00", "template": "1b.docx", "proposal_id": "DT-1",
+         "docx_path": "2026-01-01/filed.docx", "pdf_path": "2026-01-01/filed.pdf"},
+        {"timestamp": "2026-01-01T10:00:00", "template": "1b.docx", "proposal_id": None,
+         "docx_path": "2026-01-01/loose.docx", "pdf_path": None},
+    ])
+
+    stats = storage.sweep()
+
+    assert stats["kept_audited"] == 2
+    assert stats["deleted"] == 1
+    assert sorted(tree(storage)) == ["2026-01-01/filed.docx", "2026-01-01/filed.pdf"]
+
+
+def test_dry_run_reports_without_touching_the_tree(tmp_path):
+    storage = make_storage(tmp_path, retention_days=1, quota_bytes=10)
+    content = b"same" * 25
+    digest = hashlib.sha256(content).hexdigest()
+    linked = put(storage, "2026-01-01/a.docx", content, 0)
+    storage.dedup(linked, digest)
+    stamp = time.time() - 5 * DAY
+    os.utime(linked, (stamp, stamp))
+    put(storage, "2026-01-02/b.docx", b"b" * 50, 2 * 3600)
+    before = tree(storage)
+
+    stats = storage.sweep(dry_run=True)
+
+    assert stats["deleted"] == 2
+    assert stats["freed_bytes"] == 150
+    assert tree(storage) == before
+    assert os.path.samefile(linked, os.path.join(storage.output_dir, STORE_DIR, digest[:2], digest + ".docx"))
+
+
+def test_sweep_is_skipped_without_retention_or_quota(tmp_path):
+    storage = make_storage(tmp_path)
+    put(storage, "2026-01-01/old.docx", b"x", 400 * DAY)
+
+    assert storage.sweep()["skipped"] == "retention and quota disabled"
+    assert list(tree(storage)) == ["2026-01-01/old.docx"]
@@ -0,0 +1,127 @@
+from docx.oxml import parse_xml
+
+from app.core.substitution import W_T, split_tags, substitute_paragraph, set_text
+from app.core.template_cache import W_NS, PLACEHOLDER_PATTERN
+
+
+def paragraph(*runs: str):
+    """A w:p from run XML fragments, e.g. '<w:r><w:t>text</w:t></w:r>'"""
+    return parse_xml(f'<w:p xmlns:w="{W_NS}">{"".join(runs)}</w:p>')
+
+
+def run(text: str, bold: bool = False) -> str:
+    props = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    return f'<w:r>{props}<w:t xml:space="preserve">{text}</w:t></w:r>'
+
+
+def texts(p) -> list:
+    return [t.text or "" for t in p.iter(W_T)]
+
+
+def local(element) -> str:
+    return element.tag.split("}")[1]
+
+
+def test_split_tags_assigns_a_split_tag_to_the_node_holding_its_braces():
+    parts = ["Ho ten: {{ho", "_ten}}", " end"]
+    matches = list(PLACEHOLDER_PATTERN.finditer("".join(parts)))
+
+    pieces = split_tags(parts, matches)
+
+    assert [i for i, _ in pieces] == [0, 1]
+    first, second = pieces[0][1], pieces[1][1]
+    assert first[0] == "Ho ten: " and first[1].group(1) == "ho_ten"
+    assert second == []
+
+
+def test_placeholder_split_across_runs():
+    p = paragraph(run("Ho ten: {{ho"), run("_t"), run("en}} xong"))
+
+    assert substitute_paragraph(p, {"ho_ten": "Nguyen Van A"})
+
+    assert texts(p) == ["Ho ten: Nguyen Van A", "", " xong"]
+
+
+def test_adjacent_placeholders():
+    p = paragraph(run("{{a}}{{b}}"), run("{{c}}"))
+
+    substitute_paragraph(p, {"a": "1", "b": "2", "c": "3"})
+
+    assert "".join(texts(p)) == "123"
+    assert texts(p) == ["12", "3"]
+
+
+def test_multiline_value_becomes_line_breaks():
+    p = paragraph(run("Noi dung: {{nd}}"))
+
+    substitute_paragraph(p, {"nd": "- mot\n- hai"})
+
+    r = p.find(f"{{{W_NS}}}r")
+    assert [local(child) for child in r] == ["t", "br", "t"]
+    assert texts(p) == ["Noi dung: - mot", "- hai"]
+
+
+def test_tab_value_becomes_a_tab():
+    p = paragraph(run("{{a}}"))
+
+    substitute_paragraph(p, {"a": "x\ty"})
+
+    r = p.find(f"{{{W_NS}}}r")
+    assert [local(child) for child in r] == ["t", "tab", "t"]
+    assert texts(p) == ["x", "y"]
+
+
+def test_missing_variable_is_left_in_place():
+    p = paragraph(run("{{known}} and {{unk"), run("nown}}"))
+
+    assert substitute_paragraph(p, {"known": "K"})
+
+    assert "".join(texts(p)) == "K and {{unknown}}"
+
+
+def test_paragraph_without_known_tags_is_untouched():
+    p = paragraph(run("{{unknown}}"))
+
+    assert not substitute_paragraph(p, {"other": "x"})
+    assert texts(p) == ["{{unknown}}"]
+
+
+def test_formatting_of_the_first_run_is_kept():
+    p = paragraph(run("{{ten", bold=True), run("}} sau"))
+
+    substitute_paragraph(p, {"ten": "Dai hoc"})
+
+    bold_run, plain_run = p.findall(f"{{{W_NS}}}r")
+    assert bold_run.find(f"{{{W_NS}}}rPr/{{{W_NS}}}b") is not None
+    assert bold_run.find(W_T).text == "Dai hoc"
+    assert plain_run.find(f"{{{W_NS}}}rPr") is None
+    assert plain_run.find(W_T).text == " sau"
+
+
+def test_none_value_renders_empty_and_spaces_are_preserved():
+    p = paragraph(run("{{a}}"), run("{{b}}"))
+
+    substitute_paragraph(p, {"a": None, "b": " x "})
+
+    first, second = p.iter(W_T)
+    assert first.text == ""
+    assert second.text == " x "
+    assert second.get("{http://www.w3.org/XML/1998/namespace}space") == "preserve"
+
+
+def test_set_text_keeps_siblings_in_order():
+    p = paragraph('<w:r><w:t>a</w:t><w:t>z</w:t></w:r>')
+    first = p.find(f".//{W_T}")
+
+    set_text(first, "b\nc")
+
+    r = p.find(f"{{{W_NS}}}r")
+    assert [(local(c), c.text) for c in r] == [("t", "b"), ("br", None), ("t", "c"), ("t", "z")]
+
+
+def test_spaces_inside_the_braces():
+    p = paragraph(run("{{ ngay }}/{{thang }}"))
+
+    substitute_paragraph(p, {"ngay": "01", "thang": "02"})
+
+    assert texts(p) == ["01/02"]
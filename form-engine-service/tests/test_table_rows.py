@@ -0,0 +1,67 @@
+import time
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from app.core import table_rows
+from app.core.engine import FormEngine
+
+
+def make_table_template(directory) -> str:
+    document = Document()
+    document.add_paragraph("Danh sach: {{so_de_tai}}")
+    table = document.add_table(rows=2, cols=3)
+    for cell, text in zip(table.rows[0].cells, ["STT", "Ten", "Noi dung"]):
+        cell.text = text
+    for cell, text in zip(table.rows[1].cells,
+                          ["{{#each danh_sach}}{{item.stt}}", "{{item.ten}}", "{{item.noi_dung}}"]):
+        cell.text = text
+        cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    document.save(str(directory / "rows.docx"))
+    return str(directory)
+
+
+def test_large_list_fills_every_row_and_aligns_list_cells(tmp_path):
+    engine = FormEngine(template_dir=make_table_template(tmp_path), output_dir=str(tmp_path / "output"))
+    items = [
+        {"ten": f"De tai {i}", "noi_dung": "- Noi dung 1\n- Noi dung 2" if i % 2 else "Mot dong"}
+        for i in range(1000)
+    ]
+    context = {"so_de_tai": "1000", "danh_sach": items}
+    engine._build_document("rows.docx", context)  # compile outside the timing
+
+    started = time.perf_counter()
+    document = engine._build_document("rows.docx", context)
+    elapsed = time.perf_counter() - started
+
+    # Row.cells is quadratic on a large table: read the XML directly
+    rows = document.tables[0]._tbl.tr_lst
+    assert len(rows) == 1001
+    for position, tr in enumerate(rows[1:], 1):
+        number, name, content = (tc.p_lst[0] for tc in tr.tc_lst)
+        assert number.text == str(position)
+        assert name.text == f"De tai {position - 1}"
+        expected = WD_ALIGN_PARAGRAPH.LEFT if (position - 1) % 2 else WD_ALIGN_PARAGRAPH.CENTER
+        assert content.alignment == expected
+        assert number.alignment == WD_ALIGN_PARAGRAPH.CENTER
+    # Small rows: well under a second even on a slow CI machine
+    assert elapsed < 1.0
+
+
+def test_list_rule_is_decided_from_rendered_values(tmp_path, monkeypatch):
+    engine = FormEngine(template_dir=make_table_template(tmp_path), output_dir=str(tmp_path / "output"))
+    engine._build_document("rows.docx", {})
+    aligned = []
+    monkeypatch.setattr(table_rows, "left_align", aligned.append)
+
+    items = [{"ten": "A", "noi_dung": "- mot" if i % 2 else "hai"} for i in range(100)]
+    engine._build_document("rows.docx", {"danh_sach": items})
+    # Only the list cells are touched; the others never re-read their text
+    assert len(aligned) == 50
+
+
+def test_list_rule_skips_blank_leading_values(tmp_path):
+    engine = FormEngine(template_dir=make_table_template(tmp_path), output_dir=str(tmp_path / "output"))
+    document = engine._build_document("rows.docx", {"danh_sach": [{"ten": "A", "noi_dung": "  \n- mot"}]})
+    content = document.tables[0].rows[1].cells[2]
+    assert content.paragraphs[0].alignment == WD_ALIGN_PARAGRAPH.LEFT
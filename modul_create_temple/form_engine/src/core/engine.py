@@ -1,5 +1,7 @@
 import os
+import re
 import json
+import bisect
 import logging
 import subprocess
 import datetime
@@ -127,10 +129,97 @@ def get_date_line(city: str = "Nam Định", day: str = None, month: str = None,
 
     return f"{city},\u00A0ngày\u00A0{day}\u00A0tháng\u00A0{month}\u00A0năm\u00A0{year}"
 
+
+# {{key}}, {{ key }}, {{key }}, {{ key}}
+PLACEHOLDER_PATTERN = re.compile(r"\{\{ ?([^{}]+?) ?\}\}")
+
+
+def replace_placeholders(p, context: Dict[str, Any]) -> bool:
+    """
+    QUY TẮC CHUNG: Thay {{key}} trong một paragraph (w:p), giữ nguyên format.
+
+    Text của paragraph được ghép và quét một lần. Chỉ các w:t chứa placeholder
+    được ghi lại; placeholder bị tách qua nhiều run được ghi vào w:t chứa "{{"
+    (giữ format của run đó) và phần còn lại bị xóa khỏi các w:t sau.
+    Xuống dòng và tab trong giá trị thành w:br / w:tab trong cùng run.
+
+    Returns:
+        True nếu paragraph bị thay đổi
+    """
+    from docx.oxml.ns import qn
+
+    nodes = p.xpath("./w:r/w:t | ./w:hyperlink/w:r/w:t")
+    texts = [t.text or "" for t in nodes]
+    full_text = "".join(texts)
+    if "{{" not in full_text:
+        return False
+    matches = [m for m in PLACEHOLDER_PATTERN.finditer(full_text) if m.group(1) in context]
+    if not matches:
+        return False
+
+    # Vị trí bắt đầu của mỗi w:t trong full_text
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text)
+
+    def node_at(pos):
+        i = bisect.bisect_right(starts, pos) - 1
+        while i > 0 and not texts[i]:
+            i -= 1
+        return i
+
+    new_texts = {}
+    for m in matches:
+        for i in range(node_at(m.start()), node_at(m.end() - 1) + 1):
+            new_texts.setdefault(i, [])
+
+    def keep(begin, end):
+        while begin < end:
+            i = node_at(begin)
+            chunk_end = min(end, starts[i] + len(texts[i]))
+            if i in new_texts:
+                new_texts[i].append(full_text[begin:chunk_end])
+            begin = chunk_end
+
+    cursor = 0
+    for m in matches:
+        keep(cursor, m.start())
+        val = context[m.group(1)]
+        new_texts[node_at(m.start())].append(str(val) if val is not None else "")
+        cursor = m.end()
+    keep(cursor, len(full_text))
+
+    for i, parts in new_texts.items():
+        text = "".join(parts)
+        if text == texts[i]:
+            continue
+        # Xuống dòng / tab trong giá trị -> w:br / w:tab trong cùng run
+        t = nodes[i]
+        anchor = t
+        for part in re.split(r"(\n|\t)", text):
+            if part == "\n":
+                node = t.makeelement(qn("w:br"), {})
+            elif part == "\t":
+                node = t.makeelement(qn("w:tab"), {})
+            elif part:
+                node = t.makeelement(qn("w:t"), {qn("xml:space"): "preserve"})
+                node.text = part
+            else:
+                continue
+            anchor.addnext(node)
+            anchor = node
+        t.getparent().remove(t)
+    return True
+
+
 class FormEngine:
-    def __init__(self, template_dir="form_engine/templates", output_dir="form_engine/output"):
+    def __init__(self, template_dir="form_engine/templates", output_dir="form_engine/output", convert_pdf=True):
         self.template_dir = template_dir
         self.output_dir = output_dir
+        # False: caller converts the DOCX itself (e.g. one batched soffice call)
+        self.convert_pdf = convert_pdf
         self.today_dir = os.path.join(self.output_dir, datetime.datetime.now().strftime("%Y-%m-%d"))
         os.makedirs(self.today_dir, exist_ok=True)
 
@@ -140,56 +229,7 @@ class FormEngine:
 
     def replace_text_in_element(self, element, context):
         """Helper to replace text in paragraph or cell"""
-        if not element.text:
-            return
-
-        for key, val in context.items():
-            # Check for multiple patterns: {{key}}, {{ key }}, {{key }}
-            patterns = [
-                f"{{{{ {key} }}}}",
-                f"{{{{{key}}}}}",
-                f"{{{{ {key}}}}}",
-                f"{{{{{key} }}}}"
-            ]
-            
-            val_str = str(val) if val is not None else ""
-            
-            for pat in patterns:
-                if pat in element.text:
-                    # SMART REPLACE STRATEGY:
-                    # If the pattern is split across runs, simple replace won't work on individual runs.
-                    # We modify the whole paragraph text.
-                    # Warning: This resets formatting of the whole paragraph to the style of the first run.
-                    # But ensures data is filled.
-                    
-                    # Support Newline \n by adding breaks
-                    if '\n' in val_str:
-                        parts = val_str.split('\n')
-                        # Clear old runs
-                        for run in element.runs:
-                            run.text = ""
-                        
-                        # Add parts with breaks
-                        if element.runs:
-                            r = element.runs[0]
-                            r.text = parts[0]
-                            for part in parts[1:]:
-                                r.add_break()
-                                r.add_text(part)
-                        else:
-                            r = element.add_run(parts[0])
-                            for part in parts[1:]:
-                                r.add_break()
-                                r.add_text(part)
-                    else:
-                        # Normal replace
-                        new_text = element.text.replace(pat, val_str)
-                        for run in element.runs:
-                            run.text = ""
-                        if element.runs:
-                            element.runs[0].text = new_text
-                        else:
-                            element.add_run(new_text)
+        replace_placeholders(element._p, context)
 
     def render(self, template_name: str, context: Dict[str, Any], user_id: str = "system") -> Dict[str, str]:
         from docx import Document
@@ -219,19 +259,20 @@ class FormEngine:
         
         # Convert PDF
         pdf_output_path = None
-        try:
-            cmd_check = ["soffice", "--version"]
-            subprocess.run(cmd_check, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            cmd = ["soffice", "--headless", "--convert-to", "pdf", "--outdir", self.today_dir, docx_output_path]
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # LibreOffice output name logic
-            expected_pdf = docx_output_path.replace(".docx", ".pdf")
-            if os.path.exists(expected_pdf):
-                pdf_output_path = expected_pdf
-        except:
-            logger.warning("PDF Conversion failed or LibreOffice not present")
+        if self.convert_pdf:
+            try:
+                cmd_check = ["soffice", "--version"]
+                subprocess.run(cmd_check, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+                cmd = ["soffice", "--headless", "--convert-to", "pdf", "--outdir", self.today_dir, docx_output_path]
+                subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+                # LibreOffice output name logic
+                expected_pdf = docx_output_path.replace(".docx", ".pdf")
+                if os.path.exists(expected_pdf):
+                    pdf_output_path = expected_pdf
+            except:
+                logger.warning("PDF Conversion failed or LibreOffice not present")
 
         result = {
             "docx": docx_output_path,
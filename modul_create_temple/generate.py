@@ -6,6 +6,7 @@ Usage:
     python generate.py 1b                    # Generate form 1b
     python generate.py 3b --rejected         # Generate form 3b with rejected status
     python generate.py --all                 # Generate all forms
+    python generate.py --all --jobs 4        # ... on 4 processes, PDFs in one soffice call
     python generate.py --list                # List available forms
 
 Author: Refactored by Barry (Quick Flow Solo Dev)
@@ -15,8 +16,10 @@ import os
 import argparse
 import datetime
 import re
+import time
 import subprocess
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Add path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'form_engine/src'))
@@ -51,6 +54,9 @@ COMPLEX_FORMS = ["4b", "5b", "10b", "14b", "15b", "16b", "17b"]
 
 ALL_FORMS = SIMPLE_FORMS + CLEANUP_FORMS + COMPLEX_FORMS
 
+# When True, generators only write the DOCX; PDFs are made later by convert_to_pdf_batch()
+DEFER_PDF = False
+
 
 def ensure_output_dir():
     """Create output directory if not exists."""
@@ -58,13 +64,29 @@ def ensure_output_dir():
 
 
 def convert_to_pdf(docx_path: str) -> bool:
-    """Convert DOCX to PDF using LibreOffice."""
-    try:
-        cmd = ["soffice", "--headless", "--convert-to", "pdf", "--outdir", str(OUTPUT_DIR), docx_path]
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return True
-    except Exception:
+    """Convert DOCX to PDF using LibreOffice (skipped when PDFs are batched)."""
+    if DEFER_PDF:
         return False
+    return convert_to_pdf_batch([docx_path])[docx_path]
+
+
+def convert_to_pdf_batch(docx_paths: list) -> dict:
+    """Convert many DOCX files with one soffice start per output directory.
+
+    Returns {docx_path: True if its PDF exists afterwards}.
+    """
+    by_dir = {}
+    for path in docx_paths:
+        by_dir.setdefault(os.path.dirname(os.path.abspath(path)), []).append(path)
+
+    for outdir, paths in by_dir.items():
+        try:
+            cmd = ["soffice", "--headless", "--convert-to", "pdf", "--outdir", outdir] + paths
+            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except Exception:
+            pass
+
+    return {path: os.path.exists(os.path.splitext(path)[0] + ".pdf") for path in docx_paths}
 
 
 def verify_filled_variables(docx_path: str) -> list:
@@ -171,7 +193,7 @@ def set_cell_border(cell):
 
 def generate_simple(form_id: str, is_approved: bool) -> str:
     """Generate simple forms using engine.render()."""
-    engine = FormEngine()
+    engine = FormEngine(convert_pdf=not DEFER_PDF)
     context = get_sample_data(form_id, is_approved)
     template_name = f"{form_id.upper() if form_id.startswith('pl') else form_id}.docx"
 
@@ -381,12 +403,16 @@ def generate_complex(form_id: str, is_approved: bool) -> str:
 
 # === MAIN DISPATCHER ===
 
-def generate_form(form_id: str, is_approved: bool = True) -> str:
-    """Main dispatcher for form generation."""
+def build_form(form_id: str, is_approved: bool = True) -> dict:
+    """Generate one form and verify it; never raises.
+
+    Returns:
+        {"form", "output", "seconds", "unfilled", "error"}
+    """
     form_id = form_id.lower()
     ensure_output_dir()
-
-    print(f"--- GENERATING FORM {form_id.upper()} ({'APPROVED' if is_approved else 'REJECTED'}) ---")
+    started = time.perf_counter()
+    result = {"form": form_id, "output": "", "seconds": 0.0, "unfilled": [], "error": ""}
 
     try:
         if form_id in SIMPLE_FORMS:
@@ -402,25 +428,106 @@ def generate_form(form_id: str, is_approved: bool = True) -> str:
         elif form_id in COMPLEX_FORMS:
             output = generate_complex(form_id, is_approved)
         else:
-            print(f"❌ Unknown form: {form_id}")
-            return ""
-
-        # Verify
-        unfilled = verify_filled_variables(output)
-        if unfilled:
-            print(f"⚠️  {len(unfilled)} unfilled variables: {', '.join(unfilled[:5])}")
-        else:
-            print("✅ All variables filled!")
-
-        print(f"📄 Output: {output}")
-        return output
+            result["error"] = f"Unknown form: {form_id}"
+            return result
 
+        result["output"] = output
+        result["unfilled"] = sorted(verify_filled_variables(output))
     except Exception as e:
-        print(f"❌ Error generating {form_id}: {e}")
         import traceback
-        traceback.print_exc()
+        result["error"] = f"{e}"
+        result["traceback"] = traceback.format_exc()
+    finally:
+        result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def generate_form(form_id: str, is_approved: bool = True) -> str:
+    """Main dispatcher for form generation."""
+    print(f"--- GENERATING FORM {form_id.upper()} ({'APPROVED' if is_approved else 'REJECTED'}) ---")
+
+    result = build_form(form_id, is_approved)
+    if result["error"]:
+        if result["error"].startswith("Unknown form"):
+            print(f"❌ {result['error']}")
+        else:
+            print(f"❌ Error generating {result['form']}: {result['error']}")
+            print(result.get("traceback", ""), end="")
         return ""
 
+    # Verify
+    unfilled = result["unfilled"]
+    if unfilled:
+        print(f"⚠️  {len(unfilled)} unfilled variables: {', '.join(unfilled[:5])}")
+    else:
+        print("✅ All variables filled!")
+
+    print(f"📄 Output: {result['output']}")
+    return result["output"]
+
+
+def _init_worker():
+    """Process pool initializer: leave PDF conversion to the parent's batch."""
+    global DEFER_PDF
+    DEFER_PDF = True
+
+
+def generate_all(form_ids: list, is_approved: bool = True, jobs: int = 1) -> list:
+    """Generate forms on `jobs` processes, then convert every DOCX in one soffice call."""
+    global DEFER_PDF
+    ensure_output_dir()
+    results = []
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+            futures = [pool.submit(build_form, form_id, is_approved) for form_id in form_ids]
+            for future in as_completed(futures):
+                result = future.result()
+                print(f"  {'❌' if result['error'] else '✅'} {result['form']:<5} {result['seconds']:.2f}s")
+                results.append(result)
+    else:
+        DEFER_PDF = True
+        try:
+            for form_id in form_ids:
+                result = build_form(form_id, is_approved)
+                print(f"  {'❌' if result['error'] else '✅'} {result['form']:<5} {result['seconds']:.2f}s")
+                results.append(result)
+        finally:
+            DEFER_PDF = False
+
+    outputs = [r["output"] for r in results if r["output"]]
+    print(f"\nConverting {len(outputs)} document(s) to PDF...")
+    started = time.perf_counter()
+    converted = convert_to_pdf_batch(outputs) if outputs else {}
+    pdf_seconds = time.perf_counter() - started
+    for r in results:
+        r["pdf"] = converted.get(r["output"], False)
+
+    order = {form_id: i for i, form_id in enumerate(form_ids)}
+    results.sort(key=lambda r: order.get(r["form"], len(order)))
+    print_summary(results, pdf_seconds)
+    return results
+
+
+def print_summary(results: list, pdf_seconds: float):
+    """Per-form table: DOCX time, PDF status, unfilled variables, errors."""
+    print(f"\n{'FORM':<6} {'DOCX (s)':>8}  {'PDF':<4} {'UNFILLED':>8}  DETAILS")
+    print("-" * 72)
+    for r in results:
+        if r["error"]:
+            details = r["error"]
+        else:
+            details = ", ".join(r["unfilled"][:3]) + (" ..." if len(r["unfilled"]) > 3 else "")
+        pdf = "yes" if r.get("pdf") else "no"
+        print(f"{r['form']:<6} {r['seconds']:>8.2f}  {pdf:<4} {len(r['unfilled']):>8}  {details}")
+    print("-" * 72)
+
+    failed = sum(1 for r in results if r["error"])
+    no_pdf = sum(1 for r in results if not r["error"] and not r.get("pdf"))
+    with_unfilled = sum(1 for r in results if r["unfilled"])
+    print(f"{len(results)} form(s): {failed} failed, {no_pdf} without PDF, {with_unfilled} with unfilled variables; "
+          f"DOCX {sum(r['seconds'] for r in results):.2f}s total, PDF batch {pdf_seconds:.2f}s")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Unified Form Generator")
@@ -428,6 +535,7 @@ def main():
     parser.add_argument("--rejected", action="store_true", help="Generate with rejected status")
     parser.add_argument("--all", action="store_true", help="Generate all forms")
     parser.add_argument("--list", action="store_true", help="List available forms")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Worker processes for --all (default: 1)")
 
     args = parser.parse_args()
 
@@ -439,10 +547,10 @@ def main():
         return
 
     if args.all:
-        print("=== GENERATING ALL FORMS ===\n")
-        for form_id in ALL_FORMS:
-            generate_form(form_id, is_approved=True)
-            print()
+        print(f"=== GENERATING ALL FORMS ({args.jobs} job(s)) ===\n")
+        results = generate_all(ALL_FORMS, is_approved=True, jobs=max(1, args.jobs))
+        if any(r["error"] for r in results):
+            sys.exit(1)
         return
 
     if not args.form_id: